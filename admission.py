@@ -0,0 +1,129 @@
+"""검색 타입별 동시 실행 제한과 부하 차단(admission control)
+
+요청이 몰리면 무한정 기다리게 하는 대신, 예상 대기 시간이 마감 시간을 넘는
+요청은 바로 429/503과 Retry-After로 돌려보냅니다. 예상 대기 시간은 처리 시간
+이동 평균(EWMA), 이 프로세스의 대기 요청 수, Celery 브로커 큐 길이로 계산합니다.
+"""
+
+import math
+import time
+import asyncio
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code, retry_after, reason):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class _Lane:
+    """검색 타입 하나에 대한 동시 실행 슬롯과 통계"""
+
+    def __init__(self, limit, initial_latency):
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.ewma_latency = initial_latency
+        self.backlog = 0  # 외부 큐(브로커)에 쌓인 작업 수
+        self.backlog_workers = limit
+        self.admitted = 0
+        self.rejected = 0
+
+    def estimate_wait(self):
+        """지금 들어온 요청이 실행을 시작하기까지 예상 대기 시간(초)"""
+        queued = self.waiting + max(self.in_flight - self.limit + 1, 0)
+        local_wait = queued * self.ewma_latency / self.limit
+        backlog_wait = self.backlog * self.ewma_latency / max(self.backlog_workers, 1)
+        return local_wait + backlog_wait
+
+
+class AdmissionController:
+    def __init__(self, limits, max_waiting=100, initial_latency=1.0, alpha=0.2):
+        self.max_waiting = max_waiting
+        self.alpha = alpha
+        self._lanes = {
+            search_type: _Lane(limit, initial_latency)
+            for search_type, limit in limits.items()
+        }
+
+    def _lane(self, search_type):
+        return self._lanes.get(search_type)
+
+    def set_backlog(self, search_type, backlog, workers=None):
+        lane = self._lane(search_type)
+        if lane is not None:
+            lane.backlog = backlog
+            if workers:
+                lane.backlog_workers = workers
+
+    def is_saturated(self, search_type):
+        lane = self._lane(search_type)
+        return lane is not None and lane.in_flight >= lane.limit
+
+    async def run(self, search_type, deadline, func):
+        """마감 시각(deadline, epoch 초) 안에 시작할 수 있을 때만 func 실행"""
+        lane = self._lane(search_type)
+        if lane is None:
+            return await func()
+
+        remaining = deadline - time.time()
+        estimated = lane.estimate_wait()
+        if lane.waiting >= self.max_waiting:
+            lane.rejected += 1
+            raise AdmissionRejected(
+                429, math.ceil(max(estimated, 1)), "대기 중인 요청이 너무 많습니다."
+            )
+        if estimated > remaining:
+            lane.rejected += 1
+            raise AdmissionRejected(
+                503,
+                math.ceil(max(estimated - remaining, 1)),
+                f"예상 대기 시간({estimated:.1f}초)이 마감 시간을 넘습니다.",
+            )
+
+        if lane.semaphore.locked():
+            lane.waiting += 1
+            try:
+                await asyncio.wait_for(
+                    lane.semaphore.acquire(), timeout=max(remaining, 0)
+                )
+            except asyncio.TimeoutError:
+                lane.rejected += 1
+                raise AdmissionRejected(
+                    503,
+                    math.ceil(max(lane.estimate_wait(), 1)),
+                    "마감 시간 안에 실행하지 못했습니다.",
+                )
+            finally:
+                lane.waiting -= 1
+        else:
+            await lane.semaphore.acquire()
+
+        lane.in_flight += 1
+        lane.admitted += 1
+        start = time.time()
+        try:
+            return await func()
+        finally:
+            elapsed = time.time() - start
+            lane.ewma_latency = (1 - self.alpha) * lane.ewma_latency + self.alpha * elapsed
+            lane.in_flight -= 1
+            lane.semaphore.release()
+
+    def stats(self):
+        return {
+            search_type: {
+                "limit": lane.limit,
+                "in_flight": lane.in_flight,
+                "waiting": lane.waiting,
+                "backlog": lane.backlog,
+                "ewma_latency": lane.ewma_latency,
+                "estimated_wait": lane.estimate_wait(),
+                "admitted": lane.admitted,
+                "rejected": lane.rejected,
+            }
+            for search_type, lane in self._lanes.items()
+        }
@@ -1,27 +1,98 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Union
+import rag
 from rag import (
     search_similar_sentences,
     search_similar_sentences_bm25,
     search_similar_sentences_exact_match,
+    search_similar_sentences_fuzzy,
+    refine_start_time,
 )
 
-from tasks import search_task_vector
+from tasks import (
+    search_task_vector,
+    search_task_vector_batch,
+    search_task_vector_grouped,
+    broker_queue_keys,
+)
 from fastapi import BackgroundTasks
 
+import tracing
+from history import SearchHistoryLog
+from warmup import start_background_warmup, warmup_state
+from singleflight import SingleFlight, make_key
+from admission import AdmissionController, AdmissionRejected
+from semantic_cache import merge_stats, split_stale_stats
+from serialization import dumps, encode_body, slim_results
+from slowlog import SlowQueryLog
+from profiler import SamplingProfiler, load_profile
+from grouping import CursorStore, encode_cursor, decode_cursor
+from config import (
+    SERVER_TIMING_ENABLED,
+    SEARCH_HISTORY_DIR,
+    HISTORY_QUEUE_SIZE,
+    HISTORY_BATCH_SIZE,
+    HISTORY_FLUSH_INTERVAL,
+    HISTORY_SEGMENT_MAX_BYTES,
+    HISTORY_FULL_POLICY,
+    WARMUP_API_SEARCH_TYPES,
+    BATCH_MAX_ITEMS,
+    BATCH_MAX_CONCURRENCY,
+    BATCH_VECTOR_CHUNK_SIZE,
+    SINGLEFLIGHT_REDIS_URL,
+    SEMANTIC_CACHE_STATS_REDIS_URL,
+    SINGLEFLIGHT_LOCK_TTL,
+    SINGLEFLIGHT_RESULT_TTL,
+    ADMISSION_LIMITS,
+    ADMISSION_MAX_WAITING,
+    ADMISSION_DEADLINE,
+    ADMISSION_DEGRADE_TO_BM25,
+    CELERY_BROKER_URL,
+    CELERY_VECTOR_QUEUE,
+    VECTOR_WORKER_CONCURRENCY,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_BULK,
+    API_PRELOAD_MODEL,
+    SLOW_QUERY_THRESHOLD_MS,
+    SLOW_QUERY_LOG_PATH,
+    ADMIN_TOKEN,
+    PROFILE_DIR,
+    PROFILE_SAMPLE_INTERVAL,
+    CELERY_WAIT_THREADS,
+    GROUP_MAX_VIDEOS,
+    GROUP_MOMENTS_PER_VIDEO,
+    GROUP_PAGE_SIZE,
+    RELATED_TOP_M,
+    GROUP_CURSOR_TTL,
+    GROUP_CURSOR_REDIS_URL,
+)
+
 
 import json
+import hmac
+import functools
 from datetime import datetime
 import os
 import weaviate
 import asyncio
 import time
+import redis.asyncio as aioredis
+from concurrent.futures import ThreadPoolExecutor
+from celery.exceptions import TimeoutError as CeleryTimeoutError
+
+class FastJSONResponse(JSONResponse):
+    # orjson(설치된 경우)으로 직렬화
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
 
 app = FastAPI(
     title="침착맨 유튜브 대사 검색 API",
     description="침착맨 유튜브 영상의 대사를 검색하는 API 서버",
     version="1.0.0",
+    default_response_class=FastJSONResponse,
 )
 
 _weaviate_client = None
@@ -46,11 +117,24 @@ def close_weaviate_client():
         _weaviate_client = None
 
 
-SEARCH_HISTORY_DIR = "search_history"
-os.makedirs(SEARCH_HISTORY_DIR, exist_ok=True)
+history_log = SearchHistoryLog(
+    SEARCH_HISTORY_DIR,
+    max_queue=HISTORY_QUEUE_SIZE,
+    batch_size=HISTORY_BATCH_SIZE,
+    flush_interval=HISTORY_FLUSH_INTERVAL,
+    segment_max_bytes=HISTORY_SEGMENT_MAX_BYTES,
+    full_policy=HISTORY_FULL_POLICY,
+)
 
 
-class QueryRequest(BaseModel):
+class SearchScope(BaseModel):
+    # 검색할 채널과 게시일 범위 (지정하지 않으면 전체)
+    channel_ids: Optional[List[str]] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+
+class QueryRequest(SearchScope):
     query: str
     search_type: str = "vector"
 
@@ -60,6 +144,7 @@ class SearchResult(BaseModel):
     start_time: float
     content: str
     youtube_link: str
+    chunk_id: Optional[str] = None  # /api/related/{chunk_id}로 비슷한 장면 조회
 
 
 class SearchResponse(BaseModel):
@@ -68,134 +153,950 @@ class SearchResponse(BaseModel):
     results: List[SearchResult]
 
 
-def save_search_history(question: str, results: List[Dict[str, Any]]) -> str:
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{SEARCH_HISTORY_DIR}/search_{timestamp}.json"
+class SlimSearchResult(BaseModel):
+    # slim=true: 청크 전체 대신 질의와 맞는 부분 주변 발췌만
+    video_id: str
+    start_time: float
+    snippet: str
+
+
+class SlimSearchResponse(BaseModel):
+    timestamp: str
+    question: str
+    results: List[SlimSearchResult]
+
+
+class GroupedQueryRequest(SearchScope):
+    # cursor가 있으면 저장된 결과의 다음 페이지 (query/범위/moments는 첫 요청 값 사용)
+    query: str = ""
+    videos: int = GROUP_PAGE_SIZE  # 페이지당 영상 수
+    moments: int = GROUP_MOMENTS_PER_VIDEO  # 영상마다 장면 수
+    cursor: Optional[str] = None
+
+
+class GroupedMoment(SearchResult):
+    score: float
+
+
+class VideoGroup(BaseModel):
+    video_id: str
+    score: float  # 가장 가까운 장면의 유사도
+    hit_count: int  # 가져온 후보 중 이 영상의 청크 수
+    moments: List[GroupedMoment]
+
+
+class GroupedSearchResponse(BaseModel):
+    timestamp: str
+    question: str
+    total_videos: int
+    groups: List[VideoGroup]
+    next_cursor: Optional[str] = None
+
+
+class BatchQueryItem(SearchScope):
+    query: str
+    search_type: str = "vector"
+    k: int = 7
+
+
+class BatchQueryRequest(BaseModel):
+    queries: List[BatchQueryItem]
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    query: str
+    search_type: str
+    results: Optional[Union[List[SearchResult], List[SlimSearchResult]]] = None
+    error: Optional[str] = None
+
+
+class BatchSearchResponse(BaseModel):
+    timestamp: str
+    results: List[BatchItemResult]
+
+
+# 동일 검색 동시 실행 합치기 (Redis URL이 비어 있으면 프로세스 내에서만)
+search_flight = SingleFlight(
+    SINGLEFLIGHT_REDIS_URL or None,
+    lock_ttl=SINGLEFLIGHT_LOCK_TTL,
+    result_ttl=SINGLEFLIGHT_RESULT_TTL,
+)
+
+
+# 검색 타입별 동시 실행 제한 / 부하 차단
+admission = AdmissionController(ADMISSION_LIMITS, max_waiting=ADMISSION_MAX_WAITING)
+
 
-    history = {"timestamp": timestamp, "question": question, "results": results}
+async def monitor_broker_backlog(interval: float = 0.5):
+    """Celery 브로커 큐 길이를 주기적으로 읽어 벡터 검색 예상 대기 시간에 반영"""
+    broker = aioredis.from_url(CELERY_BROKER_URL)
+    queue_keys = broker_queue_keys(CELERY_VECTOR_QUEUE)
+    while True:
+        try:
+            # 우선순위 단계별 리스트 길이를 모두 합산
+            async with broker.pipeline(transaction=False) as pipe:
+                for key in queue_keys:
+                    pipe.llen(key)
+                backlog = sum(await pipe.execute())
+            admission.set_backlog("vector", backlog, VECTOR_WORKER_CONCURRENCY)
+        except Exception as e:
+            print(f"⚠️ 브로커 큐 길이 조회 실패: {str(e)}")
+            await asyncio.sleep(5)
+        await asyncio.sleep(interval)
 
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(history, f, ensure_ascii=False, indent=2)
 
-    return filename
+def search_response(
+    http_request: Request, payload: Dict[str, Any], headers: Dict[str, str] = None
+) -> Response:
+    """응답 모델 재검증 없이 바로 직렬화하고 Accept-Encoding에 따라 압축"""
+    body, encoding_headers = encode_body(
+        payload, http_request.headers.get("accept-encoding", "")
+    )
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={**(headers or {}), **encoding_headers},
+    )
+
+
+def output_results(results: List[Dict[str, Any]], query: str, slim: bool):
+    return slim_results(results, query) if slim else results
+
+
+def save_search_history(
+    question: str, results: List[Dict[str, Any]], search_type: str = None
+) -> bool:
+    # 큐에만 넣고 바로 반환 (파일 쓰기는 백그라운드 스레드에서)
+    return history_log.record(question, results, search_type)
+
+
+def search_scope(request: SearchScope) -> Dict[str, Any]:
+    """요청의 채널/게시일 범위를 검색 함수 인자로 (Celery로 넘길 수 있게 날짜는 ISO 문자열)"""
+    if request.date_from and request.date_to and request.date_from > request.date_to:
+        raise HTTPException(status_code=400, detail="date_from이 date_to보다 늦습니다.")
+    scope = {}
+    if request.channel_ids:
+        scope["channel_ids"] = sorted(set(request.channel_ids))
+    if request.date_from:
+        scope["date_from"] = request.date_from.isoformat()
+    if request.date_to:
+        scope["date_to"] = request.date_to.isoformat()
+    return scope
+
+
+def trace_attribute(name: str):
+    trace = tracing.current_trace()
+    return trace.attributes.get(name) if trace is not None else None
+
+
+def add_worker_profile(trace, stacks):
+    """Celery 워커가 돌려준 프로파일 스택을 트레이스에 누적 (배치는 청크마다)"""
+    if not stacks:
+        return
+    merged = trace.attributes.setdefault("worker_profile", {})
+    for stack, count in stacks.items():
+        merged[stack] = merged.get(stack, 0) + count
+
+
+def enqueue_vector_search(
+    query: str,
+    deadline: float = None,
+    scope: Dict[str, Any] = None,
+    task=search_task_vector,
+    options: Dict[str, Any] = None,
+):
+    # 트레이스 정보를 헤더로 넘겨 워커의 span이 같은 요청에 묶이도록 함
+    # 마감 시각이 지난 태스크는 브로커/워커에서 실행하지 않고 버림
+    return task.apply_async(
+        args=[query],
+        kwargs={**(scope or {}), **(options or {})},
+        headers={
+            "request_id": tracing.current_request_id(),
+            "trace_id": tracing.current_trace_id(),
+            "parent_span_id": tracing.current_span_id(),
+            "enqueued_ns": time.time_ns(),
+            "deadline": deadline,
+            # ?profile=1 요청이면 워커에서도 프로파일링
+            "profile": bool(trace_attribute("profile")),
+        },
+        priority=PRIORITY_INTERACTIVE,
+        expires=max(deadline - time.time(), 1) if deadline else None,
+    )
+
+
+# Celery 결과 대기 전용 스레드 풀: 벡터 검색 대기가 몰려도 BM25/정확 일치(기본 풀)는 계속 처리
+_celery_wait_executor = ThreadPoolExecutor(
+    max_workers=CELERY_WAIT_THREADS, thread_name_prefix="celery-wait"
+)
+
+
+async def wait_for_task(task, deadline: float = None, timeout: float = 60):
+    """Celery 태스크 결과를 마감 시각까지 기다림
+
+    마감 전에 끝나지 않으면 504, 큐에서 마감이 지나 버려진 태스크(부하 차단)는 503,
+    그 밖의 태스크 오류는 500으로 바꿉니다.
+    """
+
+    def wait():
+        # 대기 스레드를 기다린 시간도 마감에 포함
+        remaining = deadline - time.time() if deadline else timeout
+        return task.get(timeout=max(remaining, 0.1))
+
+    try:
+        task_result = await tracing.run_in_executor(_celery_wait_executor, wait)
+    except CeleryTimeoutError:
+        raise HTTPException(status_code=504, detail="검색 시간이 초과되었습니다.")
+    if isinstance(task_result, dict) and task_result.get("error"):
+        if task_result.get("expired"):
+            raise HTTPException(
+                status_code=503,
+                detail="검색 요청이 많아 처리하지 못했습니다.",
+                headers={"Retry-After": "1"},
+            )
+        raise HTTPException(status_code=500, detail=task_result["error"])
+    return task_result
+
+
+slow_queries = SlowQueryLog(SLOW_QUERY_LOG_PATH, SLOW_QUERY_THRESHOLD_MS)
+
+
+def is_admin(request: Request) -> bool:
+    token = request.headers.get("x-admin-token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def require_admin(request: Request):
+    if not is_admin(request):
+        raise HTTPException(status_code=403, detail="관리자 토큰이 필요합니다.")
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    # ?profile=1: 관리자 요청만 샘플링 프로파일러로 실행
+    profiler = None
+    if request.query_params.get("profile") == "1":
+        if not is_admin(request):
+            return JSONResponse(status_code=403, content={"detail": "관리자 토큰이 필요합니다."})
+        profiler = SamplingProfiler(PROFILE_SAMPLE_INTERVAL).start()
+
+    # X-Request-ID가 있고 형식이 맞으면 그대로 사용, 아니면 새로 발급
+    request_id = tracing.valid_request_id(request.headers.get("x-request-id"))
+    trace = tracing.start_trace(request_id)
+    trace.attributes["profile"] = profiler is not None
+    try:
+        with tracing.span("request", path=request.url.path) as request_span:
+            response = await call_next(request)
+
+            # 핸들러 종료 이후 ~ 응답 생성까지를 직렬화 구간으로 기록
+            handler_span = trace.find("handler")
+            if handler_span is not None and handler_span.end_ns is not None:
+                tracing.record_span("serialize", handler_span.end_ns, time.time_ns())
+    finally:
+        if profiler is not None:
+            profiler.stop()
+
+    response.headers["X-Request-ID"] = trace.request_id
+    if SERVER_TIMING_ENABLED or request.headers.get("x-server-timing") == "1":
+        response.headers["Server-Timing"] = trace.server_timing()
+    if profiler is not None:
+        # Celery 워커에서 수집한 스택도 합쳐서 저장
+        profiler.merge(trace.attributes.get("worker_profile"), prefix="celery_worker")
+        profiler.save(PROFILE_DIR, trace.request_id)
+        response.headers["X-Profile"] = f"/api/profile/{trace.request_id}"
+    slow_queries.maybe_record(
+        trace, request.url.path, response.status_code, request_span.duration_ms
+    )
+    tracing.finish_trace(trace)
+    return response
 
 
 @app.on_event("startup")
 def startup_event():
     get_weaviate_client()
+    start_background_warmup([t for t in WARMUP_API_SEARCH_TYPES if t])
+    asyncio.get_event_loop().create_task(monitor_broker_backlog())
+    if API_PRELOAD_MODEL:
+        # 모델은 백그라운드에서 로드하고 BM25/정확 일치 검색은 바로 처리
+        rag.load_embedding_in_background()
 
 
 @app.on_event("shutdown")
 def shutdown_event():
     close_weaviate_client()
+    history_log.close()
 
 
 @app.get("/health")
 def health_check():
     try:
         client = get_weaviate_client()
-        return {"status": "healthy", "weaviate": client.is_ready()}
+        weaviate_ready = client.is_ready()
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"서버 상태 확인 중 오류 발생: {str(e)}"
         )
 
+    # 워밍업이 끝나기 전에는 503을 반환해 로드밸런서가 트래픽을 보내지 않도록 함
+    if not warmup_state.ready:
+        return JSONResponse(
+            status_code=503,
+            content={
+                "status": "warming_up",
+                "weaviate": weaviate_ready,
+                "model": rag.embedding_status(),
+                "warmup": warmup_state.to_dict(),
+            },
+        )
+    return {
+        "status": "healthy",
+        "weaviate": weaviate_ready,
+        "model": rag.embedding_status(),
+        "warmup": warmup_state.to_dict(),
+    }
+
+
+def request_deadline(http_request: Request) -> float:
+    """요청 마감 시각 (X-Deadline-Ms 헤더가 있으면 더 짧은 쪽 사용)"""
+    budget = ADMISSION_DEADLINE
+    header = http_request.headers.get("x-deadline-ms")
+    if header:
+        try:
+            budget = min(budget, float(header) / 1000)
+        except ValueError:
+            pass
+    return time.time() + budget
+
+
+async def shared_search(key: str, search, deadline: float = None):
+    """동시에 들어온 같은 요청은 한 번만 실행 (프로파일링 요청은 직접 실행해야 스택이 잡힘)"""
+    if trace_attribute("profile"):
+        return await search()
+    return await search_flight.do(key, search, deadline)
+
+
+async def run_search(
+    query: str, search_type: str, deadline: float, scope: Dict[str, Any] = None
+):
+    # 검색 타입별 동시 실행 제한을 통과한 요청만 실행
+    return await admission.run(
+        search_type,
+        deadline,
+        lambda: _execute_search(query, search_type, deadline, scope or {}),
+    )
 
-@app.post("/api/search", response_model=SearchResponse)
-async def api_search(request: QueryRequest):
+
+async def _execute_search(
+    query: str, search_type: str, deadline: float, scope: Dict[str, Any]
+):
+    if search_type == "exact_match":
+        search_start_time = time.time()
+        with tracing.span("exact_match"):
+            results = await tracing.run_in_executor(
+                None,
+                functools.partial(search_similar_sentences_exact_match, query, **scope),
+            )
+        search_time = time.time() - search_start_time
+        print(f"Exact Match 검색 시간: {search_time:.2f}초")
+    elif search_type == "fuzzy":
+        search_start_time = time.time()
+        with tracing.span("fuzzy"):
+            try:
+                results = await tracing.run_in_executor(
+                    None, functools.partial(search_similar_sentences_fuzzy, query, **scope)
+                )
+            except RuntimeError as e:
+                # 색인이 아직 생성되지 않음
+                raise HTTPException(status_code=503, detail=str(e))
+        search_time = time.time() - search_start_time
+        print(f"오타 허용 검색 시간: {search_time:.2f}초")
+    elif search_type == "bm25":
+        search_start_time = time.time()
+        with tracing.span("bm25"):
+            results = await tracing.run_in_executor(
+                None, functools.partial(search_similar_sentences_bm25, query, **scope)
+            )
+        search_time = time.time() - search_start_time
+        print(f"BM25 검색 시간: {search_time:.2f}초")
+    else:
+        # 벡터 검색은 Celery 태스크로 처리
+        task_start_time = time.time()
+        with tracing.span("celery_task"):
+            task = enqueue_vector_search(query, deadline, scope)
+            # 마감 시각까지만 기다림 (이벤트 루프를 막지 않도록 전용 스레드에서 대기)
+            task_result = await wait_for_task(task, deadline)
+        task_time = time.time() - task_start_time
+        print(f"Celery 태스크 처리 시간: {task_time:.2f}초")
+
+        trace = tracing.current_trace()
+        if trace is not None:
+            trace.extend(task_result.get("spans"))
+            add_worker_profile(trace, task_result.get("profile"))
+        results = task_result["results"]
+
+    return results
+
+
+@app.post("/api/search", response_model=Union[SearchResponse, SlimSearchResponse])
+async def api_search(request: QueryRequest, http_request: Request, slim: bool = False):
     total_start_time = time.time()
-    try:
-        if request.search_type == "exact_match":
-            search_start_time = time.time()
-            results = search_similar_sentences_exact_match(request.query)
-            search_time = time.time() - search_start_time
-            print(f"Exact Match 검색 시간: {search_time:.2f}초")
-        elif request.search_type == "bm25":
-            search_start_time = time.time()
-            results = search_similar_sentences_bm25(request.query)
-            search_time = time.time() - search_start_time
-            print(f"BM25 검색 시간: {search_time:.2f}초")
+    deadline = request_deadline(http_request)
+    headers = {}
+    tracing.annotate(query=request.query, search_type=request.search_type)
+    with tracing.span("handler", search_type=request.search_type):
+        try:
+            # 동시에 들어온 같은 요청은 한 번만 실행하고 결과 공유
+            scope = search_scope(request)
+            key = make_key(request.query, request.search_type, scope=scope)
+            try:
+                results = await shared_search(
+                    key,
+                    lambda: run_search(
+                        request.query, request.search_type, deadline, scope
+                    ),
+                    deadline,
+                )
+            except AdmissionRejected as e:
+                if not (ADMISSION_DEGRADE_TO_BM25 and request.search_type == "vector"):
+                    raise HTTPException(
+                        status_code=e.status_code,
+                        detail=e.reason,
+                        headers={"Retry-After": str(e.retry_after)},
+                    )
+                # 벡터 경로가 포화 상태면 BM25 결과로 대신 응답
+                print(f"⚠️ 벡터 검색 포화로 BM25로 대체: {e.reason}")
+                results = await shared_search(
+                    make_key(request.query, "bm25", scope=scope),
+                    lambda: run_search(request.query, "bm25", deadline, scope),
+                    deadline,
+                )
+                headers["X-Search-Degraded"] = "bm25"
+                tracing.annotate(search_type="bm25(degraded)")
+
+            tracing.annotate(result_count=len(results))
+            if not results:
+                raise HTTPException(status_code=404, detail="검색 결과가 없습니다.")
+
+            # 검색 결과 저장
+            save_start_time = time.time()
+            with tracing.span("save_history"):
+                save_search_history(request.query, results, request.search_type)
+            save_time = time.time() - save_start_time
+            print(f"검색 결과 저장 시간: {save_time:.2f}초")
+
+            total_time = time.time() - total_start_time
+            print(f"\n=== API 엔드포인트 총 소요 시간: {total_time:.2f}초 ===\n")
+
+            return search_response(
+                http_request,
+                {
+                    "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+                    "question": request.query,
+                    "results": output_results(results, request.query, slim),
+                },
+                headers,
+            )
+
+        except HTTPException:
+            # 404, 429/503(부하 차단) 등은 상태 코드를 그대로 전달
+            raise
+        except Exception as e:
+            total_time = time.time() - total_start_time
+            print(
+                f"\n=== API 엔드포인트 오류 발생 - 총 소요 시간: {total_time:.2f}초 ===\n"
+            )
+            raise HTTPException(
+                status_code=500, detail=f"검색 중 오류가 발생했습니다: {str(e)}"
+            )
+
+
+@app.post(
+    "/api/search_no_celery", response_model=Union[SearchResponse, SlimSearchResponse]
+)
+async def api_search_no_celery(
+    request: QueryRequest, http_request: Request, slim: bool = False
+):
+    total_start_time = time.time()
+    tracing.annotate(query=request.query, search_type=request.search_type)
+    with tracing.span("handler", search_type=request.search_type):
+        try:
+            if request.search_type == "vector_no_celery":
+                if rag.embedding_status() == "loading":
+                    raise HTTPException(
+                        status_code=503,
+                        detail="임베딩 모델을 로드하는 중입니다.",
+                        headers={"Retry-After": "5"},
+                    )
+                # 벡터 검색을 직접 실행 (Celery 없이)
+                search_start_time = time.time()
+                with tracing.span("vector_search"):
+                    results = await search_similar_sentences(
+                        request.query, **search_scope(request)
+                    )
+                search_time = time.time() - search_start_time
+                print(f"벡터 검색 시간 (Celery 없음): {search_time:.2f}초")
+            else:
+                raise HTTPException(status_code=400, detail="잘못된 검색 타입입니다.")
+
+            tracing.annotate(result_count=len(results))
+            if not results:
+                raise HTTPException(status_code=404, detail="검색 결과가 없습니다.")
+
+            # 검색 결과 저장
+            save_start_time = time.time()
+            with tracing.span("save_history"):
+                save_search_history(request.query, results, request.search_type)
+            save_time = time.time() - save_start_time
+            print(f"검색 결과 저장 시간: {save_time:.2f}초")
+
+            total_time = time.time() - total_start_time
+            print(
+                f"\n=== API 엔드포인트 총 소요 시간 (Celery 없음): {total_time:.2f}초 ===\n"
+            )
+
+            return search_response(
+                http_request,
+                {
+                    "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+                    "question": request.query,
+                    "results": output_results(results, request.query, slim),
+                },
+            )
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            total_time = time.time() - total_start_time
+            print(
+                f"\n=== API 엔드포인트 오류 발생 - 총 소요 시간: {total_time:.2f}초 ===\n"
+            )
+            raise HTTPException(
+                status_code=500, detail=f"검색 중 오류가 발생했습니다: {str(e)}"
+            )
+
+
+def _stream_event(stage: str, payload: Dict[str, Any], fmt: str) -> str:
+    data = dumps({"stage": stage, **payload}).decode("utf-8")
+    if fmt == "sse":
+        return f"event: {stage}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+async def _search_stages(
+    query: str, fmt: str, scope: Dict[str, Any], slim: bool = False, deadline: float = None
+):
+    """빠른 단계(exact/BM25)부터 끝나는 대로 결과를 내보내고, 이어서 벡터/타임스탬프 보정"""
+    start = time.time()
+    seen = set()
+    collected = {}
+
+    def fresh(results):
+        # 앞 단계에서 이미 보낸 결과는 제외
+        new = []
+        for r in results:
+            key = (r["video_id"], r["start_time"])
+            if key not in seen:
+                seen.add(key)
+                new.append(r)
+        return new
+
+    async def run_vector():
+        task = enqueue_vector_search(query, deadline, scope)
+        try:
+            task_result = await wait_for_task(task, deadline)
+        except HTTPException as e:
+            raise RuntimeError(e.detail)
+        return task_result["results"]
+
+    stages = {
+        asyncio.ensure_future(
+            tracing.run_in_executor(
+                None,
+                functools.partial(search_similar_sentences_exact_match, query, **scope),
+            )
+        ): "exact_match",
+        asyncio.ensure_future(
+            tracing.run_in_executor(
+                None, functools.partial(search_similar_sentences_bm25, query, **scope)
+            )
+        ): "bm25",
+        asyncio.ensure_future(run_vector()): "vector",
+    }
+
+    pending = set(stages)
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            stage = stages[future]
+            elapsed_ms = (time.time() - start) * 1000
+            try:
+                results = future.result()
+            except Exception as e:
+                yield _stream_event(stage, {"error": str(e), "elapsed_ms": elapsed_ms}, fmt)
+                continue
+            collected[stage] = results
+            yield _stream_event(
+                stage,
+                {"results": output_results(fresh(results), query, slim), "elapsed_ms": elapsed_ms},
+                fmt,
+            )
+
+    # 벡터 결과의 시작 시각을 자막 세그먼트 단위로 보정
+    vector_results = collected.get("vector") or []
+    refined = await tracing.run_in_executor(
+        None, lambda: [refine_start_time(r, query) for r in vector_results]
+    )
+    refined = [r for r in refined if r is not None]
+    if refined:
+        yield _stream_event(
+            "refine",
+            {
+                "results": output_results(refined, query, slim),
+                "elapsed_ms": (time.time() - start) * 1000,
+            },
+            fmt,
+        )
+
+    all_results = vector_results or collected.get("bm25") or collected.get("exact_match") or []
+    if all_results:
+        save_search_history(query, all_results, "stream")
+    yield _stream_event(
+        "done",
+        {"total": len(seen), "elapsed_ms": (time.time() - start) * 1000},
+        fmt,
+    )
+
+
+@app.post("/api/search/stream")
+async def api_search_stream(
+    request: QueryRequest, http_request: Request, format: str = "ndjson", slim: bool = False
+):
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format은 ndjson 또는 sse만 가능합니다.")
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    scope = search_scope(request)
+    return StreamingResponse(
+        _search_stages(request.query, format, scope, slim, request_deadline(http_request)),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _run_vector_batch(indexed_items):
+    """벡터 질의들을 청크 단위 Celery 태스크로 보내 청크마다 한 번에 임베딩"""
+    outputs = {}
+
+    async def run_chunk(chunk):
+        task = search_task_vector_batch.apply_async(
+            args=[
+                [
+                    {"query": item.query, "k": item.k, "scope": search_scope(item)}
+                    for _, item in chunk
+                ]
+            ],
+            headers={
+                "request_id": tracing.current_request_id(),
+                "trace_id": tracing.current_trace_id(),
+                "parent_span_id": tracing.current_span_id(),
+                "enqueued_ns": time.time_ns(),
+                "profile": bool(trace_attribute("profile")),
+            },
+            # 대량 질의는 대화형 검색보다 뒤에 처리
+            priority=PRIORITY_BULK,
+        )
+        try:
+            task_result = await wait_for_task(task, timeout=120)
+        except HTTPException as e:
+            task_result = {"error": e.detail}
+        except Exception as e:
+            task_result = {"error": str(e)}
+
+        if task_result.get("error"):
+            for index, _ in chunk:
+                outputs[index] = {"error": task_result["error"]}
+            return
+        trace = tracing.current_trace()
+        if trace is not None:
+            trace.extend(task_result.get("spans"))
+            add_worker_profile(trace, task_result.get("profile"))
+        for (index, _), output in zip(chunk, task_result["outputs"]):
+            outputs[index] = output
+
+    chunks = [
+        indexed_items[i : i + BATCH_VECTOR_CHUNK_SIZE]
+        for i in range(0, len(indexed_items), BATCH_VECTOR_CHUNK_SIZE)
+    ]
+    await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+    return outputs
+
+
+# 영상별로 묶은 검색 결과 (다음 페이지는 커서로 저장된 결과에서 읽음)
+grouped_cursors = CursorStore(GROUP_CURSOR_REDIS_URL or None, ttl=GROUP_CURSOR_TTL)
+
+
+async def run_grouped_search(
+    query: str, moments: int, deadline: float, scope: Dict[str, Any]
+):
+    with tracing.span("celery_task"):
+        task = enqueue_vector_search(
+            query, deadline, scope, search_task_vector_grouped, {"moments": moments}
+        )
+        task_result = await wait_for_task(task, deadline)
+
+    trace = tracing.current_trace()
+    if trace is not None:
+        trace.extend(task_result.get("spans"))
+        add_worker_profile(trace, task_result.get("profile"))
+    return task_result["groups"]
+
+
+@app.post("/api/search/grouped", response_model=GroupedSearchResponse)
+async def api_search_grouped(request: GroupedQueryRequest, http_request: Request):
+    """영상별로 묶은 검색. 첫 요청에서 한 번 검색해 전체 묶음을 저장하고, next_cursor로 다음 영상들을 받음"""
+    videos = max(1, min(request.videos, GROUP_MAX_VIDEOS))
+    tracing.annotate(query=request.query, search_type="grouped")
+    with tracing.span("handler", search_type="grouped"):
+        if request.cursor:
+            decoded = decode_cursor(request.cursor)
+            if decoded is None:
+                raise HTTPException(status_code=400, detail="잘못된 커서입니다.")
+            result_id, offset = decoded
+            with tracing.span("cursor_load"):
+                stored = await grouped_cursors.load(result_id)
+            if stored is None:
+                raise HTTPException(
+                    status_code=410, detail="커서가 만료되었습니다. 다시 검색하세요."
+                )
         else:
-            # 벡터 검색은 Celery 태스크로 처리
-            task_start_time = time.time()
-            task = search_task_vector.delay(request.query)
-            # 최대 50초 정도 기다림
-            results = task.get(timeout=50)
-            task_time = time.time() - task_start_time
-            print(f"Celery 태스크 처리 시간: {task_time:.2f}초")
-
-            if isinstance(results, dict) and results.get("error"):
-                raise HTTPException(status_code=500, detail=results["error"])
-
-        if not results:
-            raise HTTPException(status_code=404, detail="검색 결과가 없습니다.")
-
-        # 검색 결과 저장
-        save_start_time = time.time()
-        save_search_history(request.query, results)
-        save_time = time.time() - save_start_time
-        print(f"검색 결과 저장 시간: {save_time:.2f}초")
-
-        total_time = time.time() - total_start_time
-        print(f"\n=== API 엔드포인트 총 소요 시간: {total_time:.2f}초 ===\n")
-
-        return {
-            "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
-            "question": request.query,
-            "results": results,
-        }
+            if not request.query.strip():
+                raise HTTPException(status_code=400, detail="검색어가 비어 있습니다.")
+            scope = search_scope(request)
+            moments = max(1, min(request.moments, 10))
+            deadline = request_deadline(http_request)
+            try:
+                groups = await shared_search(
+                    make_key(request.query, "grouped", moments, scope),
+                    lambda: admission.run(
+                        "vector",
+                        deadline,
+                        lambda: run_grouped_search(request.query, moments, deadline, scope),
+                    ),
+                    deadline,
+                )
+            except AdmissionRejected as e:
+                raise HTTPException(
+                    status_code=e.status_code,
+                    detail=e.reason,
+                    headers={"Retry-After": str(e.retry_after)},
+                )
+            if not groups:
+                raise HTTPException(status_code=404, detail="검색 결과가 없습니다.")
+            stored = {"question": request.query, "groups": groups}
+            with tracing.span("cursor_save"):
+                result_id = await grouped_cursors.save(stored)
+            offset = 0
+            with tracing.span("save_history"):
+                save_search_history(
+                    request.query, [group["moments"][0] for group in groups], "grouped"
+                )
 
-    except Exception as e:
-        total_time = time.time() - total_start_time
-        print(
-            f"\n=== API 엔드포인트 오류 발생 - 총 소요 시간: {total_time:.2f}초 ===\n"
+        groups = stored["groups"]
+        next_offset = offset + videos
+        tracing.annotate(result_count=len(groups[offset:next_offset]))
+        return search_response(
+            http_request,
+            {
+                "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+                "question": stored["question"],
+                "total_videos": len(groups),
+                "groups": groups[offset:next_offset],
+                "next_cursor": (
+                    encode_cursor(result_id, next_offset) if next_offset < len(groups) else None
+                ),
+            },
         )
+
+
+@app.post("/api/search/batch", response_model=BatchSearchResponse)
+async def api_search_batch(
+    request: BatchQueryRequest, http_request: Request, slim: bool = False
+):
+    if len(request.queries) > BATCH_MAX_ITEMS:
         raise HTTPException(
-            status_code=500, detail=f"검색 중 오류가 발생했습니다: {str(e)}"
+            status_code=413,
+            detail=f"한 번에 최대 {BATCH_MAX_ITEMS}개까지 검색할 수 있습니다.",
         )
 
-
-@app.post("/api/search_no_celery", response_model=SearchResponse)
-async def api_search_no_celery(request: QueryRequest):
     total_start_time = time.time()
-    try:
-        if request.search_type == "vector_no_celery":
-            # 벡터 검색을 직접 실행 (Celery 없이)
-            search_start_time = time.time()
-            results = await search_similar_sentences(request.query)
-            search_time = time.time() - search_start_time
-            print(f"벡터 검색 시간 (Celery 없음): {search_time:.2f}초")
+    tracing.annotate(
+        search_type="batch",
+        query=" | ".join(item.query for item in request.queries[:5]),
+        result_count=len(request.queries),
+    )
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+    lexical_search = {
+        "bm25": search_similar_sentences_bm25,
+        "exact_match": search_similar_sentences_exact_match,
+        "fuzzy": search_similar_sentences_fuzzy,
+    }
+
+    async def run_lexical(item):
+        async with semaphore:
+            try:
+                results = await tracing.run_in_executor(
+                    None,
+                    functools.partial(
+                        lexical_search[item.search_type],
+                        item.query,
+                        item.k,
+                        **search_scope(item),
+                    ),
+                )
+                return {"results": results}
+            except Exception as e:
+                return {"error": str(e)}
+
+    vector_items = []
+    lexical_futures = {}
+    outputs = {}
+    for index, item in enumerate(request.queries):
+        try:
+            search_scope(item)
+        except HTTPException as e:
+            outputs[index] = {"error": e.detail}
+            continue
+        if item.search_type in lexical_search:
+            lexical_futures[index] = run_lexical(item)
+        elif item.search_type == "vector":
+            vector_items.append((index, item))
         else:
-            raise HTTPException(status_code=400, detail="잘못된 검색 타입입니다.")
+            outputs[index] = {"error": f"잘못된 검색 타입입니다: {item.search_type}"}
 
-        if not results:
-            raise HTTPException(status_code=404, detail="검색 결과가 없습니다.")
+    with tracing.span("batch", size=len(request.queries)):
+        lexical_results, vector_outputs = await asyncio.gather(
+            asyncio.gather(*lexical_futures.values()),
+            _run_vector_batch(vector_items),
+        )
+    outputs.update(zip(lexical_futures.keys(), lexical_results))
+    outputs.update(vector_outputs)
 
-        # 검색 결과 저장
-        save_start_time = time.time()
-        save_search_history(request.query, results)
-        save_time = time.time() - save_start_time
-        print(f"검색 결과 저장 시간: {save_time:.2f}초")
+    total_time = time.time() - total_start_time
+    print(
+        f"\n=== 배치 검색 {len(request.queries)}건 총 소요 시간: {total_time:.2f}초 ===\n"
+    )
 
-        total_time = time.time() - total_start_time
-        print(
-            f"\n=== API 엔드포인트 총 소요 시간 (Celery 없음): {total_time:.2f}초 ===\n"
+    items = []
+    for index, item in enumerate(request.queries):
+        output = outputs.get(index, {"error": "결과가 없습니다."})
+        if slim and output.get("results"):
+            output = {"results": slim_results(output["results"], item.query)}
+        items.append(
+            {"index": index, "query": item.query, "search_type": item.search_type, **output}
         )
 
-        return {
-            "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
-            "question": request.query,
-            "results": results,
-        }
+    return search_response(
+        http_request,
+        {"timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"), "results": items},
+    )
+
+
+@app.get("/api/history/recent")
+def get_recent_history(limit: int = 20):
+    return {"results": history_log.recent(limit)}
+
+
+@app.get("/api/history/popular")
+def get_popular_history(limit: int = 20):
+    return {
+        "results": [
+            {"question": question, "count": count}
+            for question, count in history_log.popular(limit)
+        ],
+        "stats": history_log.stats(),
+    }
+
+
+# 연결은 첫 조회 때 맺음
+semantic_stats_redis = (
+    aioredis.from_url(SEMANTIC_CACHE_STATS_REDIS_URL) if SEMANTIC_CACHE_STATS_REDIS_URL else None
+)
+
 
+async def load_worker_semantic_cache_stats() -> List[Dict[str, Any]]:
+    """Celery 워커 프로세스들이 올린 시맨틱 캐시 통계"""
+    if semantic_stats_redis is None:
+        return []
+    try:
+        raw = await semantic_stats_redis.hgetall("semantic_cache:stats")
     except Exception as e:
-        total_time = time.time() - total_start_time
-        print(
-            f"\n=== API 엔드포인트 오류 발생 - 총 소요 시간: {total_time:.2f}초 ===\n"
-        )
-        raise HTTPException(
-            status_code=500, detail=f"검색 중 오류가 발생했습니다: {str(e)}"
-        )
+        print(f"⚠️ 시맨틱 캐시 통계 조회 실패: {str(e)}")
+        return []
+    workers, stale = split_stale_stats(raw)
+    if stale:
+        # 하트비트가 끊긴(종료된) 워커 프로세스의 통계는 합산하지 않고 정리
+        try:
+            await semantic_stats_redis.hdel("semantic_cache:stats", *stale)
+        except Exception:
+            pass
+    return workers
+
+
+@app.get("/api/metrics")
+async def get_metrics():
+    workers = await load_worker_semantic_cache_stats()
+    local = rag.semantic_cache.to_dict()
+    return {
+        "singleflight": search_flight.stats.to_dict(),
+        "admission": admission.stats(),
+        "replicas": rag.replica_stats(),
+        "semantic_cache": {
+            "api": local,
+            "workers": workers,
+            "total": merge_stats([local] + workers),
+        },
+    }
+
+
+@app.get("/api/slow_queries")
+def get_slow_queries(request: Request, limit: int = 50):
+    require_admin(request)
+    return {"threshold_ms": slow_queries.threshold_ms, "entries": slow_queries.latest(limit)}
+
+
+@app.get("/api/profile/{request_id}", response_class=PlainTextResponse)
+def get_profile(request_id: str, request: Request):
+    """?profile=1 요청의 collapsed stack (flamegraph.pl, speedscope 등에서 열 수 있음)"""
+    require_admin(request)
+    profile = load_profile(PROFILE_DIR, request_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="프로파일을 찾을 수 없습니다.")
+    return profile
+
+
+@app.get("/api/related/{chunk_id}")
+def get_related_moments(chunk_id: str, k: int = 10):
+    """미리 계산한 관련 장면 그래프 조회 (임베딩/벡터 검색 없이 바로 응답)"""
+    # 청크마다 RELATED_TOP_M개까지만 저장되어 있음
+    k = max(1, min(k, RELATED_TOP_M))
+    try:
+        found = rag.find_related_moments(chunk_id, k)
+    except RuntimeError as e:
+        # 그래프가 아직 생성되지 않음
+        raise HTTPException(status_code=503, detail=str(e))
+    if found is None:
+        raise HTTPException(status_code=404, detail="관련 장면 그래프에 없는 청크입니다.")
+    source, results = found
+    return {"chunk_id": chunk_id, "source": source, "results": results}
+
+
+@app.get("/api/trace/{request_id}")
+def get_request_trace(request_id: str, request: Request):
+    # 다른 사용자의 질의 내용이 담기므로 관리자만 조회
+    require_admin(request)
+    trace = tracing.get_trace(request_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="트레이스를 찾을 수 없습니다.")
+    return trace.to_otlp()
 
 
 @app.get("/")
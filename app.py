@@ -1,30 +1,258 @@
 import streamlit as st
 import requests
 import json
+import time
+import threading
+from collections import OrderedDict
 from datetime import datetime
 import os
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from history import SearchHistoryLog
 
 # from config import API_URL  # config에서 API_URL import
 
 # API 서버 URL을 config에서 가져옴
 API_URL = "http://203.252.147.202:8200/api/search"  # 이 줄 제거
+STREAM_API_URL = f"{API_URL}/stream"
 
-# 검색 기록을 저장할 디렉토리 생성
+# 검색 기록을 저장할 디렉토리
 SEARCH_HISTORY_DIR = "search_history"
-os.makedirs(SEARCH_HISTORY_DIR, exist_ok=True)
 
+# 한 페이지에 표시할 결과 수와 검색 결과 캐시 유지 시간(초)
+PAGE_SIZE = 5
+RESULT_CACHE_TTL = 300
+
+
+@st.cache_resource
+def get_http_session():
+    """모든 사용자 세션이 함께 쓰는 커넥션 풀 (매 검색마다 TCP 연결을 새로 맺지 않음)"""
+    session = requests.Session()
+    retry = Retry(
+        total=2,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=None,  # 검색은 읽기 전용이라 POST도 재시도
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class ResultCache:
+    """스트리밍으로 받은 검색 결과 캐시 ((검색어, 검색 타입) 기준, TTL/LRU)"""
+
+    def __init__(self, ttl, max_entries=500):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, results = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return results
+
+    def put(self, key, results):
+        with self._lock:
+            self._entries[key] = (time.time(), results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+@st.cache_resource
+def get_result_cache():
+    return ResultCache(RESULT_CACHE_TTL)
+
+
+def normalize_question(question):
+    return " ".join(question.split())
+
+
+@st.cache_data(ttl=RESULT_CACHE_TTL, max_entries=500, show_spinner=False)
+def fetch_search(question, search_type):
+    """검색 API 호출 (같은 검색어/타입은 캐시된 결과 사용, 실패는 캐시하지 않음)"""
+    response = get_http_session().post(
+        API_URL, json={"query": question, "search_type": search_type}, timeout=60
+    )
+    if response.status_code != 200:
+        raise RuntimeError(response.json().get("detail", response.text))
+    results = response.json()["results"]
+    count_session("backend_hits")
+    save_search_history(question, results, search_type)
+    return results
+
+
+@st.cache_data(show_spinner=False)
+def load_example_results():
+    with open("example_result.json", "r", encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def count_session(metric):
+    """세션별 백엔드 요청/캐시 사용 횟수"""
+    st.session_state[metric] = st.session_state.get(metric, 0) + 1
+
+
+@st.cache_resource
+def get_history_log():
+    """검색 기록 로그 (스크립트 재실행 사이에 하나의 인스턴스만 유지)"""
+    return SearchHistoryLog(SEARCH_HISTORY_DIR)
+
+
+def save_search_history(question, results, search_type=None):
+    """검색 기록을 백그라운드 로그에 추가"""
+    return get_history_log().record(question, results, search_type)
+
+
+def thumbnail_url(video_id):
+    return f"https://i.ytimg.com/vi/{video_id}/mqdefault.jpg"
+
+
+def play(key):
+    st.session_state["playing"] = key
+
+
+def set_page(page_state, page):
+    st.session_state[page_state] = page
+
+
+def render_result(i, result, key_prefix=None):
+    """검색 결과 카드 (썸네일만 표시하고 재생 버튼을 눌렀을 때만 플레이어 로드)
 
-def save_search_history(question, results):
-    """검색 기록을 JSON 파일로 저장"""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{SEARCH_HISTORY_DIR}/search_{timestamp}.json"
+    key_prefix가 없으면 버튼 없는 카드로 그림 (스트리밍 중 같은 자리를 다시 그릴 때)
+    """
+    st.markdown("---")
+    st.markdown(f"### 결과 {i}")
+
+    player_key = f"{result['video_id']}:{result['start_time']}"
+    if key_prefix and st.session_state.get("playing") == player_key:
+        st.video(result["youtube_link"], start_time=int(result["start_time"]))
+    else:
+        st.image(thumbnail_url(result["video_id"]), width=320)
+        if key_prefix:
+            st.button(
+                "▶ 영상 재생",
+                key=f"{key_prefix}:play:{i}:{player_key}",
+                on_click=play,
+                args=(player_key,),
+            )
+
+    # 자막 내용과 타임스탬프 링크
+    st.markdown(
+        f"**⏱️ [타임스탬프: {result['start_time']}초]"
+        f"({result['youtube_link']})**"
+    )
+    st.markdown(f"> {result['content']}")
+    if result.get("matched_terms"):
+        st.markdown(f"**매칭된 단어:** {', '.join(result['matched_terms'])}")
+
+
+def render_results_page(results, key_prefix):
+    """결과를 PAGE_SIZE개씩 나눠 현재 페이지만 표시"""
+    pages = max((len(results) + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+    page_state = f"{key_prefix}:page"
+    page = min(st.session_state.get(page_state, 1), pages)
+
+    start = (page - 1) * PAGE_SIZE
+    for i, result in enumerate(results[start : start + PAGE_SIZE], start + 1):
+        with st.container():
+            render_result(i, result, key_prefix)
+
+    if pages > 1:
+        prev_col, info_col, next_col = st.columns([1, 2, 1])
+        # 콜백에서 페이지를 바꾸면 다시 실행될 때 바로 반영됨
+        prev_col.button(
+            "◀ 이전",
+            key=f"{key_prefix}:prev",
+            disabled=page <= 1,
+            on_click=set_page,
+            args=(page_state, page - 1),
+        )
+        info_col.markdown(f"<center>{page} / {pages} 페이지</center>", unsafe_allow_html=True)
+        next_col.button(
+            "다음 ▶",
+            key=f"{key_prefix}:next",
+            disabled=page >= pages,
+            on_click=set_page,
+            args=(page_state, page + 1),
+        )
 
-    history = {"timestamp": timestamp, "question": question, "results": results}
 
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(history, f, ensure_ascii=False, indent=2)
+STAGE_LABELS = {
+    "exact_match": "정확히 일치하는 대사",
+    "bm25": "키워드가 일치하는 대사",
+    "vector": "의미가 비슷한 대사",
+    "refine": "타임스탬프 보정",
+}
+
+
+def stream_search(question):
+    """스트리밍 검색 API의 단계별 결과를 도착하는 대로 화면에 표시
+
+    첫 페이지 분량만 그리고, 나머지는 스트림이 끝난 뒤 페이지로 나눠 표시
+    """
+    response = get_http_session().post(
+        STREAM_API_URL,
+        json={"query": question, "search_type": "vector"},
+        stream=True,
+        timeout=60,
+    )
+    response.raise_for_status()
+
+    status = st.empty()
+    slots = {}  # (video_id, start_time) -> 결과를 다시 그릴 자리 (첫 페이지만)
+    positions = {}  # (video_id, start_time) -> 결과 번호
+    results = []
+
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            continue
+        event = json.loads(line)
+        stage = event["stage"]
+        if stage == "done":
+            break
+        if event.get("error"):
+            status.warning(f"{STAGE_LABELS.get(stage, stage)} 검색 실패: {event['error']}")
+            continue
+
+        if stage == "refine":
+            # 보정된 타임스탬프로 기존 결과 자리를 다시 그림
+            for refined in event["results"]:
+                key = (refined["video_id"], refined["original_start_time"])
+                if key in positions:
+                    index = positions[key]
+                    results[index - 1] = refined
+                    if key in slots:
+                        with slots[key].container():
+                            render_result(index, refined)
+        else:
+            for result in event["results"]:
+                results.append(result)
+                key = (result["video_id"], result["start_time"])
+                positions[key] = len(results)
+                if len(results) <= PAGE_SIZE:
+                    slots[key] = st.empty()
+                    with slots[key].container():
+                        render_result(len(results), result)
+
+        status.info(
+            f"{STAGE_LABELS.get(stage, stage)}: {len(event['results'])}개 "
+            f"({event['elapsed_ms']:.0f}ms)"
+        )
 
-    return filename
+    status.empty()
+    return results
 
 
 st.set_page_config(page_title="침착맨 유튜브 대사 검색", page_icon="🔍", layout="wide")
@@ -74,26 +302,9 @@ with st.expander("📺 예시 검색 결과 보기"):
     """
     )
 
-    # example_result.json 파일에서 예시 검색 결과 불러오기
+    # example_result.json은 한 번만 읽고 캐시
     try:
-        with open("example_result.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-            example_results = data["results"]
-
-            for i, result in enumerate(example_results, 1):
-                with st.container():
-                    st.markdown("---")
-                    st.markdown(f"### 결과 {i}")
-
-                    # YouTube 영상 삽입
-                    st.video(result["youtube_link"])
-
-                    # 자막 내용과 타임스탬프 링크
-                    st.markdown(
-                        f"**⏱️ [타임스탬프: {result['start_time']}초]"
-                        f"({result['youtube_link']})**"
-                    )
-                    st.markdown(f"> {result['content']}")
+        render_results_page(load_example_results(), "example")
     except Exception as e:
         st.error(f"예시 검색 결과를 불러오는 중 오류가 발생했습니다: {str(e)}")
 
@@ -101,8 +312,8 @@ st.markdown("---")
 
 search_type = st.radio(
     "검색 방식 선택",
-    ["대사 기반 검색", "단어 기반 검색"],
-    help="벡터 검색은 의미 기반으로, BM25 검색은 키워드 기반으로, 정확한 단어 매칭 검색은 모든 단어가 포함된 문장만 검색합니다.",
+    ["대사 기반 검색", "단어 기반 검색", "오타 허용 검색"],
+    help="벡터 검색은 의미 기반으로, BM25 검색은 키워드 기반으로, 정확한 단어 매칭 검색은 모든 단어가 포함된 문장만 검색합니다. 오타 허용 검색은 자막의 받아쓰기 오류나 띄어쓰기가 달라도 비슷한 구간을 찾습니다.",
     key="search_type_radio",
 )
 
@@ -119,55 +330,53 @@ if st.button("검색하기"):
     pass
 
 if question:
+    render_start = time.time()
     try:
         # 검색 타입 매핑
         search_type_map = {
             "대사 기반 검색": "vector",
             "단어 기반 검색": "bm25",
+            "오타 허용 검색": "fuzzy",
         }
+        api_search_type = search_type_map[search_type]
+        query = normalize_question(question)
+        key_prefix = f"search:{api_search_type}:{query}"
+        st.info(f"사용된 검색 방식: {search_type}")
+
+        if api_search_type == "vector":
+            # 대사 기반 검색은 빠른 결과부터 단계별로 받아서 바로 표시
+            # (페이지 이동/재생 버튼으로 다시 실행될 때는 캐시된 결과 사용)
+            result_cache = get_result_cache()
+            results = result_cache.get((query, api_search_type))
+            if results is None:
+                count_session("backend_hits")
+                stream_area = st.empty()
+                with stream_area.container():
+                    results = stream_search(query)
+                stream_area.empty()
+                if results:
+                    # 검색 기록은 API 스트림 엔드포인트에서 남김 (여기서 또 남기면 두 번 집계됨)
+                    result_cache.put((query, api_search_type), results)
+            else:
+                count_session("cache_hits")
+        else:
+            hits_before = st.session_state.get("backend_hits", 0)
+            results = fetch_search(query, api_search_type)
+            # 캐시 미스일 때만 fetch_search 본문이 실행되어 backend_hits가 늘어남
+            if st.session_state.get("backend_hits", 0) == hits_before:
+                count_session("cache_hits")
 
-        # API 호출
-        response = requests.post(
-            API_URL,
-            json={"query": question, "search_type": search_type_map[search_type]},
-        )
-
-        if response.status_code == 200:
-            data = response.json()
-            results = data["results"]
-
+        if results:
             st.success(f"검색 결과: {len(results)}개의 관련 영상을 찾았습니다.")
-            st.info(f"사용된 검색 방식: {search_type}")
-
-            # 검색 결과 저장
-            saved_file = save_search_history(question, results)
-
-            # 결과 표시
-            for i, result in enumerate(results, 1):
-                with st.container():
-                    st.markdown("---")
-                    st.markdown(f"### 결과 {i}")
-
-                    # YouTube 영상 삽입
-                    st.video(result["youtube_link"])
-
-                    # 자막 내용과 타임스탬프 링크
-                    st.markdown(
-                        f"**⏱️ [타임스탬프: {result['start_time']}초]"
-                        f"({result['youtube_link']})**"
-                    )
-                    st.markdown(f"> {result['content']}")
-
-                    # 정확한 단어 매칭 검색인 경우 매칭된 단어 표시
-                    if (
-                        search_type == "정확한 단어 매칭 검색"
-                        and "matched_terms" in result
-                    ):
-                        st.markdown(
-                            f"**매칭된 단어:** {', '.join(result['matched_terms'])}"
-                        )
+            render_results_page(results, key_prefix)
         else:
-            st.error(f"검색 실패: {response.json()['detail']}")
+            st.error("검색 실패: 검색 결과가 없습니다.")
 
     except Exception as e:
         st.error(f"API 요청 중 오류가 발생했습니다: {str(e)}")
+
+    st.caption(
+        f"화면 구성 {(time.time() - render_start) * 1000:.0f}ms · "
+        f"이번 세션 백엔드 요청 {st.session_state.get('backend_hits', 0)}회, "
+        f"캐시 사용 {st.session_state.get('cache_hits', 0)}회"
+    )
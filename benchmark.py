@@ -0,0 +1,1090 @@
+"""로컬에서 재현 가능한 벤치마크 스위트
+
+실제 Weaviate/모델 없이 인메모리 Weaviate 대역과 결정적 스텁 임베딩으로
+검색 경로의 순수 오버헤드와 전처리 함수들을 측정합니다.
+
+    python benchmark.py run                       # 스텁 임베딩으로 전체 실행
+    python benchmark.py run --real-model          # 실제 임베딩 모델 포함
+    python benchmark.py run --output baseline.json
+    python benchmark.py compare baseline.json benchmark_results/bench_xxx.json
+    python benchmark.py queue                     # Celery 큐 구성별 대기 시간 시뮬레이션
+    python benchmark.py channels --channels 1,4,16   # 채널 수에 따른 채널 범위 검색 지연
+    python benchmark.py fuzzy                     # 오타 허용 검색 지연/recall
+    python benchmark.py related                   # 관련 장면 그래프 생성/조회
+    python benchmark.py grouped                   # 영상별로 묶은 검색과 커서 페이지
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+from collections import deque
+from datetime import datetime, timedelta
+
+import rag
+from config import CHUNK_SIZE, CHUNK_OVERLAP, DIVERSIFY_OVERFETCH
+from diversify import diversify
+from index_pointer import active_collection_name
+from fake_weaviate import FakeWeaviateClient, StubEmbedding
+
+BENCHMARK_RESULTS_DIR = "benchmark_results"
+
+# 합성 코퍼스에 사용할 어휘 (test_performance.TEST_QUERIES 기반)
+VOCABULARY = (
+    "다른 사람이 이기는 걸 좋아해 봐 그럼 아빠도 행복할걸 이거 진짜 웃기네 "
+    "아 화나네 이게 뭐야 와 대박이다 어떻게 하는 거야 어렵다 재미있다 신기하다 좋다 "
+    "오락실 계단 막고 서있는 무서운 형님들 이야기 영상 뇌이징 어메이징"
+).split()
+
+BENCH_QUERIES = [
+    "다른 사람이 이기는 걸 좋아해 봐.. 그럼 아빠도 행복할걸?",
+    "이거 진짜 웃기네",
+    "와 진짜 대박이다",
+    "이거 어떻게 하는 거야",
+    "오락실 계단을 막고 서있는 무서운 형님들",
+]
+
+
+def percentile(values, q):
+    """선형 보간 백분위수 (q: 0~100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100
+    lower = int(pos)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+def summarize(samples_ms):
+    return {
+        "n": len(samples_ms),
+        "mean_ms": sum(samples_ms) / len(samples_ms) if samples_ms else 0.0,
+        "min_ms": min(samples_ms) if samples_ms else 0.0,
+        "p50_ms": percentile(samples_ms, 50),
+        "p90_ms": percentile(samples_ms, 90),
+        "p95_ms": percentile(samples_ms, 95),
+        "p99_ms": percentile(samples_ms, 99),
+        "max_ms": max(samples_ms) if samples_ms else 0.0,
+    }
+
+
+def measure(func, iterations, warmup=3):
+    """func를 반복 실행해 호출당 소요 시간(ms) 목록 반환 (출력은 버림)"""
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            func()
+        for _ in range(iterations):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def measure_concurrent(func, iterations, concurrency, warmup=3):
+    """concurrency개 스레드에서 동시에 func를 실행해 호출당 소요 시간(ms) 목록 반환"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    def timed(_):
+        start = time.perf_counter()
+        func()
+        return (time.perf_counter() - start) * 1000
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            func()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(timed, range(iterations)))
+
+
+def build_corpus(num_videos=50, segments_per_video=400, seed=42):
+    """결정적 합성 자막 코퍼스 생성 (video_id -> 세그먼트 목록)"""
+    rng = random.Random(seed)
+    corpus = {}
+    for v in range(num_videos):
+        video_id = f"vid{v:05d}"
+        segments = []
+        start = 0.0
+        for _ in range(segments_per_video):
+            duration = round(rng.uniform(1.0, 4.0), 2)
+            text = " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(3, 9)))
+            segments.append({"text": text, "start": round(start, 2), "duration": duration})
+            start += duration
+        corpus[video_id] = segments
+    return corpus
+
+
+def corpus_items(corpus, channel_id, published_from=datetime(2024, 1, 1)):
+    """코퍼스를 10개 세그먼트 단위 청크로 묶은 Weaviate 객체 속성 목록 (영상마다 하루씩 게시일 증가)"""
+    items = []
+    for v, (video_id, segments) in enumerate(corpus.items()):
+        published_at = (published_from + timedelta(days=v)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        for i in range(0, len(segments), 10):
+            group = segments[i : i + 10]
+            items.append(
+                {
+                    "content": " ".join(seg["text"] for seg in group),
+                    "channel_id": channel_id,
+                    "video_id": video_id,
+                    "published_at": published_at,
+                    "start": group[0]["start"],
+                    "end": group[-1]["start"],
+                }
+            )
+    return items
+
+
+def build_fake_client(corpus, embedding, channel_id="UC_BENCH", latency=0.0):
+    """코퍼스를 가짜 Weaviate에 적재"""
+    client = FakeWeaviateClient(latency=latency)
+    client.add_objects(active_collection_name(), corpus_items(corpus, channel_id), embedding)
+    return client
+
+
+def channel_id_for(index):
+    return f"UC_BENCH_{index:04d}"
+
+
+def build_channel_client(num_channels, videos, segments, embedding, tenancy, seed=42):
+    """채널 num_channels개를 한 컬렉션(채널 필터) 또는 채널별 테넌트로 적재"""
+    client = FakeWeaviateClient()
+    if tenancy:
+        client.collections.create(active_collection_name(), multi_tenancy_config=True)
+    items = []
+    for c in range(num_channels):
+        corpus = build_corpus(videos, segments, seed + c)
+        corpus = {f"{channel_id_for(c)}_{vid}": segs for vid, segs in corpus.items()}
+        items.extend(corpus_items(corpus, channel_id_for(c)))
+    client.add_objects(active_collection_name(), items, embedding)
+    return client
+
+
+def run_micro_benchmarks(corpus, iterations):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from database import convert_segments_to_docs
+    from history import SearchHistoryLog
+
+    results = {}
+    video_id, segments = next(iter(corpus.items()))
+
+    results["micro.convert_segments_to_docs"] = summarize(
+        measure(lambda: convert_segments_to_docs("UC_BENCH", video_id, segments), iterations)
+    )
+
+    docs = convert_segments_to_docs("UC_BENCH", video_id, segments)
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+    )
+    results["micro.split_documents"] = summarize(
+        measure(lambda: splitter.split_documents(docs), iterations)
+    )
+
+    props = [
+        {"video_id": d.metadata["video_id"], "start": d.metadata["start"], "content": d.page_content}
+        for d in docs[:7]
+    ]
+    results["micro.format_results"] = summarize(
+        measure(lambda: [rag.format_result(p) for p in props], iterations)
+    )
+
+    formatted = [rag.format_result(p) for p in props]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        history_log = SearchHistoryLog(tmpdir, max_queue=iterations * 2)
+        try:
+            results["micro.save_search_history"] = summarize(
+                measure(lambda: history_log.record(BENCH_QUERIES[0], formatted, "vector"), iterations)
+            )
+        finally:
+            history_log.close()
+
+    return results
+
+
+def run_search_benchmarks(client, embedding, iterations, prefix):
+    rag.set_search_backend(lambda: client, lambda: embedding)
+    queries = iter(BENCH_QUERIES * (iterations + 10))
+    results = {}
+    try:
+        results[f"{prefix}.vector"] = summarize(
+            measure(lambda: asyncio.run(rag.search_similar_sentences(next(queries))), iterations)
+        )
+        results[f"{prefix}.bm25"] = summarize(
+            measure(lambda: rag.search_similar_sentences_bm25(next(queries)), iterations)
+        )
+        results[f"{prefix}.exact_match"] = summarize(
+            measure(lambda: rag.search_similar_sentences_exact_match("진짜 대박이다"), iterations)
+        )
+        results[f"{prefix}.encode"] = summarize(
+            measure(lambda: embedding.embed_query(next(queries)), iterations)
+        )
+
+        # 후보 k * DIVERSIFY_OVERFETCH개에 대한 중복 제거 단계만
+        vector = embedding.embed_query(BENCH_QUERIES[0])
+        candidates = rag.scoped_near_vector_search(
+            rag.scoped_collections(client), vector, 7 * DIVERSIFY_OVERFETCH, include_vector=True
+        )
+        results[f"{prefix}.diversify"] = summarize(
+            measure(lambda: diversify(candidates, vector, 7), iterations)
+        )
+    finally:
+        rag.set_search_backend()
+    return results
+
+
+# 큐 대기 시간 시뮬레이션 시나리오
+#   prefetch: 프로세스당 미리 예약하는 태스크 수 (실행 중인 태스크 포함)
+#   priority: 공용 큐에서 대화형 태스크를 먼저 꺼내는지 여부
+#   dedicated: 대화형 큐 전용으로 떼어 둔 프로세스 수 (0이면 모두 공용 큐)
+QUEUE_SCENARIOS = {
+    "shared_prefetch4": {"prefetch": 4, "priority": False, "dedicated": 0},
+    "shared_prefetch1": {"prefetch": 1, "priority": False, "dedicated": 0},
+    "priority_prefetch1": {"prefetch": 1, "priority": True, "dedicated": 0},
+    "dedicated_queues": {"prefetch": 1, "priority": True, "dedicated": 2},
+}
+
+
+def build_task_arrivals(duration, seed, interactive_rate=4.0, interactive_service=0.25,
+                        bulk_interval=20.0, bulk_burst=4, bulk_service=6.0):
+    """대화형 단건 검색(포아송 도착)과 주기적으로 몰려오는 배치 검색 태스크 목록"""
+    rng = random.Random(seed)
+    arrivals = []
+    t = 0.0
+    while True:
+        t += rng.expovariate(interactive_rate)
+        if t >= duration:
+            break
+        arrivals.append((t, "interactive", rng.expovariate(1 / interactive_service)))
+    burst_at = 0.0
+    while burst_at < duration:
+        for _ in range(bulk_burst):
+            arrivals.append((burst_at, "bulk", bulk_service * rng.uniform(0.8, 1.2)))
+        burst_at += bulk_interval
+    arrivals.sort(key=lambda a: a[0])
+    return arrivals
+
+
+def simulate_queue_wait(arrivals, workers, prefetch, priority, dedicated, tick=0.005):
+    """워커 프로세스의 예약(prefetch)과 큐 구성에 따른 태스크별 큐 대기 시간(ms)"""
+    queues = {"interactive": deque(), "bulk": deque()}
+    procs = [
+        {
+            "kinds": ["interactive"] if i < dedicated else (
+                ["bulk"] if dedicated else ["interactive", "bulk"]
+            ),
+            "reserved": deque(),
+            "busy_until": 0.0,
+            "running": False,
+        }
+        for i in range(workers)
+    ]
+    waits = {"interactive": [], "bulk": []}
+    pending = deque(arrivals)
+    now = 0.0
+
+    def pull(kinds):
+        heads = [kind for kind in kinds if queues[kind]]
+        if not heads:
+            return None
+        if not priority:
+            # 우선순위가 없으면 도착 순서(FIFO)대로
+            heads.sort(key=lambda kind: queues[kind][0][0])
+        return queues[heads[0]].popleft()
+
+    while pending or any(queues.values()) or any(p["reserved"] or p["running"] for p in procs):
+        while pending and pending[0][0] <= now:
+            arrival = pending.popleft()
+            queues[arrival[1]].append(arrival)
+
+        for proc in procs:
+            if proc["running"] and proc["busy_until"] <= now:
+                proc["running"] = False
+            while len(proc["reserved"]) + proc["running"] < prefetch:
+                task = pull(proc["kinds"])
+                if task is None:
+                    break
+                proc["reserved"].append(task)
+            if not proc["running"] and proc["reserved"]:
+                arrived_at, kind, service = proc["reserved"].popleft()
+                waits[kind].append((now - arrived_at) * 1000)
+                proc["busy_until"] = now + service
+                proc["running"] = True
+        now += tick
+    return waits
+
+
+def run_queue_benchmark(args):
+    arrivals = build_task_arrivals(args.duration, args.seed)
+    scenarios = {}
+    for name, scenario in QUEUE_SCENARIOS.items():
+        waits = simulate_queue_wait(arrivals, args.workers, **scenario)
+        scenarios[name] = {
+            "config": scenario,
+            "interactive": summarize(waits["interactive"]),
+            "bulk": summarize(waits["bulk"]),
+        }
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "git_revision": git_revision(),
+            "duration": args.duration,
+            "workers": args.workers,
+            "seed": args.seed,
+            "tasks": len(arrivals),
+        },
+        "scenarios": scenarios,
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs(BENCHMARK_RESULTS_DIR, exist_ok=True)
+        output = f"{BENCHMARK_RESULTS_DIR}/queue_{report['meta']['timestamp']}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"\n{'시나리오':<22}{'대화형 p50':>12}{'대화형 p95':>12}{'대화형 p99':>12}{'배치 p50':>12}")
+    for name, stats in scenarios.items():
+        inter, bulk = stats["interactive"], stats["bulk"]
+        print(
+            f"{name:<22}{inter['p50_ms']:>12.1f}{inter['p95_ms']:>12.1f}"
+            f"{inter['p99_ms']:>12.1f}{bulk['p50_ms']:>12.1f}"
+        )
+    print(f"\n결과가 저장되었습니다: {output}")
+    return report
+
+
+def run_channel_benchmarks(args):
+    """채널 수를 늘려가며 한 채널로 범위를 좁힌 검색의 지연 시간 측정"""
+    stub = StubEmbedding()
+    channel_counts = [int(n) for n in args.channels.split(",")]
+    scope = {"channel_ids": [channel_id_for(0)], "date_from": "2024-01-01T00:00:00Z"}
+    queries = iter(BENCH_QUERIES * (args.iterations + 10) * len(channel_counts) * 4)
+    results = {}
+    original_tenancy = rag.CHANNEL_TENANCY
+
+    try:
+        for mode in ("filter", "tenant"):
+            rag.CHANNEL_TENANCY = mode == "tenant"
+            for count in channel_counts:
+                client = build_channel_client(
+                    count, args.videos, args.segments, stub, rag.CHANNEL_TENANCY, args.seed
+                )
+                rag._tenant_cache.clear()
+                rag.set_search_backend(lambda: client, lambda: stub)
+                results[f"channels.{mode}.{count}.vector"] = summarize(
+                    measure(
+                        lambda: asyncio.run(
+                            rag.search_similar_sentences(next(queries), **scope)
+                        ),
+                        args.iterations,
+                    )
+                )
+                results[f"channels.{mode}.{count}.bm25"] = summarize(
+                    measure(
+                        lambda: rag.search_similar_sentences_bm25(next(queries), **scope),
+                        args.iterations,
+                    )
+                )
+    finally:
+        rag.CHANNEL_TENANCY = original_tenancy
+        rag._tenant_cache.clear()
+        rag.set_search_backend()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "git_revision": git_revision(),
+            "iterations": args.iterations,
+            "channels": channel_counts,
+            "corpus_per_channel": {"videos": args.videos, "segments_per_video": args.segments},
+        },
+        "benchmarks": results,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(BENCHMARK_RESULTS_DIR, exist_ok=True)
+        output = f"{BENCHMARK_RESULTS_DIR}/channels_{report['meta']['timestamp']}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"\n{'벤치마크':<36}{'p50(ms)':>10}{'p95(ms)':>10}")
+    for name, stats in results.items():
+        print(f"{name:<36}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}")
+    for mode in ("filter", "tenant"):
+        first = results[f"channels.{mode}.{channel_counts[0]}.vector"]["p50_ms"]
+        last = results[f"channels.{mode}.{channel_counts[-1]}.vector"]["p50_ms"]
+        print(
+            f"{mode}: 채널 {channel_counts[0]}→{channel_counts[-1]}개일 때 벡터 검색 p50 "
+            f"{last / first if first else 0:.2f}배"
+        )
+    print(f"\n결과가 저장되었습니다: {output}")
+    return report
+
+
+# 헤지 지연(p95)을 추정할 표본이 쌓이도록 측정 전에 실행하는 횟수
+REPLICA_WARMUP = 50
+
+
+def run_replica_benchmark(args):
+    """복제본 라우팅/헤지 구성별 검색 지연 (복제본마다 가끔 긴 멈춤을 주입)"""
+    from replicas import ReplicaSet
+
+    stub = StubEmbedding()
+    corpus = build_corpus(args.videos, args.segments, args.seed)
+    latency, jitter, stall = args.latency_ms / 1000, args.jitter_ms / 1000, args.stall_ms / 1000
+    primary = build_fake_client(corpus, stub)
+
+    def make_replicas():
+        return [
+            primary.replica(latency, jitter, args.stall_rate, stall, seed=args.seed + i)
+            for i in range(args.replicas)
+        ]
+
+    def replica_set(hedge):
+        return ReplicaSet(
+            [(f"fake{i}", client) for i, client in enumerate(make_replicas())],
+            hedge=hedge,
+            min_delay=0.001,
+            max_delay=0.2,
+        )
+
+    scenarios = {
+        "single": lambda: make_replicas()[0],
+        "least_outstanding": lambda: replica_set(hedge=False),
+        "hedged": lambda: replica_set(hedge=True),
+    }
+
+    queries = iter(BENCH_QUERIES * (args.iterations + 10) * len(scenarios) * 2)
+    results = {}
+    replica_report = {}
+    try:
+        for name, factory in scenarios.items():
+            backend = factory()
+            rag.set_search_backend(lambda: backend, lambda: stub)
+            results[f"replicas.{name}.vector"] = summarize(
+                measure_concurrent(
+                    lambda: asyncio.run(rag.search_similar_sentences(next(queries))),
+                    args.iterations,
+                    args.concurrency,
+                    warmup=REPLICA_WARMUP,
+                )
+            )
+            results[f"replicas.{name}.bm25"] = summarize(
+                measure_concurrent(
+                    lambda: rag.search_similar_sentences_bm25(next(queries)),
+                    args.iterations,
+                    args.concurrency,
+                    warmup=REPLICA_WARMUP,
+                )
+            )
+            if isinstance(backend, ReplicaSet):
+                replica_report[name] = backend.to_dict()
+                backend.shutdown()
+    finally:
+        rag.set_search_backend()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "git_revision": git_revision(),
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "replicas": args.replicas,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "stall_rate": args.stall_rate,
+            "stall_ms": args.stall_ms,
+        },
+        "benchmarks": results,
+        "replica_sets": replica_report,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(BENCHMARK_RESULTS_DIR, exist_ok=True)
+        output = f"{BENCHMARK_RESULTS_DIR}/replicas_{report['meta']['timestamp']}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"\n{'벤치마크':<36}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    for name, stats in results.items():
+        print(f"{name:<36}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}")
+    for name, stats in replica_report.items():
+        print(f"{name}: 헤지 {stats['hedged']}회 (헤지 쪽 승리 {stats['hedge_wins']}회)")
+    print(f"\n결과가 저장되었습니다: {output}")
+    return report
+
+
+def build_varied_corpus(num_videos, segments_per_video, seed=42, extra_words=3000):
+    """VOCABULARY에 무작위 음절 단어를 섞어 n-gram 분포가 실제 자막처럼 퍼지게 한 코퍼스"""
+    rng = random.Random(seed)
+    words = list(VOCABULARY) + [
+        "".join(chr(0xAC00 + rng.randrange(11172)) for _ in range(rng.randint(1, 4)))
+        for _ in range(extra_words)
+    ]
+    corpus = {}
+    for v in range(num_videos):
+        segments = []
+        start = 0.0
+        for _ in range(segments_per_video):
+            duration = round(rng.uniform(1.0, 4.0), 2)
+            text = " ".join(rng.choice(words) for _ in range(rng.randint(3, 9)))
+            segments.append({"text": text, "start": round(start, 2), "duration": duration})
+            start += duration
+        corpus[f"vid{v:05d}"] = segments
+    return corpus
+
+
+def add_caption_typos(text, typos, rng):
+    """음절의 중성/종성을 바꿔 자동 자막 오인식 흉내 (공백도 무작위로 제거)"""
+    chars = list(text)
+    hangul = [i for i, c in enumerate(chars) if 0xAC00 <= ord(c) <= 0xD7A3]
+    for i in rng.sample(hangul, min(typos, len(hangul))):
+        offset = ord(chars[i]) - 0xAC00
+        cho, jung, jong = offset // 588, (offset % 588) // 28, offset % 28
+        if rng.random() < 0.5:
+            jung = (jung + rng.choice((-1, 1))) % 21
+        else:
+            jong = 0 if jong else rng.randrange(1, 28)
+        chars[i] = chr(0xAC00 + cho * 588 + jung * 28 + jong)
+    return "".join(c for c in chars if c != " " or rng.random() < 0.5)
+
+
+def run_fuzzy_benchmark(args):
+    """오타 허용 검색: 오인식을 넣은 질의로 지연 시간과 recall@k를 LIKE 방식과 비교"""
+    from fuzzy_index import FuzzyIndex
+
+    corpus = build_varied_corpus(args.videos, args.segments, args.seed)
+    start = time.perf_counter()
+    index = FuzzyIndex.build(corpus.items(), n=args.ngram)
+    build_seconds = time.perf_counter() - start
+
+    # 질의: 임의 세그먼트에서 시작하는 구간 (다음 세그먼트로 넘어갈 수도 있음)
+    rng = random.Random(args.seed)
+    video_ids = list(corpus)
+    cases = []
+    for _ in range(args.iterations):
+        video_id = rng.choice(video_ids)
+        segments = corpus[video_id]
+        i = rng.randrange(len(segments) - 1)
+        words = (segments[i]["text"] + " " + segments[i + 1]["text"]).split()
+        first = rng.randrange(min(3, len(segments[i]["text"].split())))
+        phrase = " ".join(words[first : first + rng.randint(3, 5)])
+        cases.append((video_id, segments[i]["start"], phrase, add_caption_typos(phrase, args.typos, rng)))
+
+    def found(results, video_id, start_time):
+        return any(r["video_id"] == video_id and r["start"] == start_time for r in results)
+
+    def like_search(query):
+        # exact_match와 같은 조건: 공백으로 나눈 단어가 모두 포함된 세그먼트
+        terms = query.split()
+        return [
+            {"video_id": vid, "start": seg["start"]}
+            for vid, segments in corpus.items()
+            for seg in segments
+            if all(term in seg["text"] for term in terms)
+        ][: args.k]
+
+    results = {}
+    for label, use_typos in (("clean", False), ("typos", True)):
+        samples, hits, like_hits = [], 0, 0
+        for video_id, start_time, phrase, noisy in cases:
+            query = noisy if use_typos else phrase
+            begin = time.perf_counter()
+            found_results = index.search(query, args.k, max_error_rate=args.max_error_rate)
+            samples.append((time.perf_counter() - begin) * 1000)
+            hits += found(found_results, video_id, start_time)
+            if args.like_baseline:
+                like_hits += found(like_search(query), video_id, start_time)
+        stats = summarize(samples)
+        stats["recall_at_k"] = hits / len(cases)
+        if args.like_baseline:
+            stats["like_recall_at_k"] = like_hits / len(cases)
+        results[f"fuzzy.{label}"] = stats
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "git_revision": git_revision(),
+            "iterations": args.iterations,
+            "videos": args.videos,
+            "segments": index.num_segments,
+            "ngrams": len(index.vocab),
+            "postings": int(len(index.postings)),
+            "build_seconds": round(build_seconds, 2),
+            "typos": args.typos,
+            "max_error_rate": args.max_error_rate,
+        },
+        "benchmarks": results,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(BENCHMARK_RESULTS_DIR, exist_ok=True)
+        output = f"{BENCHMARK_RESULTS_DIR}/fuzzy_{report['meta']['timestamp']}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(
+        f"\n색인: 세그먼트 {index.num_segments}개, n-gram {len(index.vocab)}종, "
+        f"생성 {build_seconds:.1f}초"
+    )
+    print(f"{'벤치마크':<16}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'recall':>10}{'LIKE':>10}")
+    for name, stats in results.items():
+        like = stats.get("like_recall_at_k")
+        print(
+            f"{name:<16}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}"
+            f"{stats['recall_at_k']:>10.2f}{'-' if like is None else f'{like:.2f}':>10}"
+        )
+    print(f"\n결과가 저장되었습니다: {output}")
+    return report
+
+
+def run_related_benchmark(args):
+    """관련 장면: 그래프 생성(전체/증분) 시간과, 그래프 조회 vs 청크 내용으로 다시 벡터 검색하는 지연"""
+    import related_graph
+
+    stub = StubEmbedding(dim=args.dim)
+    corpus = build_corpus(args.videos, args.segments, args.seed)
+    client = build_fake_client(corpus, stub)
+    collection = client.collections.get(active_collection_name())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, "related_graph")
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            graph = related_graph.build_graph(directory, client=client, m=args.m)
+            full_seconds = time.perf_counter() - start
+
+            # 영상 추가 후 증분 갱신
+            added = build_corpus(args.added_videos, args.segments, args.seed + 1)
+            added = {f"new_{vid}": segs for vid, segs in added.items()}
+            client.add_objects(active_collection_name(), corpus_items(added, "UC_BENCH"), stub)
+            start = time.perf_counter()
+            graph = related_graph.build_graph(directory, client=client, m=args.m)
+            incremental_seconds = time.perf_counter() - start
+        graph_bytes = sum(
+            os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+        )
+
+        rng = random.Random(args.seed)
+        objects = collection.objects
+        samples = [rng.choice(objects) for _ in range(args.iterations)]
+        picks = iter(samples * 2)
+        results = {
+            "related.graph_lookup": summarize(
+                measure(lambda: graph.related(next(picks).uuid, args.k), args.iterations, warmup=0)
+            ),
+        }
+        picks = iter(samples * 2)
+
+        def vector_requery():
+            # 지금 방식: 청크 내용을 질의로 다시 임베딩하고 벡터 검색
+            obj = next(picks)
+            vector = stub.embed_query(obj.properties["content"])
+            return rag.near_vector_search(collection, vector, args.k + 1)
+
+        results["related.vector_requery"] = summarize(
+            measure(vector_requery, args.iterations, warmup=0)
+        )
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "git_revision": git_revision(),
+            "iterations": args.iterations,
+            "chunks": graph.num_chunks,
+            "m": args.m,
+            "dim": args.dim,
+            "full_build_seconds": round(full_seconds, 3),
+            "incremental_build_seconds": round(incremental_seconds, 3),
+            "added_videos": args.added_videos,
+            "graph_bytes": graph_bytes,
+        },
+        "benchmarks": results,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(BENCHMARK_RESULTS_DIR, exist_ok=True)
+        output = f"{BENCHMARK_RESULTS_DIR}/related_{report['meta']['timestamp']}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    meta = report["meta"]
+    print(
+        f"\n그래프: 청크 {meta['chunks']}개, 이웃 {args.m}개, {graph_bytes / meta['chunks']:.0f}바이트/청크, "
+        f"전체 생성 {full_seconds:.2f}초, 영상 {args.added_videos}개 추가 후 증분 {incremental_seconds:.2f}초"
+    )
+    print(f"{'벤치마크':<26}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    for name, stats in results.items():
+        print(f"{name:<26}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}")
+    print(f"\n결과가 저장되었습니다: {output}")
+    return report
+
+
+def run_grouped_benchmark(args):
+    """영상별로 묶은 검색: 첫 페이지(검색 + 묶기) vs 커서로 다음 페이지, 결과에 나온 영상 수"""
+    from grouping import CursorStore, encode_cursor, decode_cursor
+
+    stub = StubEmbedding()
+    corpus = build_corpus(args.videos, args.segments, args.seed)
+    client = build_fake_client(corpus, stub)
+    rag.set_search_backend(lambda: client, lambda: stub)
+    store = CursorStore(None)
+    queries = iter(BENCH_QUERIES * (args.iterations + 10) * 2)
+    loop = asyncio.new_event_loop()
+    distinct = {"flat": [], "grouped": []}
+
+    async def first_page():
+        question = next(queries)
+        groups = await rag.search_similar_sentences_grouped(question, args.moments)
+        result_id = await store.save({"question": question, "groups": groups})
+        distinct["grouped"].append(len(groups[: args.page_size]))
+        return encode_cursor(result_id, args.page_size)
+
+    cursors = []
+
+    async def next_page(cursor):
+        result_id, offset = decode_cursor(cursor)
+        stored = await store.load(result_id)
+        return stored["groups"][offset : offset + args.page_size]
+
+    async def flat_search():
+        results = await rag.search_similar_sentences(next(queries))
+        distinct["flat"].append(len({r["video_id"] for r in results}))
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = {
+                "grouped.first_page": summarize(
+                    measure(lambda: cursors.append(loop.run_until_complete(first_page())), args.iterations)
+                ),
+            }
+            pages = iter(cursors * 2)
+            results["grouped.next_page"] = summarize(
+                measure(lambda: loop.run_until_complete(next_page(next(pages))), args.iterations)
+            )
+            results["flat.search"] = summarize(
+                measure(lambda: loop.run_until_complete(flat_search()), args.iterations)
+            )
+    finally:
+        loop.close()
+        rag.set_search_backend()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "git_revision": git_revision(),
+            "iterations": args.iterations,
+            "videos": args.videos,
+            "page_size": args.page_size,
+            "moments": args.moments,
+            "flat_distinct_videos": sum(distinct["flat"]) / max(len(distinct["flat"]), 1),
+            "grouped_videos_per_page": sum(distinct["grouped"]) / max(len(distinct["grouped"]), 1),
+        },
+        "benchmarks": results,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(BENCHMARK_RESULTS_DIR, exist_ok=True)
+        output = f"{BENCHMARK_RESULTS_DIR}/grouped_{report['meta']['timestamp']}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    meta = report["meta"]
+    print(
+        f"\n결과에 나온 영상 수: 평범한 검색 {meta['flat_distinct_videos']:.1f}개, "
+        f"묶은 검색 페이지당 {meta['grouped_videos_per_page']:.1f}개"
+    )
+    print(f"{'벤치마크':<22}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    for name, stats in results.items():
+        print(f"{name:<22}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}")
+    print(f"\n결과가 저장되었습니다: {output}")
+    return report
+
+
+def build_search_payload(corpus, k=7, content_chars=None):
+    """검색 응답과 같은 모양의 payload (content_chars를 주면 청크 본문을 그 길이로 늘림)"""
+    items = corpus_items(corpus, "UC_BENCH")[:k]
+    results = []
+    for item in items:
+        content = item["content"]
+        if content_chars:
+            content = (content + " ") * (content_chars // (len(content) + 1) + 1)
+            content = content[:content_chars]
+        results.append(
+            rag.format_result({"video_id": item["video_id"], "start": item["start"], "content": content})
+        )
+    return {"timestamp": "20240101_000000", "question": BENCH_QUERIES[0], "results": results}
+
+
+def run_serialization_benchmark(args):
+    """응답 직렬화 방식별 CPU 시간과 전송 바이트 수"""
+    import serialization
+
+    corpus = build_corpus(5, 200, args.seed)
+    encodings = [None, *serialization.supported_encodings()]
+    variants = {
+        "stdlib": lambda p: json.dumps(p, ensure_ascii=False).encode("utf-8"),
+        "fast": serialization.dumps,
+        "fast_slim": lambda p: serialization.dumps(
+            {**p, "results": serialization.slim_results(p["results"], p["question"])}
+        ),
+    }
+
+    results = {}
+    for size_name, content_chars in (("corpus", None), ("max_chunk", CHUNK_SIZE)):
+        payload = build_search_payload(corpus, content_chars=content_chars)
+        for variant, encode in variants.items():
+            for encoding in encodings:
+                name = f"serialize.{size_name}.{variant}.{encoding or 'identity'}"
+                stats = summarize(
+                    measure(lambda: serialization.compress(encode(payload), encoding), args.iterations)
+                )
+                stats["bytes"] = len(serialization.compress(encode(payload), encoding))
+                results[name] = stats
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "git_revision": git_revision(),
+            "iterations": args.iterations,
+            "orjson": serialization.orjson is not None,
+            "brotli": serialization.brotli is not None,
+        },
+        "benchmarks": results,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(BENCHMARK_RESULTS_DIR, exist_ok=True)
+        output = f"{BENCHMARK_RESULTS_DIR}/serialize_{report['meta']['timestamp']}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"\n{'벤치마크':<44}{'p50(ms)':>10}{'p95(ms)':>10}{'bytes':>10}")
+    for name, stats in results.items():
+        print(f"{name:<44}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['bytes']:>10}")
+    print(f"\n결과가 저장되었습니다: {output}")
+    return report
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def run_suite(args):
+    corpus = build_corpus(args.videos, args.segments, args.seed)
+    stub = StubEmbedding()
+
+    benchmarks = {}
+    if not args.skip_micro:
+        benchmarks.update(run_micro_benchmarks(corpus, args.iterations))
+
+    stub_client = build_fake_client(corpus, stub, latency=args.latency_ms / 1000)
+    benchmarks.update(run_search_benchmarks(stub_client, stub, args.iterations, "stub"))
+
+    if args.real_model:
+        # 모델 로딩 시간은 제외하고 질의 처리만 측정
+        with contextlib.redirect_stdout(io.StringIO()):
+            embedding = rag.init_embedding()
+        real_client = build_fake_client(corpus, embedding, latency=args.latency_ms / 1000)
+        benchmarks.update(
+            run_search_benchmarks(real_client, embedding, args.iterations, "real_model")
+        )
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "corpus": {"videos": args.videos, "segments_per_video": args.segments, "seed": args.seed},
+            "fake_latency_ms": args.latency_ms,
+            "real_model": args.real_model,
+        },
+        "benchmarks": benchmarks,
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs(BENCHMARK_RESULTS_DIR, exist_ok=True)
+        output = f"{BENCHMARK_RESULTS_DIR}/bench_{report['meta']['timestamp']}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"\n{'벤치마크':<36}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    for name, stats in benchmarks.items():
+        print(f"{name:<36}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}")
+    print(f"\n결과가 저장되었습니다: {output}")
+    return report
+
+
+def compare_reports(baseline, current, threshold=0.10, metrics=("p50_ms", "p95_ms")):
+    """기준 리포트 대비 threshold 비율 이상 느려진 항목 목록 반환"""
+    regressions = []
+    for name, base_stats in baseline["benchmarks"].items():
+        cur_stats = current["benchmarks"].get(name)
+        if cur_stats is None:
+            continue
+        for metric in metrics:
+            base, cur = base_stats[metric], cur_stats[metric]
+            if base > 0 and cur > base * (1 + threshold):
+                regressions.append(
+                    {"benchmark": name, "metric": metric, "baseline": base, "current": cur, "ratio": cur / base}
+                )
+    return regressions
+
+
+def run_compare(args):
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, "r", encoding="utf-8") as f:
+        current = json.load(f)
+
+    print(f"\n{'벤치마크':<36}{'기준 p50':>10}{'현재 p50':>10}{'변화':>9}")
+    for name, base_stats in baseline["benchmarks"].items():
+        cur_stats = current["benchmarks"].get(name)
+        if cur_stats is None:
+            print(f"{name:<36}{base_stats['p50_ms']:>10.3f}{'-':>10}{'누락':>9}")
+            continue
+        base, cur = base_stats["p50_ms"], cur_stats["p50_ms"]
+        change = (cur / base - 1) * 100 if base > 0 else 0.0
+        print(f"{name:<36}{base:>10.3f}{cur:>10.3f}{change:>8.1f}%")
+
+    regressions = compare_reports(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n❌ 성능 저하 감지 (허용치 {args.threshold*100:.0f}%):")
+        for r in regressions:
+            print(f"- {r['benchmark']} {r['metric']}: {r['baseline']:.3f}ms → {r['current']:.3f}ms ({r['ratio']:.2f}x)")
+        return 1
+
+    print("\n✅ 성능 저하 없음")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="youtube-rag-search 로컬 벤치마크")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="벤치마크 실행")
+    run.add_argument("--iterations", type=int, default=200)
+    run.add_argument("--videos", type=int, default=50)
+    run.add_argument("--segments", type=int, default=400)
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--latency-ms", type=float, default=0.0, help="가짜 Weaviate 응답 지연")
+    run.add_argument("--real-model", action="store_true", help="실제 임베딩 모델로도 측정")
+    run.add_argument("--skip-micro", action="store_true", help="마이크로 벤치마크 생략")
+    run.add_argument("--output", help="리포트 저장 경로")
+
+    compare = sub.add_parser("compare", help="기준 리포트와 비교")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.10)
+
+    queue = sub.add_parser("queue", help="Celery 큐 구성별 대기 시간 시뮬레이션")
+    queue.add_argument("--duration", type=float, default=300.0, help="시뮬레이션 시간(초)")
+    queue.add_argument("--workers", type=int, default=4, help="워커 프로세스 수")
+    queue.add_argument("--seed", type=int, default=42)
+    queue.add_argument("--output", help="리포트 저장 경로")
+
+    channels = sub.add_parser("channels", help="채널 수에 따른 채널 범위 검색 지연 측정")
+    channels.add_argument("--channels", default="1,4,16", help="채널 수 목록 (쉼표 구분)")
+    channels.add_argument("--iterations", type=int, default=50)
+    channels.add_argument("--videos", type=int, default=5, help="채널당 영상 수")
+    channels.add_argument("--segments", type=int, default=200)
+    channels.add_argument("--seed", type=int, default=42)
+    channels.add_argument("--output", help="리포트 저장 경로")
+
+    serialize = sub.add_parser("serialize", help="응답 직렬화/압축 방식별 CPU 시간과 크기")
+    serialize.add_argument("--iterations", type=int, default=500)
+    serialize.add_argument("--seed", type=int, default=42)
+    serialize.add_argument("--output", help="리포트 저장 경로")
+
+    replicas = sub.add_parser("replicas", help="복제본 라우팅/헤지 요청 구성별 검색 지연")
+    replicas.add_argument("--replicas", type=int, default=3)
+    replicas.add_argument("--iterations", type=int, default=300)
+    replicas.add_argument("--concurrency", type=int, default=4)
+    replicas.add_argument("--videos", type=int, default=10)
+    replicas.add_argument("--segments", type=int, default=200)
+    replicas.add_argument("--latency-ms", type=float, default=5.0, help="복제본 기본 응답 지연")
+    replicas.add_argument("--jitter-ms", type=float, default=2.0)
+    replicas.add_argument("--stall-rate", type=float, default=0.03, help="긴 멈춤이 일어날 확률")
+    replicas.add_argument("--stall-ms", type=float, default=150.0, help="긴 멈춤 길이")
+    replicas.add_argument("--seed", type=int, default=42)
+    replicas.add_argument("--output", help="리포트 저장 경로")
+
+    fuzzy = sub.add_parser("fuzzy", help="오타 허용 검색 지연 시간과 recall")
+    fuzzy.add_argument("--videos", type=int, default=500)
+    fuzzy.add_argument("--segments", type=int, default=400)
+    fuzzy.add_argument("--iterations", type=int, default=300)
+    fuzzy.add_argument("--typos", type=int, default=2, help="질의당 바꿀 음절 수")
+    fuzzy.add_argument("--ngram", type=int, default=3)
+    fuzzy.add_argument("--max-error-rate", type=float, default=0.25)
+    fuzzy.add_argument("-k", type=int, default=10)
+    fuzzy.add_argument("--like-baseline", action="store_true", help="LIKE 방식 recall도 계산 (느림)")
+    fuzzy.add_argument("--seed", type=int, default=42)
+    fuzzy.add_argument("--output", help="리포트 저장 경로")
+
+    related = sub.add_parser("related", help="관련 장면 그래프 생성 시간과 조회 지연")
+    related.add_argument("--videos", type=int, default=100)
+    related.add_argument("--segments", type=int, default=400)
+    related.add_argument("--added-videos", type=int, default=5)
+    related.add_argument("--dim", type=int, default=384)
+    related.add_argument("-m", type=int, default=20)
+    related.add_argument("-k", type=int, default=10)
+    related.add_argument("--iterations", type=int, default=300)
+    related.add_argument("--seed", type=int, default=42)
+    related.add_argument("--output", help="리포트 저장 경로")
+
+    grouped = sub.add_parser("grouped", help="영상별로 묶은 검색과 커서 페이지 지연")
+    grouped.add_argument("--videos", type=int, default=50)
+    grouped.add_argument("--segments", type=int, default=400)
+    grouped.add_argument("--page-size", type=int, default=5)
+    grouped.add_argument("--moments", type=int, default=3)
+    grouped.add_argument("--iterations", type=int, default=100)
+    grouped.add_argument("--seed", type=int, default=42)
+    grouped.add_argument("--output", help="리포트 저장 경로")
+
+    args = parser.parse_args()
+    if args.command == "grouped":
+        run_grouped_benchmark(args)
+        return 0
+    if args.command == "related":
+        run_related_benchmark(args)
+        return 0
+    if args.command == "fuzzy":
+        run_fuzzy_benchmark(args)
+        return 0
+    if args.command == "replicas":
+        run_replica_benchmark(args)
+        return 0
+    if args.command == "serialize":
+        run_serialization_benchmark(args)
+        return 0
+    if args.command == "channels":
+        run_channel_benchmarks(args)
+        return 0
+    if args.command == "run":
+        run_suite(args)
+        return 0
+    if args.command == "queue":
+        run_queue_benchmark(args)
+        return 0
+    return run_compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,75 @@
 # celery_worker.py
-from tasks import celery
+"""프로필별 Celery 워커 실행
+
+    python celery_worker.py                  # 모든 검색 큐 처리 (기존 방식)
+    python celery_worker.py interactive      # 단건 벡터 검색 전용, 모델 사전 로드
+    python celery_worker.py bulk             # 배치 검색 전용, 모델 사전 로드
+    python celery_worker.py ingest           # 색인 전용 (ingest.py), 모델 사전 로드
+    python celery_worker.py interactive --concurrency=8   # 나머지 인자는 celery로 전달
+"""
+import sys
+
+import config
+from config import (
+    CELERY_VECTOR_QUEUE,
+    CELERY_BULK_QUEUE,
+    CELERY_INGEST_QUEUE,
+    VECTOR_WORKER_CONCURRENCY,
+    BULK_WORKER_CONCURRENCY,
+    INGEST_WORKER_CONCURRENCY,
+)
+
+PROFILES = {
+    "all": {
+        "queues": [CELERY_VECTOR_QUEUE, CELERY_BULK_QUEUE],
+        "concurrency": VECTOR_WORKER_CONCURRENCY,
+        "preload_model": False,
+    },
+    "interactive": {
+        "queues": [CELERY_VECTOR_QUEUE],
+        "concurrency": VECTOR_WORKER_CONCURRENCY,
+        "preload_model": True,
+    },
+    "bulk": {
+        "queues": [CELERY_BULK_QUEUE],
+        "concurrency": BULK_WORKER_CONCURRENCY,
+        "preload_model": True,
+    },
+    # 색인은 검색 워커와 섞지 않음 (재색인 중에도 검색 지연이 늘지 않게)
+    "ingest": {
+        "queues": [CELERY_INGEST_QUEUE],
+        "concurrency": INGEST_WORKER_CONCURRENCY,
+        "preload_model": True,
+    },
+}
+
+
+def build_worker_argv(profile_name, extra_args=()):
+    profile = PROFILES[profile_name]
+    return [
+        "worker",
+        "--loglevel=INFO",
+        f"--hostname={profile_name}@%h",
+        f"--queues={','.join(profile['queues'])}",
+        f"--concurrency={profile['concurrency']}",
+        # 예약한 태스크를 바쁜 프로세스에 미리 넘기지 않고 빈 프로세스에만 배정
+        "-O",
+        "fair",
+        *extra_args,
+    ]
+
 
 if __name__ == "__main__":
-    celery.worker_main()
+    args = sys.argv[1:]
+    profile_name = "all"
+    if args and args[0] in PROFILES:
+        profile_name, args = args[0], args[1:]
+
+    if PROFILES[profile_name]["preload_model"]:
+        # tasks 임포트 전에 설정해야 워커 프로세스 초기화에서 반영됨
+        config.WORKER_PRELOAD_MODEL = True
+
+    from tasks import celery
+
+    print(f"🚀 Celery 워커 시작 (프로필: {profile_name})")
+    celery.worker_main(build_worker_argv(profile_name, args))
@@ -13,11 +13,21 @@ API_URL = f"http://{API_HOST}:{API_PORT}/api/search"
 # Weaviate 설정
 WEAVIATE_URL = "http://localhost:8080"  # 로컬 Weaviate 서버 URL
 WEAVIATE_API_KEY = None  # 로컬에서는 API 키가 필요 없음
+
+# 검색(읽기)용 복제본 목록 "host:http_port:grpc_port,..." (비우면 localhost 한 대에 요청마다 연결)
+WEAVIATE_READ_REPLICAS = os.getenv("WEAVIATE_READ_REPLICAS", "")
+# 첫 복제본이 최근 응답 시간의 WEAVIATE_HEDGE_QUANTILE 분위 안에 답하지 않으면 다른 복제본에 한 번 더 요청
+WEAVIATE_HEDGE_ENABLED = os.getenv("WEAVIATE_HEDGE_ENABLED", "1") == "1"
+WEAVIATE_HEDGE_QUANTILE = float(os.getenv("WEAVIATE_HEDGE_QUANTILE", "0.95"))
+WEAVIATE_HEDGE_MIN_DELAY = float(os.getenv("WEAVIATE_HEDGE_MIN_DELAY", "0.01"))  # 초
+WEAVIATE_HEDGE_MAX_DELAY = float(os.getenv("WEAVIATE_HEDGE_MAX_DELAY", "0.5"))  # 초 (표본이 적을 때도 사용)
+WEAVIATE_READ_POOL_SIZE = int(os.getenv("WEAVIATE_READ_POOL_SIZE", "32"))
 CLASS_NAME = "YoutubeTranscript"
 
 # OpenAI API 설정
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
+if OPENAI_API_KEY:
+    os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
 
 # 처리 설정
 SEGMENT_SIZE = 10
@@ -32,3 +42,166 @@ EMBEDDING_MODEL = "dragonkue/BGE-m3-ko"
 # 데이터 저장 경로
 DATA_DIR = "data"
 TRANSCRIPTS_DIR = "data/transcripts"
+
+# 분산 자막 수집 설정 (distributed_collector.py)
+COLLECT_REDIS_URL = os.getenv("COLLECT_REDIS_URL", "redis://localhost:6379/3")
+COLLECT_LEASE_SECONDS = float(os.getenv("COLLECT_LEASE_SECONDS", "60"))  # 하트비트가 끊기고 이 시간이 지나면 회수
+COLLECT_HEARTBEAT_INTERVAL = float(os.getenv("COLLECT_HEARTBEAT_INTERVAL", "20"))
+COLLECT_MAX_ATTEMPTS = int(os.getenv("COLLECT_MAX_ATTEMPTS", "3"))
+COLLECT_NODE_RATE = float(os.getenv("COLLECT_NODE_RATE", str(1 / REQUEST_DELAY)))  # 노드(IP)당 초당 요청 수
+COLLECT_STORE = os.getenv("COLLECT_STORE", "local")  # local: TRANSCRIPTS_DIR, redis: 중앙 저장 후 export
+
+# 분산 색인 설정 (ingest.py)
+INGEST_REDIS_URL = os.getenv("INGEST_REDIS_URL", "redis://localhost:6379/4")
+INGEST_SHARD_SIZE = int(os.getenv("INGEST_SHARD_SIZE", "20"))  # 태스크 하나가 맡는 영상 수
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))  # 한 번에 임베딩/업서트할 청크 수
+INGEST_TASK_TIME_LIMIT = int(os.getenv("INGEST_TASK_TIME_LIMIT", "1800"))  # 초 (넘으면 워커 프로세스 강제 종료)
+# 이 시간이 지나면 진행 중인 업서트를 마치고 샤드를 재시도로 돌려 놓음 (끝난 영상은 재시도 때 건너뜀)
+INGEST_TASK_SOFT_TIME_LIMIT = int(
+    os.getenv("INGEST_TASK_SOFT_TIME_LIMIT", str(max(INGEST_TASK_TIME_LIMIT - 60, 1)))
+)
+
+# 오타 허용 검색 (fuzzy_index.py): 자모 n-gram 색인 + 편집 거리 검증
+FUZZY_INDEX_DIR = os.getenv("FUZZY_INDEX_DIR", os.path.join(DATA_DIR, "fuzzy_index"))
+FUZZY_NGRAM = int(os.getenv("FUZZY_NGRAM", "3"))  # 자모 n-gram 길이 (바꾸면 색인 다시 생성)
+FUZZY_MAX_ERROR_RATE = float(os.getenv("FUZZY_MAX_ERROR_RATE", "0.25"))  # 허용 편집 거리 / 질의 자모 수
+FUZZY_CANDIDATES = int(os.getenv("FUZZY_CANDIDATES", "200"))  # 편집 거리를 계산할 최대 후보 구간 수
+
+# 멀티 채널 설정
+# 영상별 채널/게시일: {"video_id": {"channel_id": ..., "published_at": "2024-01-31T12:00:00Z"}}
+VIDEO_METADATA_FILE = os.path.join(DATA_DIR, "videos.json")
+# 메타데이터에 없는 영상의 채널 (기존 단일 채널)
+DEFAULT_CHANNEL_ID = os.getenv("DEFAULT_CHANNEL_ID", "UCUj6rrhMTR9pipbAWBAMvUQ")
+# 1이면 채널마다 Weaviate 테넌트(별도 샤드/HNSW 인덱스)로 저장하고 채널 범위만 검색
+CHANNEL_TENANCY = os.getenv("CHANNEL_TENANCY", "0") == "1"
+CHANNEL_FANOUT_CONCURRENCY = int(os.getenv("CHANNEL_FANOUT_CONCURRENCY", "8"))
+
+# 재색인(blue/green) 설정: 검색은 포인터 파일이 가리키는 컬렉션을 사용 (없으면 CLASS_NAME)
+INDEX_POINTER_FILE = os.getenv("INDEX_POINTER_FILE", os.path.join(DATA_DIR, "index_pointer.json"))
+REINDEX_MIN_COUNT_RATIO = float(os.getenv("REINDEX_MIN_COUNT_RATIO", "0.95"))
+REINDEX_MIN_RECALL = float(os.getenv("REINDEX_MIN_RECALL", "0.8"))
+REINDEX_SAMPLE_SIZE = int(os.getenv("REINDEX_SAMPLE_SIZE", "50"))
+REINDEX_KEEP_VERSIONS = int(os.getenv("REINDEX_KEEP_VERSIONS", "2"))
+
+# 요청 트레이싱 설정
+SERVICE_NAME = os.getenv("SERVICE_NAME", "youtube-rag-search")
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")  # 비어 있으면 파일로 내보내지 않음
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "500"))
+
+# 느린 검색 기록 (0이면 사용 안 함)
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "1000"))
+SLOW_QUERY_LOG_PATH = os.getenv("SLOW_QUERY_LOG_PATH", "logs/slow_queries.jsonl")
+
+# 요청별 프로파일링 (?profile=1, X-Admin-Token 헤더가 ADMIN_TOKEN과 같을 때만. 비어 있으면 사용 안 함)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.002"))  # 초
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "0") == "1"
+
+# 검색 기록 설정
+SEARCH_HISTORY_DIR = "search_history"
+HISTORY_QUEUE_SIZE = int(os.getenv("HISTORY_QUEUE_SIZE", "10000"))
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "200"))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "1.0"))
+HISTORY_SEGMENT_MAX_BYTES = int(os.getenv("HISTORY_SEGMENT_MAX_BYTES", str(16 * 1024 * 1024)))
+HISTORY_FULL_POLICY = os.getenv("HISTORY_FULL_POLICY", "drop_newest")  # drop_newest, drop_oldest, block
+
+# 워밍업 설정 (검색 기록 상위 검색어 재실행)
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+WARMUP_TOP_N = int(os.getenv("WARMUP_TOP_N", "50"))
+WARMUP_TIME_BUDGET = float(os.getenv("WARMUP_TIME_BUDGET", "60"))
+WARMUP_API_SEARCH_TYPES = os.getenv("WARMUP_API_SEARCH_TYPES", "bm25,exact_match").split(",")
+WARMUP_WORKER_SEARCH_TYPES = os.getenv("WARMUP_WORKER_SEARCH_TYPES", "vector").split(",")
+
+# 배치 검색 설정
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+BATCH_VECTOR_CHUNK_SIZE = int(os.getenv("BATCH_VECTOR_CHUNK_SIZE", "64"))
+
+# 동일 요청 합치기(singleflight) 설정
+SINGLEFLIGHT_REDIS_URL = os.getenv("SINGLEFLIGHT_REDIS_URL", "redis://localhost:6379/2")
+SINGLEFLIGHT_LOCK_TTL = float(os.getenv("SINGLEFLIGHT_LOCK_TTL", "60"))
+SINGLEFLIGHT_RESULT_TTL = float(os.getenv("SINGLEFLIGHT_RESULT_TTL", "5"))
+
+# Celery 설정
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/1")
+VECTOR_WORKER_CONCURRENCY = int(os.getenv("VECTOR_WORKER_CONCURRENCY", "4"))
+BULK_WORKER_CONCURRENCY = int(os.getenv("BULK_WORKER_CONCURRENCY", "2"))
+INGEST_WORKER_CONCURRENCY = int(os.getenv("INGEST_WORKER_CONCURRENCY", "2"))
+# API에서 Celery 결과를 기다리는 전용 스레드 수 (BM25/정확 일치가 쓰는 기본 스레드 풀과 분리)
+CELERY_WAIT_THREADS = int(os.getenv("CELERY_WAIT_THREADS", "32"))
+
+# 검색 타입별 전용 큐 (대화형 단건 검색과 배치 검색을 분리)
+CELERY_VECTOR_QUEUE = os.getenv("CELERY_VECTOR_QUEUE", "search.vector")
+CELERY_BULK_QUEUE = os.getenv("CELERY_BULK_QUEUE", "search.bulk")
+# 색인(ingest.py) 전용 큐. 검색 워커와 따로 띄움 (python celery_worker.py ingest)
+CELERY_INGEST_QUEUE = os.getenv("CELERY_INGEST_QUEUE", "ingest")
+
+# Redis 브로커 우선순위 (숫자가 작을수록 먼저 처리)
+CELERY_PRIORITY_STEPS = [0, 3, 6, 9]
+CELERY_PRIORITY_SEP = ":"
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 9
+
+# 느린 태스크 뒤에 빠른 태스크가 묶이지 않도록 프로세스당 1개씩만 미리 가져옴
+WORKER_PREFETCH_MULTIPLIER = int(os.getenv("WORKER_PREFETCH_MULTIPLIER", "1"))
+# 1이면 워커 프로세스가 태스크를 받기 전에 임베딩 모델을 로드
+WORKER_PRELOAD_MODEL = os.getenv("WORKER_PRELOAD_MODEL", "0") == "1"
+# 1이면 API 시작 직후 임베딩 모델을 백그라운드 스레드에서 로드 (BM25/정확 일치는 바로 응답)
+API_PRELOAD_MODEL = os.getenv("API_PRELOAD_MODEL", "1") == "1"
+# 워커 간 모델 가중치 공유: none, fork(prefork 부모에서 로드 후 copy-on-write), mmap(spawn 풀용 파일 공유)
+MODEL_SHARE_MODE = os.getenv("MODEL_SHARE_MODE", "none")
+MODEL_MMAP_DIR = os.getenv("MODEL_MMAP_DIR", "model_cache")
+# 모델 로딩 동안 자식 프로세스가 시작 시간 초과로 종료되지 않도록 여유 있게 설정
+WORKER_PROC_ALIVE_TIMEOUT = float(os.getenv("WORKER_PROC_ALIVE_TIMEOUT", "120"))
+
+# 시맨틱 캐시 설정 (질의 벡터 유사도 기반 결과 재사용)
+# off: 사용 안 함, shadow: 결과는 쓰지 않고 적중률/결과 차이만 기록, on: 적중 시 캐시 결과 반환
+SEMANTIC_CACHE_MODE = os.getenv("SEMANTIC_CACHE_MODE", "shadow")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))  # 코사인 유사도
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2048"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "600"))  # 초
+# on 모드에서 적중해도 실제 검색과 비교해 볼 비율
+SEMANTIC_CACHE_SHADOW_RATE = float(os.getenv("SEMANTIC_CACHE_SHADOW_RATE", "0.05"))
+# 워커 프로세스별 통계를 모으는 Redis (비우면 API 프로세스 통계만)
+SEMANTIC_CACHE_STATS_REDIS_URL = os.getenv("SEMANTIC_CACHE_STATS_REDIS_URL", "redis://localhost:6379/2")
+
+# 벡터 검색 결과 중복 제거 (k * DIVERSIFY_OVERFETCH개 후보에서 인접 청크 제거 + MMR)
+DIVERSIFY_ENABLED = os.getenv("DIVERSIFY_ENABLED", "1") == "1"
+DIVERSIFY_OVERFETCH = int(os.getenv("DIVERSIFY_OVERFETCH", "4"))
+DIVERSIFY_LAMBDA = float(os.getenv("DIVERSIFY_LAMBDA", "0.7"))  # 1이면 관련도만, 0이면 다양성만
+DIVERSIFY_TIME_WINDOW = float(os.getenv("DIVERSIFY_TIME_WINDOW", "30"))  # 같은 영상에서 이 간격(초) 이내면 같은 장면
+
+# 영상별로 묶은 검색 (/api/search/grouped): 청크를 한 번 넉넉히 가져와 영상별로 묶고, 페이지는 커서로 나눠 보냄
+GROUP_FETCH_LIMIT = int(os.getenv("GROUP_FETCH_LIMIT", "200"))  # 한 번에 가져올 청크 수 (모든 페이지가 나눠 씀)
+GROUP_MAX_VIDEOS = int(os.getenv("GROUP_MAX_VIDEOS", "50"))  # 묶어서 보관할 최대 영상 수
+GROUP_MOMENTS_PER_VIDEO = int(os.getenv("GROUP_MOMENTS_PER_VIDEO", "3"))  # 영상마다 보여줄 장면 수 (기본값)
+GROUP_PAGE_SIZE = int(os.getenv("GROUP_PAGE_SIZE", "5"))  # 페이지당 영상 수 (기본값)
+GROUP_CURSOR_TTL = float(os.getenv("GROUP_CURSOR_TTL", "600"))  # 초
+# 커서 결과를 여러 API 프로세스가 공유하는 Redis (비우면 프로세스 내에만 보관)
+GROUP_CURSOR_REDIS_URL = os.getenv("GROUP_CURSOR_REDIS_URL", "redis://localhost:6379/2")
+
+# 관련 장면 그래프 (related_graph.py): 청크별 최근접 이웃을 미리 계산해 /api/related에서 바로 응답
+RELATED_GRAPH_DIR = os.getenv("RELATED_GRAPH_DIR", os.path.join(DATA_DIR, "related_graph"))
+RELATED_TOP_M = int(os.getenv("RELATED_TOP_M", "20"))  # 청크당 저장할 이웃 수 (바꾸면 전체 다시 계산)
+RELATED_BLOCK_SIZE = int(os.getenv("RELATED_BLOCK_SIZE", "512"))  # 한 번에 계산/저장하는 청크 수 (재개 단위)
+# 같은 영상에서 이 간격(초) 이내로 겹치는 청크는 관련 장면에서 제외
+RELATED_TIME_WINDOW = float(os.getenv("RELATED_TIME_WINDOW", str(DIVERSIFY_TIME_WINDOW)))
+
+# 검색 응답 직렬화/압축
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))  # 이보다 작으면 압축 안 함
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+SNIPPET_CHARS = int(os.getenv("SNIPPET_CHARS", "160"))  # slim 응답의 결과별 발췌 길이
+
+# 부하 차단(admission control) 설정
+ADMISSION_LIMITS = {
+    "vector": int(os.getenv("ADMISSION_VECTOR_LIMIT", "16")),
+    "bm25": int(os.getenv("ADMISSION_BM25_LIMIT", "32")),
+    "exact_match": int(os.getenv("ADMISSION_EXACT_MATCH_LIMIT", "32")),
+    "fuzzy": int(os.getenv("ADMISSION_FUZZY_LIMIT", "16")),
+}
+ADMISSION_MAX_WAITING = int(os.getenv("ADMISSION_MAX_WAITING", "100"))
+ADMISSION_DEADLINE = float(os.getenv("ADMISSION_DEADLINE", "10"))  # 초
+ADMISSION_DEGRADE_TO_BM25 = os.getenv("ADMISSION_DEGRADE_TO_BM25", "1") == "1"
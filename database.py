@@ -1,21 +1,24 @@
 import os
 import json
 import weaviate
-from weaviate.classes.config import DataType, Property, Configure
+from weaviate.classes.config import DataType, Property, Configure, Tokenization
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_weaviate import WeaviateVectorStore
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.docstore.document import Document
 from config import (
     WEAVIATE_URL,
-    CLASS_NAME,
     WEAVIATE_API_KEY,
     EMBEDDING_MODEL,
     CHUNK_SIZE,
     CHUNK_OVERLAP,
     TRANSCRIPTS_DIR,
     DATA_DIR,
+    VIDEO_METADATA_FILE,
+    DEFAULT_CHANNEL_ID,
+    CHANNEL_TENANCY,
 )
+from index_pointer import active_collection_name, collection_model
 
 # 배치 크기 설정
 BATCH_SIZE = 200
@@ -38,6 +41,15 @@ def save_uploaded_files(uploaded_files):
         json.dump(uploaded_files, f, indent=2)
 
 
+def load_video_metadata():
+    """영상별 채널/게시일 불러오기 {"video_id": {"channel_id": ..., "published_at": ...}}"""
+    try:
+        with open(VIDEO_METADATA_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
 def init_weaviate_client():
     """Weaviate 클라이언트 초기화"""
     return weaviate.connect_to_local(
@@ -45,10 +57,45 @@ def init_weaviate_client():
     )
 
 
-def init_vector_store(client):
-    """벡터 스토어 초기화"""
+def create_collection(client, name):
+    """검색용 컬렉션 생성 (이미 있으면 그대로 둠)"""
+    if client.collections.exists(name):
+        return client.collections.get(name)
+    return client.collections.create(
+        name=name,
+        properties=[
+            Property(name="content", data_type=DataType.TEXT),
+            # ID는 단어 단위로 쪼개지 않아야 채널/영상 필터가 정확히 일치함
+            Property(
+                name="channel_id",
+                data_type=DataType.TEXT,
+                tokenization=Tokenization.FIELD,
+            ),
+            Property(
+                name="video_id",
+                data_type=DataType.TEXT,
+                tokenization=Tokenization.FIELD,
+            ),
+            Property(name="published_at", data_type=DataType.DATE),
+            Property(name="start", data_type=DataType.NUMBER),
+            Property(name="end", data_type=DataType.NUMBER),
+        ],
+        vectorizer_config=Configure.Vectorizer.none(),
+        # 채널마다 별도 테넌트(샤드)로 저장하면 채널 범위 검색 비용이 전체 채널 수와 무관
+        multi_tenancy_config=(
+            Configure.multi_tenancy(enabled=True, auto_tenant_creation=True)
+            if CHANNEL_TENANCY
+            else None
+        ),
+    )
+
+
+def init_vector_store(client, collection_name=None):
+    """벡터 스토어 초기화 (collection_name이 없으면 현재 검색 중인 컬렉션)"""
+    collection_name = collection_name or active_collection_name()
+    # 컬렉션을 색인하는 모델은 인덱스 포인터에 기록된 모델 (재색인으로 바뀔 수 있음)
     embedding = HuggingFaceEmbeddings(
-        model_name="dragonkue/BGE-m3-ko",
+        model_name=collection_model(collection_name),
         model_kwargs={"device": "cpu"},
         encode_kwargs={
             "normalize_embeddings": True,
@@ -57,28 +104,17 @@ def init_vector_store(client):
         },
     )
 
-    if not client.collections.exists(CLASS_NAME):
-        client.collections.create(
-            name=CLASS_NAME,
-            properties=[
-                Property(name="content", data_type=DataType.TEXT),
-                Property(name="channel_id", data_type=DataType.TEXT),
-                Property(name="video_id", data_type=DataType.TEXT),
-                Property(name="start", data_type=DataType.NUMBER),
-                Property(name="end", data_type=DataType.NUMBER),
-            ],
-            vectorizer_config=Configure.Vectorizer.none(),
-        )
+    create_collection(client, collection_name)
 
     return WeaviateVectorStore(
         client=client,
-        index_name=CLASS_NAME,
+        index_name=collection_name,
         text_key="content",
         embedding=embedding,
     )
 
 
-def convert_segments_to_docs(channel_id, video_id, segments):
+def convert_segments_to_docs(channel_id, video_id, segments, published_at=None):
     """자막 세그먼트를 문서로 변환"""
     docs = []
     for i in range(0, len(segments), 10):
@@ -87,42 +123,46 @@ def convert_segments_to_docs(channel_id, video_id, segments):
             continue
 
         combined_text = " ".join(seg["text"] for seg in group)
-        doc = Document(
-            page_content=combined_text,
-            metadata={
-                "channel_id": channel_id,
-                "video_id": video_id,
-                "start": group[0]["start"],
-                "end": group[-1]["start"],
-            },
-        )
+        metadata = {
+            "channel_id": channel_id,
+            "video_id": video_id,
+            "start": group[0]["start"],
+            "end": group[-1]["start"],
+        }
+        if published_at:
+            metadata["published_at"] = published_at
+        doc = Document(page_content=combined_text, metadata=metadata)
         docs.append(doc)
     return docs
 
 
-def upload_batch(vectorstore, docs_batch):
-    """문서 배치 업로드"""
+def upload_batch(vectorstore, docs_batch, tenant=None):
+    """문서 배치 업로드 (tenant를 주면 해당 채널 테넌트에 저장)"""
     try:
-        vectorstore.add_documents(docs_batch)
+        vectorstore.add_documents(docs_batch, tenant=tenant)
         return True
     except Exception as e:
         print(f"❌ 배치 업로드 실패: {str(e)}")
         return False
 
 
-def upload_to_database():
-    """JSON 파일들을 DB에 업로드"""
+def upload_to_database(channel_ids=None, collection_name=None, track_uploaded=True):
+    """JSON 파일들을 DB에 업로드 (channel_ids를 주면 해당 채널 영상만)
+
+    재색인처럼 새 컬렉션에 전체를 다시 넣을 때는 collection_name을 지정하고
+    track_uploaded=False로 업로드 기록을 건너뜀. {"total", "success", "failed"} 반환
+    """
     client = init_weaviate_client()
-    vectorstore = init_vector_store(client)
+    vectorstore = init_vector_store(client, collection_name)
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
     )
 
-    # 채널 ID 설정
-    channel_id = "UCUj6rrhMTR9pipbAWBAMvUQ"
+    # 영상별 채널/게시일 (메타데이터가 없는 영상은 기본 채널)
+    video_metadata = load_video_metadata()
 
     # 업로드된 파일 목록 불러오기
-    uploaded_files = load_uploaded_files()
+    uploaded_files = load_uploaded_files() if track_uploaded else {"files": []}
 
     # JSON 파일 목록 가져오기 (업로드되지 않은 파일만)
     json_files = [
@@ -130,11 +170,19 @@ def upload_to_database():
         for f in os.listdir(TRANSCRIPTS_DIR)
         if f.endswith(".json") and f not in uploaded_files["files"]
     ]
+    if channel_ids:
+        json_files = [
+            f
+            for f in json_files
+            if video_metadata.get(f[: -len(".json")], {}).get("channel_id", DEFAULT_CHANNEL_ID)
+            in channel_ids
+        ]
 
     total_files = len(json_files)
     if total_files == 0:
         print("✅ 모든 파일이 이미 업로드되었습니다.")
-        return
+        client.close()
+        return {"total": 0, "success": 0, "failed": 0}
 
     processed_count = 0
     success_count = 0
@@ -146,13 +194,18 @@ def upload_to_database():
         try:
             video_id = json_file.replace(".json", "")
             file_path = os.path.join(TRANSCRIPTS_DIR, json_file)
+            meta = video_metadata.get(video_id, {})
+            channel_id = meta.get("channel_id", DEFAULT_CHANNEL_ID)
+            tenant = channel_id if CHANNEL_TENANCY else None
 
             # JSON 파일 읽기
             with open(file_path, "r", encoding="utf-8") as f:
                 transcript = json.load(f)
 
             # 문서 변환
-            video_docs = convert_segments_to_docs(channel_id, video_id, transcript)
+            video_docs = convert_segments_to_docs(
+                channel_id, video_id, transcript, meta.get("published_at")
+            )
             if not video_docs:
                 print(f"❌ {video_id}: 문서 변환 실패")
                 failed_count += 1
@@ -164,7 +217,7 @@ def upload_to_database():
             # 배치 단위로 업로드
             for i in range(0, len(split_docs), BATCH_SIZE):
                 batch = split_docs[i : i + BATCH_SIZE]
-                if upload_batch(vectorstore, batch):
+                if upload_batch(vectorstore, batch, tenant):
                     print(f"✅ {video_id}: 배치 업로드 완료 ({len(batch)} 문서)")
                 else:
                     print(f"❌ {video_id}: 배치 업로드 실패")
@@ -172,8 +225,9 @@ def upload_to_database():
                     continue
 
             # 업로드 성공한 파일 기록
-            uploaded_files["files"].append(json_file)
-            save_uploaded_files(uploaded_files)
+            if track_uploaded:
+                uploaded_files["files"].append(json_file)
+                save_uploaded_files(uploaded_files)
 
             success_count += 1
             print(f"✅ {video_id}: 전체 업로드 완료")
@@ -193,3 +247,5 @@ def upload_to_database():
     print(f"✅ 총 처리된 파일: {total_files}")
     print(f"✅ 성공: {success_count}")
     print(f"❌ 실패: {failed_count}")
+
+    return {"total": total_files, "success": success_count, "failed": failed_count}
@@ -0,0 +1,717 @@
+"""여러 노드에 나눠서 하는 자막 수집
+
+collector.collect_transcripts는 한 프로세스의 스레드로만 나누고 진행 상태를 로컬
+processed_videos.json에 남기므로, 대량 백필을 여러 서버(IP)로 나눌 수 없습니다.
+이 모듈은 Celery가 쓰는 Redis에 작업 목록과 진행 상태를 두고 여러 노드의 워커가
+나눠 가져가게 합니다.
+
+- 워커는 영상 ID를 임대(lease)로 가져가고, 처리하는 동안 하트비트로 임대를 연장합니다.
+- 워커가 죽어 임대가 만료되면 다른 워커가 가져갈 때 다시 대기열에 넣습니다.
+  (COLLECT_MAX_ATTEMPTS번 넘게 가져간 영상은 실패로 기록)
+- 요청 간격은 노드(같은 외부 IP) 단위로 Redis에서 맞추므로, 한 노드에서 프로세스를
+  여러 개 띄워도 노드 전체 요청 속도는 COLLECT_NODE_RATE를 넘지 않습니다.
+- 결과(성공/실패, 워커, 세그먼트 수)와 진행 상황은 Redis에 모입니다.
+  자막 본문은 노드의 TRANSCRIPTS_DIR(공유 스토리지) 또는 Redis(--store redis)에 저장하며,
+  Redis에 저장한 자막은 export로 TRANSCRIPTS_DIR와 processed_videos.json에 내려받습니다.
+
+모든 판단(임대 가져가기/연장/완료, 만료 회수, 속도 제한)은 Lua 스크립트로 원자적으로
+처리하고 시각도 Redis 서버 시계(TIME)를 쓰므로 노드 간 시계 차이의 영향을 받지 않습니다.
+
+    python distributed_collector.py enqueue video_ids.json
+    python distributed_collector.py work --node ip-a --processes 4
+    python distributed_collector.py status
+    python distributed_collector.py export
+
+로컬 확인용으로 --fake를 주면 YouTube 대신 지연/실패를 흉내 내는 가짜 자막 소스를 씁니다.
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import socket
+import argparse
+import threading
+import multiprocessing
+
+import redis
+
+from config import (
+    COLLECT_REDIS_URL,
+    COLLECT_LEASE_SECONDS,
+    COLLECT_HEARTBEAT_INTERVAL,
+    COLLECT_MAX_ATTEMPTS,
+    COLLECT_NODE_RATE,
+    COLLECT_STORE,
+    TRANSCRIPTS_DIR,
+)
+
+# 만료된 임대 회수 (claim/reclaim 스크립트 공통 앞부분)
+# KEYS: pending, leases, owners, attempts, results, stats
+# ARGV[1]: 워커 ID, ARGV[2]: 임대 시간(초), ARGV[3]: 최대 시도 횟수, ARGV[4]: 한 번에 회수할 최대 개수
+_RECLAIM_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now, 'LIMIT', 0, tonumber(ARGV[4]))
+for _, id in ipairs(expired) do
+  local owner = redis.call('HGET', KEYS[3], id)
+  redis.call('ZREM', KEYS[2], id)
+  redis.call('HDEL', KEYS[3], id)
+  if redis.call('HEXISTS', KEYS[5], id) == 0 then
+    redis.call('HINCRBY', KEYS[6], 'reclaimed', 1)
+    local attempts = tonumber(redis.call('HGET', KEYS[4], id) or '0')
+    if attempts >= tonumber(ARGV[3]) then
+      redis.call('HSET', KEYS[5], id, cjson.encode({
+        status = 'failed', error = 'lease expired', worker = owner,
+        attempts = attempts, finished_at = now}))
+      redis.call('HINCRBY', KEYS[6], 'failed', 1)
+    else
+      redis.call('RPUSH', KEYS[1], id)
+    end
+  end
+end
+"""
+
+RECLAIM_SCRIPT = _RECLAIM_LUA + "return #expired"
+
+CLAIM_SCRIPT = (
+    _RECLAIM_LUA
+    + """
+while true do
+  local id = redis.call('LPOP', KEYS[1])
+  if not id then
+    return false
+  end
+  -- 임대를 잃은 워커가 뒤늦게 완료한 영상은 건너뜀
+  if redis.call('HEXISTS', KEYS[5], id) == 0 then
+    redis.call('ZADD', KEYS[2], now + tonumber(ARGV[2]), id)
+    redis.call('HSET', KEYS[3], id, ARGV[1])
+    local attempts = redis.call('HINCRBY', KEYS[4], id, 1)
+    return {id, attempts}
+  end
+end
+"""
+)
+
+# KEYS: leases, owners / ARGV: 영상 ID, 워커 ID, 임대 시간(초)
+EXTEND_SCRIPT = """
+if redis.call('HGET', KEYS[2], ARGV[1]) ~= ARGV[2] then
+  return 0
+end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZADD', KEYS[1], 'XX', now + tonumber(ARGV[3]), ARGV[1])
+return 1
+"""
+
+# KEYS: pending, leases, owners, attempts, results, stats, transcripts
+# ARGV: 영상 ID, 워커 ID, 상태(success/failed/retry), 결과 JSON, 최대 시도 횟수, 압축 자막(없으면 "")
+# 반환: 1 기록, 2 재시도 대기열로, 0 무시(이미 완료됐거나 임대를 잃음)
+FINISH_SCRIPT = """
+local id = ARGV[1]
+local owner = redis.call('HGET', KEYS[3], id)
+local status = ARGV[3]
+if owner == ARGV[2] then
+  redis.call('ZREM', KEYS[2], id)
+  redis.call('HDEL', KEYS[3], id)
+end
+if redis.call('HEXISTS', KEYS[5], id) == 1 then
+  return 0
+end
+if owner ~= ARGV[2] then
+  -- 임대를 잃은 뒤 끝난 경우: 성공만 인정하고, 실패/재시도 판단은 현재 임대 보유자에게 맡김
+  if status ~= 'success' then
+    return 0
+  end
+  redis.call('LREM', KEYS[1], 0, id)
+end
+if status == 'retry' then
+  local attempts = tonumber(redis.call('HGET', KEYS[4], id) or '0')
+  if attempts < tonumber(ARGV[5]) then
+    redis.call('RPUSH', KEYS[1], id)
+    redis.call('HINCRBY', KEYS[6], 'retried', 1)
+    return 2
+  end
+  status = 'failed'
+end
+local result = cjson.decode(ARGV[4])
+result.status = status
+redis.call('HSET', KEYS[5], id, cjson.encode(result))
+redis.call('HINCRBY', KEYS[6], status, 1)
+if ARGV[6] ~= '' then
+  redis.call('HSET', KEYS[7], id, ARGV[6])
+end
+return 1
+"""
+
+# 노드 단위 요청 간격 (GCRA). 다음 요청 가능 시각을 interval만큼 미루고, 호출자가 기다릴 시간(초)을 반환
+# KEYS: 노드 키 / ARGV: interval(초)
+RATE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then
+  tat = now
+end
+local interval = tonumber(ARGV[1])
+redis.call('SET', KEYS[1], tostring(tat + interval), 'PX', math.ceil((tat + interval - now) * 1000) + 1000)
+return tostring(tat - now)
+"""
+
+# 워커 상태 보고. 마지막 보고 시각(last_seen)은 Redis 서버 시계로 기록
+# KEYS: workers / ARGV[1]: 워커 ID, ARGV[2]: 상태 JSON
+REPORT_WORKER_SCRIPT = """
+local t = redis.call('TIME')
+local state = cjson.decode(ARGV[2])
+state.last_seen = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('HSET', KEYS[1], ARGV[1], cjson.encode(state))
+return 1
+"""
+
+
+class TranscriptUnavailable(Exception):
+    """자막이 없는 영상 (재시도해도 결과가 같음)"""
+
+
+class CollectionQueue:
+    """Redis에 있는 수집 작업 하나 (job별로 키가 나뉨)"""
+
+    def __init__(
+        self,
+        redis_client,
+        job="default",
+        lease_seconds=60.0,
+        max_attempts=3,
+        reclaim_batch=100,
+    ):
+        self.redis = redis_client
+        self.job = job
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.reclaim_batch = reclaim_batch
+        prefix = f"collect:{job}"
+        self.keys = {
+            name: f"{prefix}:{name}"
+            for name in (
+                "known",  # 등록된 적 있는 영상 ID (중복 등록 방지)
+                "pending",  # 대기열 (LIST)
+                "leases",  # 임대 중인 영상 -> 만료 시각 (ZSET)
+                "owners",  # 임대 중인 영상 -> 워커 ID
+                "attempts",  # 영상 -> 가져간 횟수
+                "results",  # 영상 -> 결과 JSON
+                "stats",  # success/failed/retried/reclaimed 횟수
+                "transcripts",  # 영상 -> 압축 자막 (--store redis)
+                "workers",  # 워커 ID -> 상태 JSON
+            )
+        }
+        self._task_keys = [
+            self.keys[name]
+            for name in ("pending", "leases", "owners", "attempts", "results", "stats")
+        ]
+        self._claim = self.redis.register_script(CLAIM_SCRIPT)
+        self._reclaim = self.redis.register_script(RECLAIM_SCRIPT)
+        self._extend = self.redis.register_script(EXTEND_SCRIPT)
+        self._finish = self.redis.register_script(FINISH_SCRIPT)
+        self._report_worker = self.redis.register_script(REPORT_WORKER_SCRIPT)
+
+    def enqueue(self, video_ids, chunk_size=1000):
+        """처음 보는 영상 ID만 대기열에 추가. 추가한 개수 반환"""
+        added = 0
+        for i in range(0, len(video_ids), chunk_size):
+            chunk = video_ids[i : i + chunk_size]
+            pipe = self.redis.pipeline()
+            for video_id in chunk:
+                pipe.sadd(self.keys["known"], video_id)
+            new_ids = [vid for vid, is_new in zip(chunk, pipe.execute()) if is_new]
+            if new_ids:
+                self.redis.rpush(self.keys["pending"], *new_ids)
+                added += len(new_ids)
+        return added
+
+    def requeue_failed(self):
+        """실패로 기록된 영상의 시도 횟수를 초기화하고 다시 대기열에 추가"""
+        failed = [
+            video_id.decode()
+            for video_id, raw in self.redis.hgetall(self.keys["results"]).items()
+            if json.loads(raw)["status"] == "failed"
+        ]
+        if failed:
+            pipe = self.redis.pipeline()
+            pipe.hdel(self.keys["results"], *failed)
+            pipe.hdel(self.keys["attempts"], *failed)
+            pipe.hincrby(self.keys["stats"], "failed", -len(failed))
+            pipe.rpush(self.keys["pending"], *failed)
+            pipe.execute()
+        return failed
+
+    def claim(self, worker_id):
+        """영상 하나를 임대. (영상 ID, 시도 횟수) 또는 대기열이 비었으면 None"""
+        claimed = self._claim(
+            keys=self._task_keys,
+            args=[worker_id, self.lease_seconds, self.max_attempts, self.reclaim_batch],
+        )
+        if not claimed:
+            return None
+        return claimed[0].decode(), int(claimed[1])
+
+    def reclaim(self):
+        """만료된 임대를 회수하고 회수한 개수 반환 (claim에서도 매번 수행)"""
+        return self._reclaim(
+            keys=self._task_keys,
+            args=["", self.lease_seconds, self.max_attempts, self.reclaim_batch],
+        )
+
+    def extend(self, video_id, worker_id):
+        """임대 연장. 임대를 잃었으면(만료 후 회수됨) False"""
+        return bool(
+            self._extend(
+                keys=[self.keys["leases"], self.keys["owners"]],
+                args=[video_id, worker_id, self.lease_seconds],
+            )
+        )
+
+    def finish(self, video_id, worker_id, status, result, transcript=None):
+        """처리 결과 기록. status는 success, failed(재시도 안 함), retry(일시적 오류)"""
+        blob = b""
+        if transcript is not None:
+            blob = zlib.compress(json.dumps(transcript, ensure_ascii=False).encode("utf-8"))
+        return self._finish(
+            keys=self._task_keys + [self.keys["transcripts"]],
+            args=[
+                video_id,
+                worker_id,
+                status,
+                json.dumps(result, ensure_ascii=False),
+                self.max_attempts,
+                blob,
+            ],
+        )
+
+    def drained(self):
+        """대기열과 임대가 모두 비었는지"""
+        pipe = self.redis.pipeline()
+        pipe.llen(self.keys["pending"])
+        pipe.zcard(self.keys["leases"])
+        pending, leased = pipe.execute()
+        return pending == 0 and leased == 0
+
+    def report_worker(self, worker_id, state):
+        self._report_worker(
+            keys=[self.keys["workers"]],
+            args=[worker_id, json.dumps(state, ensure_ascii=False)],
+        )
+
+    def progress(self):
+        pipe = self.redis.pipeline()
+        pipe.scard(self.keys["known"])
+        pipe.llen(self.keys["pending"])
+        pipe.zcard(self.keys["leases"])
+        pipe.hgetall(self.keys["stats"])
+        pipe.hgetall(self.keys["workers"])
+        pipe.time()
+        total, pending, leased, stats, workers, (seconds, micros) = pipe.execute()
+        now = seconds + micros / 1e6
+
+        stats = {key.decode(): int(value) for key, value in stats.items()}
+        done = stats.get("success", 0) + stats.get("failed", 0)
+        worker_states = {}
+        for worker_id, raw in sorted(workers.items()):
+            state = json.loads(raw)
+            state["seconds_since_seen"] = round(now - state["last_seen"], 1)
+            worker_states[worker_id.decode()] = state
+        return {
+            "job": self.job,
+            "total": total,
+            "pending": pending,
+            "leased": leased,
+            "done": done,
+            "success": stats.get("success", 0),
+            "failed": stats.get("failed", 0),
+            "retried": stats.get("retried", 0),
+            "reclaimed": stats.get("reclaimed", 0),
+            "progress": done / total if total else 0.0,
+            "workers": worker_states,
+        }
+
+    def results(self):
+        return {
+            video_id.decode(): json.loads(raw)
+            for video_id, raw in self.redis.hgetall(self.keys["results"]).items()
+        }
+
+    def iter_transcripts(self, batch=100):
+        for video_id, blob in self.redis.hscan_iter(self.keys["transcripts"], count=batch):
+            yield video_id.decode(), json.loads(zlib.decompress(blob))
+
+
+class NodeRateLimiter:
+    """노드(외부 IP) 단위 요청 간격. 같은 노드의 모든 프로세스가 Redis 키 하나를 공유"""
+
+    def __init__(self, redis_client, node, rate):
+        self.key = f"collect:rate:{node}"
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._reserve = redis_client.register_script(RATE_SCRIPT)
+
+    def acquire(self):
+        """다음 요청 차례까지 대기. 기다린 시간(초) 반환"""
+        if not self.interval:
+            return 0.0
+        wait = float(self._reserve(keys=[self.key], args=[self.interval]))
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def backoff(self, seconds):
+        """노드 전체 요청을 seconds만큼 늦춤 (차단/429로 보이는 오류 후)"""
+        self._reserve(keys=[self.key], args=[seconds])
+
+
+class YouTubeTranscriptSource:
+    """YouTube 자막. 재시도는 하지 않고 일시적 오류는 그대로 올려 대기열에서 재시도"""
+
+    def __init__(self, languages=("ko", "en")):
+        from youtube_transcript_api import (
+            YouTubeTranscriptApi,
+            TranscriptsDisabled,
+            NoTranscriptFound,
+        )
+
+        self._api = YouTubeTranscriptApi
+        self._unavailable = (TranscriptsDisabled, NoTranscriptFound)
+        self.languages = list(languages)
+
+    def fetch(self, video_id):
+        try:
+            return self._api.get_transcript(video_id, languages=self.languages)
+        except self._unavailable as e:
+            raise TranscriptUnavailable(str(e)) from e
+
+
+class FakeTranscriptSource:
+    """로컬 확인용 가짜 자막 소스
+
+    영상 ID마다 정해진 missing_rate 비율은 항상 자막이 없고, 요청마다 failure_rate 확률로
+    일시적 오류를 냅니다. 응답은 latency초(±50%) 뒤에 돌아옵니다.
+    """
+
+    def __init__(self, latency=0.05, failure_rate=0.1, missing_rate=0.05, segments=40, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.missing_rate = missing_rate
+        self.segments = segments
+        self._rng = random.Random(seed)
+
+    def fetch(self, video_id):
+        time.sleep(self.latency * self._rng.uniform(0.5, 1.5))
+        if (zlib.crc32(video_id.encode()) % 10000) / 10000 < self.missing_rate:
+            raise TranscriptUnavailable(f"자막 없음: {video_id}")
+        if self._rng.random() < self.failure_rate:
+            raise ConnectionError("가짜 일시적 오류")
+        return [
+            {"text": f"{video_id} 대사 {i}", "start": i * 3.0, "duration": 3.0}
+            for i in range(self.segments)
+        ]
+
+
+def save_local(video_id, transcript):
+    from transcript import save_transcript
+
+    return save_transcript(video_id, transcript)
+
+
+class WorkerHeartbeat:
+    """처리 중인 영상의 임대 연장과 워커 상태 보고를 맡는 스레드"""
+
+    def __init__(self, queue, worker_id, state, interval):
+        self.queue = queue
+        self.worker_id = worker_id
+        self.state = state
+        self.interval = interval
+        self.current = None
+        self.lost = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="collect-heartbeat", daemon=True)
+
+    def set_current(self, video_id):
+        with self._lock:
+            self.current = video_id
+            self.lost = False
+            self.state["current"] = video_id
+
+    def beat(self):
+        with self._lock:
+            current = self.current
+        if current is not None and not self.queue.extend(current, self.worker_id):
+            with self._lock:
+                self.lost = True
+        self.queue.report_worker(self.worker_id, self.state)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.beat()
+            except Exception as e:
+                print(f"⚠️ 하트비트 실패 ({self.worker_id}): {str(e)}")
+
+    def start(self):
+        self.beat()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.state["current"] = None
+        self.state["stopped"] = True
+        self.beat()
+
+
+def process_one(queue, source, limiter, worker_id, video_id, attempt, store):
+    """영상 하나 수집 후 결과 기록. 기록된 상태 반환"""
+    result = {
+        "worker": worker_id,
+        "node": worker_id.rsplit(":", 1)[0],
+        "attempts": attempt,
+        "finished_at": time.time(),
+    }
+    transcript = None
+    try:
+        limiter.acquire()
+        transcript = source.fetch(video_id)
+        status = "success"
+        result["segments"] = len(transcript)
+    except TranscriptUnavailable as e:
+        status = "failed"
+        result["error"] = str(e)
+    except Exception as e:
+        status = "retry"
+        result["error"] = f"{type(e).__name__}: {str(e)}"
+        # 일시적 오류가 나면 같은 노드의 다른 프로세스도 잠시 쉬게 함
+        limiter.backoff(min(2 ** (attempt - 1), 60))
+
+    if status == "success" and store == "local" and not save_local(video_id, transcript):
+        status = "retry"
+        result["error"] = "자막 저장 실패"
+
+    recorded = queue.finish(
+        video_id,
+        worker_id,
+        status,
+        result,
+        transcript if status == "success" and store == "redis" else None,
+    )
+    if recorded == 0:
+        return "ignored"
+    if recorded == 2:
+        return "retry"
+    return status
+
+
+def run_worker(
+    queue,
+    source,
+    limiter,
+    worker_id,
+    store="local",
+    heartbeat_interval=20.0,
+    poll_interval=1.0,
+    crash_rate=0.0,
+):
+    """대기열이 빌 때까지 영상을 임대해 처리. 다른 워커의 임대가 남아 있으면 만료를 기다림"""
+    state = {
+        "node": worker_id.rsplit(":", 1)[0],
+        "pid": os.getpid(),
+        "processed": 0,
+        "success": 0,
+        "failed": 0,
+        "retry": 0,
+        "ignored": 0,
+        "current": None,
+        "started_at": time.time(),
+    }
+    heartbeat = WorkerHeartbeat(queue, worker_id, state, heartbeat_interval).start()
+    crash_rng = random.Random()
+    try:
+        while True:
+            claimed = queue.claim(worker_id)
+            if claimed is None:
+                if queue.drained():
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            video_id, attempt = claimed
+            heartbeat.set_current(video_id)
+            if crash_rate and crash_rng.random() < crash_rate:
+                # 임대를 쥔 채로 노드가 죽는 상황 흉내 (--fake 확인용)
+                print(f"💥 {worker_id}: {video_id} 처리 중 비정상 종료")
+                os._exit(1)
+
+            status = process_one(queue, source, limiter, worker_id, video_id, attempt, store)
+            heartbeat.set_current(None)
+            state["processed"] += 1
+            state[status] += 1
+            if status == "failed":
+                print(f"❌ {worker_id}: {video_id} 실패")
+            elif status == "retry":
+                print(f"⚠️ {worker_id}: {video_id} 재시도 대기열로 (시도 {attempt})")
+    finally:
+        heartbeat.stop()
+    print(
+        f"✅ {worker_id} 종료: 처리 {state['processed']}, 성공 {state['success']}, "
+        f"실패 {state['failed']}, 재시도 {state['retry']}"
+    )
+    return state
+
+
+def make_queue(args):
+    client = redis.Redis.from_url(args.redis_url)
+    return CollectionQueue(client, args.job, args.lease, args.max_attempts)
+
+
+def worker_process(args, index):
+    queue = make_queue(args)
+    worker_id = f"{args.node}:{os.getpid()}"
+    if args.fake:
+        source = FakeTranscriptSource(
+            latency=args.fake_latency,
+            failure_rate=args.fake_failure_rate,
+            missing_rate=args.fake_missing_rate,
+            seed=None if args.seed is None else args.seed + index,
+        )
+    else:
+        source = YouTubeTranscriptSource()
+    limiter = NodeRateLimiter(queue.redis, args.node, args.rate)
+    run_worker(
+        queue,
+        source,
+        limiter,
+        worker_id,
+        store=args.store,
+        heartbeat_interval=args.heartbeat,
+        crash_rate=args.crash_rate,
+    )
+
+
+def print_progress(progress):
+    print(
+        f"📊 {progress['job']}: {progress['done']}/{progress['total']} "
+        f"({progress['progress']:.1%}) 성공 {progress['success']}, 실패 {progress['failed']}, "
+        f"대기 {progress['pending']}, 처리 중 {progress['leased']}, "
+        f"재시도 {progress['retried']}, 회수 {progress['reclaimed']}"
+    )
+
+
+def work(args):
+    if args.processes <= 1:
+        worker_process(args, 0)
+    else:
+        # 같은 노드에서 여러 프로세스 (노드 요청 속도는 Redis에서 함께 제한됨)
+        processes = [
+            multiprocessing.Process(target=worker_process, args=(args, i), daemon=False)
+            for i in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    print_progress(make_queue(args).progress())
+    return 0
+
+
+def export(args):
+    """Redis에 모인 결과를 TRANSCRIPTS_DIR와 processed_videos.json으로 내려받기"""
+    from collector import load_processed_ids, save_processed_ids
+
+    queue = make_queue(args)
+    os.makedirs(TRANSCRIPTS_DIR, exist_ok=True)
+    written = 0
+    for video_id, transcript in queue.iter_transcripts():
+        with open(os.path.join(TRANSCRIPTS_DIR, f"{video_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(transcript, f, ensure_ascii=False, indent=2)
+        written += 1
+
+    processed_ids = load_processed_ids()
+    for video_id, result in queue.results().items():
+        status = result["status"]
+        if video_id not in processed_ids[status]:
+            processed_ids[status].append(video_id)
+    save_processed_ids(processed_ids)
+    print(f"✅ 자막 {written}개 저장, 처리 목록 갱신 (성공 {len(processed_ids['success'])}, 실패 {len(processed_ids['failed'])})")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="여러 노드에 나눠서 하는 자막 수집")
+    parser.add_argument("--redis-url", default=COLLECT_REDIS_URL)
+    parser.add_argument("--job", default="default", help="수집 작업 이름 (Redis 키 접두어)")
+    parser.add_argument("--lease", type=float, default=COLLECT_LEASE_SECONDS, help="임대 시간(초)")
+    parser.add_argument("--max-attempts", type=int, default=COLLECT_MAX_ATTEMPTS)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = sub.add_parser("enqueue", help="영상 ID 등록")
+    enqueue_parser.add_argument("video_ids_file", help="영상 ID 목록 JSON 파일")
+    enqueue_parser.add_argument(
+        "--include-processed",
+        action="store_true",
+        help="processed_videos.json에 이미 있는 영상도 등록",
+    )
+
+    work_parser = sub.add_parser("work", help="이 노드에서 워커 실행")
+    work_parser.add_argument("--node", default=socket.gethostname(), help="노드 이름 (외부 IP 단위)")
+    work_parser.add_argument("--processes", type=int, default=1)
+    work_parser.add_argument("--rate", type=float, default=COLLECT_NODE_RATE, help="노드 전체 초당 요청 수")
+    work_parser.add_argument("--heartbeat", type=float, default=COLLECT_HEARTBEAT_INTERVAL)
+    work_parser.add_argument("--store", choices=["local", "redis"], default=COLLECT_STORE)
+    work_parser.add_argument("--fake", action="store_true", help="가짜 자막 소스 사용")
+    work_parser.add_argument("--fake-latency", type=float, default=0.05)
+    work_parser.add_argument("--fake-failure-rate", type=float, default=0.1)
+    work_parser.add_argument("--fake-missing-rate", type=float, default=0.05)
+    work_parser.add_argument("--crash-rate", type=float, default=0.0, help="영상을 임대한 채 종료할 확률")
+    work_parser.add_argument("--seed", type=int)
+
+    sub.add_parser("status", help="진행 상황")
+    sub.add_parser("reclaim", help="만료된 임대 즉시 회수")
+    sub.add_parser("requeue-failed", help="실패한 영상 다시 등록")
+    sub.add_parser("export", help="Redis에 저장한 자막과 결과 내려받기")
+
+    args = parser.parse_args()
+
+    if args.command == "work":
+        if args.crash_rate and not args.fake:
+            parser.error("--crash-rate는 --fake와 함께만 사용할 수 있습니다.")
+        return work(args)
+    if args.command == "export":
+        return export(args)
+
+    queue = make_queue(args)
+    if args.command == "enqueue":
+        with open(args.video_ids_file, "r") as f:
+            video_ids = json.load(f)
+        if not args.include_processed:
+            from collector import load_processed_ids
+
+            processed_ids = load_processed_ids()
+            done = set(processed_ids["success"]) | set(processed_ids["failed"])
+            video_ids = [vid for vid in video_ids if vid not in done]
+        added = queue.enqueue(video_ids)
+        print(f"✅ {added}개 등록 ({len(video_ids) - added}개는 이미 등록됨)")
+        return 0
+    if args.command == "status":
+        progress = queue.progress()
+        print_progress(progress)
+        print(json.dumps(progress["workers"], ensure_ascii=False, indent=2))
+        return 0
+    if args.command == "reclaim":
+        print(f"♻️ 만료된 임대 {queue.reclaim()}개 회수")
+        return 0
+    if args.command == "requeue-failed":
+        print(f"♻️ 실패한 영상 {len(queue.requeue_failed())}개 다시 등록")
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
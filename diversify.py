@@ -0,0 +1,69 @@
+"""검색 결과 중복 제거 (시간 구간 병합 + MMR)
+
+청크 겹침(CHUNK_OVERLAP)과 10개 세그먼트 묶음 때문에 벡터 검색 상위 결과가
+같은 영상의 바로 옆 청크로 채워지는 경우가 많습니다. k보다 많이 가져온 후보에서
+- 이미 고른 결과와 같은 영상의 겹치거나 가까운(time_window 이내) 구간은 제외하고
+- 남은 후보는 MMR(관련도 - 이미 고른 결과와의 최대 유사도)로 고릅니다.
+유사도는 Weaviate가 돌려준 저장 벡터로 계산하므로 다시 임베딩하지 않습니다.
+"""
+
+import numpy as np
+
+
+def _candidate_arrays(objects, query_vector):
+    """후보별 관련도, 정규화 벡터(없으면 None), 영상 번호, 시작/끝 시각 배열"""
+    n = len(objects)
+    starts = np.empty(n)
+    ends = np.empty(n)
+    video_ids = {}
+    videos = np.empty(n, dtype=np.int64)
+    for i, obj in enumerate(objects):
+        props = obj.properties
+        starts[i] = props["start"]
+        ends[i] = props.get("end", props["start"])
+        videos[i] = video_ids.setdefault(props["video_id"], len(video_ids))
+
+    vectors = [(getattr(obj, "vector", None) or {}).get("default") for obj in objects]
+    if any(v is None for v in vectors):
+        # 벡터가 없으면 검색 순서를 관련도로 사용하고 MMR 없이 구간 병합만
+        return np.linspace(1.0, 0.0, n), None, videos, starts, ends
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+    query = np.asarray(query_vector, dtype=np.float32)
+    query /= np.linalg.norm(query) + 1e-12
+    return matrix @ query, matrix, videos, starts, ends
+
+
+def redundancy_mask(videos, starts, ends, time_window):
+    """(n, n) 불리언 행렬: 같은 영상이고 구간이 time_window 이내로 겹치면 True"""
+    same_video = videos[:, None] == videos[None, :]
+    near = (starts[:, None] <= ends[None, :] + time_window) & (
+        starts[None, :] <= ends[:, None] + time_window
+    )
+    return same_video & near
+
+
+def diversify(objects, query_vector, k, mmr_lambda=0.7, time_window=30.0):
+    """후보 objects(관련도 순)에서 서로 겹치지 않는 결과 최대 k개를 골라 반환"""
+    if len(objects) <= 1:
+        return list(objects[:k])
+
+    relevance, matrix, videos, starts, ends = _candidate_arrays(objects, query_vector)
+    blocked = redundancy_mask(videos, starts, ends, time_window)
+    similarity = matrix @ matrix.T if matrix is not None else None
+
+    n = len(objects)
+    available = np.ones(n, dtype=bool)
+    max_sim = np.zeros(n, dtype=np.float32)  # 이미 고른 결과와의 최대 유사도
+    selected = []
+    while len(selected) < k and available.any():
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * max_sim
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available &= ~blocked[best]
+        if similarity is not None:
+            np.maximum(max_sim, similarity[best], out=max_sim)
+
+    return [objects[i] for i in selected]
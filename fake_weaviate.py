@@ -0,0 +1,407 @@
+"""벤치마크/로컬 실행용 인메모리 Weaviate 대역과 결정적 임베딩 스텁"""
+
+import re
+import math
+import time
+import uuid
+import random
+import hashlib
+from datetime import datetime, timezone
+
+
+class StubEmbedding:
+    """토큰 해시 기반의 결정적 임베딩 (모델 없이 오버헤드만 측정할 때 사용)"""
+
+    def __init__(self, dim=64):
+        self.dim = dim
+
+    def _embed(self, text):
+        vector = [0.0] * self.dim
+        for token in text.split():
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            vector[index] += 1.0 if digest[4] % 2 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+
+class FakeMetadata:
+    def __init__(self, distance=None, score=None):
+        self.distance = distance
+        self.score = score
+
+
+class FakeObject:
+    def __init__(self, properties, vector=None, object_uuid=None, metadata=None):
+        self.uuid = object_uuid or uuid.uuid4()
+        self.properties = properties
+        self.vector = {"default": vector} if vector is not None else {}
+        self.metadata = metadata
+
+
+class FakeResponse:
+    def __init__(self, objects):
+        self.objects = objects
+
+
+def _filter_operator(flt):
+    operator = getattr(flt, "operator", None)
+    return getattr(operator, "value", operator)
+
+
+def _filter_target(flt):
+    target = getattr(flt, "target", None)
+    return getattr(target, "target", target)
+
+
+def _like_to_regex(pattern):
+    # Weaviate Like 와일드카드(*, ?)와 rag에서 쓰는 SQL 스타일 %를 함께 지원
+    regex = ""
+    for ch in pattern:
+        if ch in "*%":
+            regex += ".*"
+        elif ch == "?":
+            regex += "."
+        else:
+            regex += re.escape(ch)
+    return re.compile("^" + regex + "$", re.S)
+
+
+def _comparable(value, expected):
+    # 날짜 속성은 RFC 3339 문자열로 저장되므로 datetime 필터 값과 비교할 수 있게 변환
+    if isinstance(expected, datetime) and isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def matches_filter(flt, properties):
+    """weaviate Filter 객체를 속성 dict에 대해 평가 (지원 연산자만)"""
+    if flt is None:
+        return True
+
+    operator = _filter_operator(flt)
+    if operator == "And":
+        return all(matches_filter(f, properties) for f in flt.filters)
+    if operator == "Or":
+        return any(matches_filter(f, properties) for f in flt.filters)
+
+    expected = flt.value
+    value = _comparable(properties.get(_filter_target(flt)), expected)
+    if operator == "Like":
+        return value is not None and bool(_like_to_regex(expected).match(str(value)))
+    if operator == "Equal":
+        return value == expected
+    if operator == "NotEqual":
+        return value != expected
+    if operator == "ContainsAny":
+        return value in expected
+    if operator == "GreaterThan":
+        return value is not None and value > expected
+    if operator == "GreaterThanEqual":
+        return value is not None and value >= expected
+    if operator == "LessThan":
+        return value is not None and value < expected
+    if operator == "LessThanEqual":
+        return value is not None and value <= expected
+    raise NotImplementedError(f"지원하지 않는 필터 연산자: {operator}")
+
+
+class FakeQuery:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def _objects(self):
+        if self._collection.multi_tenancy:
+            raise ValueError(
+                f"멀티 테넌트 컬렉션 {self._collection.name}은 with_tenant()로만 조회할 수 있습니다."
+            )
+        return self._collection.objects
+
+    def _select(self, obj, return_properties, include_vector, metadata=None):
+        props = obj.properties
+        if return_properties:
+            props = {k: props[k] for k in return_properties if k in props}
+        return FakeObject(
+            dict(props),
+            obj.vector.get("default") if include_vector else None,
+            obj.uuid,
+            metadata,
+        )
+
+    def near_vector(
+        self,
+        near_vector,
+        limit=10,
+        return_properties=None,
+        include_vector=False,
+        filters=None,
+        **kwargs,
+    ):
+        self._collection.simulate_latency()
+        scored = []
+        for obj in self._objects():
+            if not matches_filter(filters, obj.properties):
+                continue
+            vector = obj.vector.get("default")
+            score = sum(a * b for a, b in zip(near_vector, vector))
+            scored.append((score, obj))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return FakeResponse(
+            [
+                # 정규화된 벡터 기준 코사인 거리
+                self._select(
+                    obj, return_properties, include_vector, FakeMetadata(distance=1 - score)
+                )
+                for score, obj in scored[:limit]
+            ]
+        )
+
+    def bm25(self, query, query_properties=None, limit=10, filters=None, **kwargs):
+        self._collection.simulate_latency()
+        terms = query.split()
+        fields = query_properties or ["content"]
+        scored = []
+        for obj in self._objects():
+            if not matches_filter(filters, obj.properties):
+                continue
+            text = " ".join(str(obj.properties.get(f, "")) for f in fields)
+            score = sum(text.count(term) for term in terms)
+            if score:
+                scored.append((score, obj))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return FakeResponse(
+            [
+                self._select(obj, None, False, FakeMetadata(score=float(score)))
+                for score, obj in scored[:limit]
+            ]
+        )
+
+    def fetch_objects(
+        self, limit=10, return_properties=None, filters=None, include_vector=False, **kwargs
+    ):
+        self._collection.simulate_latency()
+        objects = []
+        for obj in self._objects():
+            if matches_filter(filters, obj.properties):
+                objects.append(self._select(obj, return_properties, include_vector))
+                if len(objects) >= limit:
+                    break
+        return FakeResponse(objects)
+
+    def iterator(self, include_vector=False, return_properties=None, **kwargs):
+        for obj in self._objects():
+            yield self._select(obj, return_properties, include_vector)
+
+
+class FakeAggregateResult:
+    def __init__(self, total_count):
+        self.total_count = total_count
+
+
+class FakeAggregate:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def over_all(self, total_count=True, filters=None, **kwargs):
+        objects = self._collection.query._objects()
+        return FakeAggregateResult(
+            sum(1 for obj in objects if matches_filter(filters, obj.properties))
+        )
+
+
+class FakeBatchResult:
+    def __init__(self, uuids):
+        self.uuids = uuids
+        self.errors = {}
+        self.has_errors = False
+
+
+class FakeData:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def insert_many(self, objects):
+        """DataObject 목록 추가. 같은 UUID가 있으면 덮어씀 (Weaviate 배치 가져오기와 같음)"""
+        collection = self._collection
+        positions = {obj.uuid: i for i, obj in enumerate(collection.objects)}
+        uuids = {}
+        for index, item in enumerate(objects):
+            obj = FakeObject(dict(item.properties), item.vector, item.uuid)
+            if item.uuid in positions:
+                collection.objects[positions[item.uuid]] = obj
+            else:
+                positions[item.uuid] = len(collection.objects)
+                collection.objects.append(obj)
+            uuids[index] = item.uuid
+        return FakeBatchResult(uuids)
+
+
+class FakeTenant:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeTenants:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def create(self, tenants):
+        for tenant in tenants if isinstance(tenants, (list, tuple)) else [tenants]:
+            self._collection.with_tenant(getattr(tenant, "name", tenant))
+
+    def get(self):
+        return {name: FakeTenant(name) for name in self._collection.tenant_collections}
+
+    def remove(self, tenants):
+        for tenant in tenants if isinstance(tenants, (list, tuple)) else [tenants]:
+            self._collection.tenant_collections.pop(getattr(tenant, "name", tenant), None)
+
+
+class FakeCollection:
+    def __init__(
+        self,
+        name,
+        objects=None,
+        latency=0.0,
+        jitter=0.0,
+        seed=0,
+        multi_tenancy=False,
+        stall_rate=0.0,
+        stall=0.0,
+    ):
+        self.name = name
+        self.objects = list(objects or [])
+        self.latency = latency
+        self.jitter = jitter
+        self.stall_rate = stall_rate  # 이 확률로 stall초 추가 지연 (GC 멈춤/컴팩션 흉내)
+        self.stall = stall
+        self.multi_tenancy = multi_tenancy
+        self.tenant = None
+        self.tenant_collections = {}  # 테넌트 이름 -> 테넌트별 컬렉션(별도 인덱스)
+        self._rng = random.Random(seed)
+        self.query = FakeQuery(self)
+        self.aggregate = FakeAggregate(self)
+        self.tenants = FakeTenants(self)
+        self.data = FakeData(self)
+
+    def iterator(self, include_vector=False, return_properties=None, **kwargs):
+        """전체 객체 순회 (Weaviate v4 collection.iterator 대역)"""
+        return self.query.iterator(include_vector, return_properties)
+
+    def with_tenant(self, tenant):
+        """테넌트 전용 컬렉션 (없으면 자동 생성)"""
+        if not self.multi_tenancy:
+            raise ValueError(f"{self.name}은 멀티 테넌트 컬렉션이 아닙니다.")
+        name = getattr(tenant, "name", tenant)
+        if name not in self.tenant_collections:
+            child = FakeCollection(
+                self.name,
+                latency=self.latency,
+                jitter=self.jitter,
+                seed=self._rng.random(),
+                stall_rate=self.stall_rate,
+                stall=self.stall,
+            )
+            child.tenant = name
+            self.tenant_collections[name] = child
+        return self.tenant_collections[name]
+
+    def simulate_latency(self):
+        """주입된 지연 시간 흉내 (초 단위, 지터 포함)"""
+        delay = self.latency
+        if self.jitter:
+            delay += self._rng.uniform(0, self.jitter)
+        if self.stall_rate and self._rng.random() < self.stall_rate:
+            delay += self.stall
+        if delay > 0:
+            time.sleep(delay)
+
+
+class FakeCollections:
+    def __init__(self, client):
+        self._client = client
+        self._collections = {}
+
+    def exists(self, name):
+        return name in self._collections
+
+    def create(self, name, multi_tenancy_config=None, **kwargs):
+        collection = FakeCollection(
+            name,
+            latency=self._client.latency,
+            jitter=self._client.jitter,
+            seed=self._client.seed,
+            multi_tenancy=bool(getattr(multi_tenancy_config, "enabled", multi_tenancy_config)),
+            stall_rate=self._client.stall_rate,
+            stall=self._client.stall,
+        )
+        self._collections[name] = collection
+        return collection
+
+    def get(self, name):
+        if name not in self._collections:
+            return self.create(name)
+        return self._collections[name]
+
+    def list_all(self, simple=True):
+        return {name: collection for name, collection in self._collections.items()}
+
+    def delete(self, name):
+        self._collections.pop(name, None)
+
+
+class FakeWeaviateClient:
+    """rag/api가 사용하는 weaviate 클라이언트 API의 인메모리 대역"""
+
+    def __init__(self, latency=0.0, jitter=0.0, stall_rate=0.0, stall=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.seed = seed
+        self.collections = FakeCollections(self)
+
+    def replica(self, latency=None, jitter=None, stall_rate=None, stall=None, seed=0):
+        """같은 데이터를 가진 읽기 복제본 (지연 설정만 다르게 줄 수 있음)"""
+        clone = FakeWeaviateClient(
+            self.latency if latency is None else latency,
+            self.jitter if jitter is None else jitter,
+            self.stall_rate if stall_rate is None else stall_rate,
+            self.stall if stall is None else stall,
+            seed,
+        )
+        for name, source in self.collections._collections.items():
+            target = clone.collections.create(name, multi_tenancy_config=source.multi_tenancy)
+            target.objects = source.objects
+            for tenant, child in source.tenant_collections.items():
+                target.with_tenant(tenant).objects = child.objects
+        return clone
+
+    def add_objects(self, collection_name, items, embedding, tenant_key="channel_id"):
+        """(properties) 목록을 임베딩해 컬렉션에 추가 (멀티 테넌트면 tenant_key 값별 테넌트로)"""
+        collection = self.collections.get(collection_name)
+        vectors = embedding.embed_documents([item["content"] for item in items])
+        for item, vector in zip(items, vectors):
+            target = collection
+            if collection.multi_tenancy:
+                target = collection.with_tenant(item[tenant_key])
+            target.objects.append(FakeObject(dict(item), vector))
+        return collection
+
+    def is_ready(self):
+        return True
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        # 여러 요청이 같은 인스턴스를 공유하므로 연결 종료는 무시
+        pass
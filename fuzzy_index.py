@@ -0,0 +1,517 @@
+"""오타 허용 검색 (자모 n-gram 색인 + 편집 거리 검증)
+
+자동 생성 자막은 "먹어"를 "머거"로, "했는데"를 "핸는데"로 적는 식의 오인식이 많아
+LIKE '%...%'(exact_match)로는 찾지 못하는 경우가 많습니다. 여기서는
+- 한글 음절을 초성/중성/종성 자모로 풀고(공백, 문장부호 제거) 자막 세그먼트마다
+  자모 n-gram(기본 3)을 색인하고
+- 질의의 n-gram을 충분히 많이 가진 세그먼트(이웃 세그먼트와 이어 붙인 구간)만 후보로 고른 뒤
+- 후보 안에서 질의와 가장 가까운 부분 문자열의 자모 편집 거리를 계산해
+  질의 길이의 max_error_rate 이내인 것만 돌려줍니다.
+결과는 청크가 아니라 일치가 시작되는 세그먼트의 시작 시각을 가리킵니다.
+
+초성과 같은 받침은 같은 자모 문자로 풀고 소리 없는 초성 ㅇ은 지우기 때문에, 연음처럼
+받침이 다음 음절로 넘어간 오인식("먹어"/"머거")은 편집 거리 0이 됩니다.
+
+색인은 배열 파일로 저장해 API 프로세스들이 메모리 맵으로 공유합니다.
+
+    python fuzzy_index.py build      # TRANSCRIPTS_DIR 전체로 색인 생성 (자막 추가 후 다시 실행)
+    python fuzzy_index.py search "머거 봐야 알지"
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import argparse
+import threading
+from array import array
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import numpy as np
+
+from config import (
+    TRANSCRIPTS_DIR,
+    DEFAULT_CHANNEL_ID,
+    FUZZY_INDEX_DIR,
+    FUZZY_NGRAM,
+    FUZZY_MAX_ERROR_RATE,
+    FUZZY_CANDIDATES,
+)
+
+HANGUL_FIRST = 0xAC00
+HANGUL_LAST = 0xD7A3
+# 소리 없는 초성 ㅇ은 빈 문자열로 풀어 연음("먹어"/"머거")이 같은 자모열이 되게 함
+CHOSEONG = (
+    "ㄱ", "ㄲ", "ㄴ", "ㄷ", "ㄸ", "ㄹ", "ㅁ", "ㅂ", "ㅃ", "ㅅ",
+    "ㅆ", "", "ㅈ", "ㅉ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ",
+)
+JUNGSEONG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+JONGSEONG = (
+    "", "ㄱ", "ㄲ", "ㄳ", "ㄴ", "ㄵ", "ㄶ", "ㄷ", "ㄹ", "ㄺ", "ㄻ", "ㄼ", "ㄽ", "ㄾ",
+    "ㄿ", "ㅀ", "ㅁ", "ㅂ", "ㅄ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ",
+)
+
+INDEX_FORMAT = 1
+ARRAY_FILES = (
+    "offsets",
+    "postings",
+    "seg_video",
+    "seg_start",
+    "text_offsets",
+    "video_channel",
+    "video_published",
+)
+
+
+@lru_cache(maxsize=4096)
+def _decompose_char(char):
+    code = ord(char)
+    if HANGUL_FIRST <= code <= HANGUL_LAST:
+        offset = code - HANGUL_FIRST
+        return (
+            CHOSEONG[offset // 588]
+            + JUNGSEONG[(offset % 588) // 28]
+            + JONGSEONG[offset % 28]
+        )
+    if char.isalnum():
+        return char.lower()
+    return ""
+
+
+def to_jamo(text):
+    """한글은 자모로 풀고, 영문/숫자는 소문자로, 공백과 문장부호는 제거"""
+    return "".join(_decompose_char(char) for char in text)
+
+
+def ngrams(jamo, n):
+    return {jamo[i : i + n] for i in range(len(jamo) - n + 1)}
+
+
+def edit_distance_search(pattern, text):
+    """text의 부분 문자열 중 pattern과 편집 거리가 가장 작은 것의 (거리, 끝 위치)
+
+    Myers의 비트 병렬 알고리즘(근사 문자열 검색 변형). 파이썬 정수를 비트 벡터로 쓰므로
+    패턴 길이와 상관없이 text 글자당 정수 연산 십여 번이면 됩니다.
+    """
+    m = len(pattern)
+    if m == 0:
+        return 0, -1
+    peq = {}
+    for i, char in enumerate(pattern):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    best, best_end = m, -1
+    for j, char in enumerate(text):
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        # 근사 검색: text 어디서든 일치를 시작할 수 있으므로 맨 아래 비트를 채우지 않음
+        ph = (ph << 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        if score < best:
+            best, best_end = score, j
+    return best, best_end
+
+
+def match_span(pattern, text):
+    """가장 가까운 부분 문자열의 (거리, 시작, 끝). 시작은 뒤집어서 한 번 더 검색해 찾음"""
+    distance, end = edit_distance_search(pattern, text)
+    if end < 0:
+        return distance, 0, -1
+    _, reversed_end = edit_distance_search(pattern[::-1], text[end::-1])
+    return distance, end - reversed_end, end
+
+
+def _epoch(value):
+    if not value:
+        return np.nan
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class FuzzyIndex:
+    def __init__(
+        self,
+        n,
+        vocab,
+        offsets,
+        postings,
+        seg_video,
+        seg_start,
+        text_offsets,
+        text_blob,
+        videos,
+        channels,
+        video_channel,
+        video_published,
+    ):
+        self.n = n
+        self.vocab = vocab  # n-gram -> 번호
+        self.offsets = offsets  # n-gram 번호별 postings 구간 (CSR)
+        self.postings = postings  # 세그먼트 번호 (n-gram마다 오름차순)
+        self.seg_video = seg_video
+        self.seg_start = seg_start
+        self.text_offsets = text_offsets
+        self.text_blob = text_blob  # 세그먼트 원문 UTF-8을 이어 붙인 것
+        self.videos = videos
+        self.channels = channels
+        self.video_channel = video_channel
+        self.video_published = video_published
+        self.segment_jamo = lru_cache(maxsize=65536)(self._segment_jamo)
+
+    @property
+    def num_segments(self):
+        return len(self.seg_video)
+
+    # ---- 생성 / 저장 ----
+
+    @classmethod
+    def build(cls, transcripts, metadata=None, n=3):
+        """transcripts: (video_id, 세그먼트 목록) 반복자, metadata: video_id -> {channel_id, published_at}"""
+        metadata = metadata or {}
+        vocab = {}
+        gram_ids = array("i")
+        gram_segs = array("i")
+        seg_video = array("i")
+        seg_start = array("d")
+        text_offsets = array("q", [0])
+        texts = []
+        text_size = 0
+        videos, channels, channel_ids = [], [], {}
+        video_channel, video_published = array("i"), array("d")
+
+        for video_id, segments in transcripts:
+            meta = metadata.get(video_id, {})
+            channel = meta.get("channel_id", DEFAULT_CHANNEL_ID)
+            video_index = len(videos)
+            videos.append(video_id)
+            video_channel.append(channel_ids.setdefault(channel, len(channel_ids)))
+            if len(channel_ids) > len(channels):
+                channels.append(channel)
+            video_published.append(_epoch(meta.get("published_at")))
+
+            for seg in segments:
+                seg_id = len(seg_video)
+                seg_video.append(video_index)
+                seg_start.append(float(seg["start"]))
+                encoded = seg["text"].encode("utf-8")
+                texts.append(encoded)
+                text_size += len(encoded)
+                text_offsets.append(text_size)
+                for gram in ngrams(to_jamo(seg["text"]), n):
+                    gram_ids.append(vocab.setdefault(gram, len(vocab)))
+                    gram_segs.append(seg_id)
+
+        gram_ids = np.frombuffer(gram_ids, dtype=np.int32)
+        order = np.argsort(gram_ids, kind="stable")  # n-gram 안에서는 세그먼트 번호 순서 유지
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(gram_ids, minlength=len(vocab)), out=offsets[1:])
+        return cls(
+            n,
+            vocab,
+            offsets,
+            np.frombuffer(gram_segs, dtype=np.int32)[order],
+            np.frombuffer(seg_video, dtype=np.int32),
+            np.frombuffer(seg_start, dtype=np.float64),
+            np.frombuffer(text_offsets, dtype=np.int64),
+            b"".join(texts),
+            videos,
+            channels,
+            np.frombuffer(video_channel, dtype=np.int32),
+            np.frombuffer(video_published, dtype=np.float64),
+        )
+
+    def save(self, directory):
+        """임시 디렉터리에 쓴 뒤 이름을 바꿔, 읽는 쪽이 반쯤 쓴 색인을 보지 않게 함"""
+        tmp = f"{directory}.tmp"
+        os.makedirs(tmp, exist_ok=True)
+        for name in ARRAY_FILES:
+            np.save(os.path.join(tmp, f"{name}.npy"), np.asarray(getattr(self, name)))
+        with open(os.path.join(tmp, "texts.bin"), "wb") as f:
+            f.write(self.text_blob)
+        with open(os.path.join(tmp, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(sorted(self.vocab, key=self.vocab.get), f, ensure_ascii=False)
+        with open(os.path.join(tmp, "videos.json"), "w", encoding="utf-8") as f:
+            json.dump({"videos": self.videos, "channels": self.channels}, f, ensure_ascii=False)
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "format": INDEX_FORMAT,
+                    "n": self.n,
+                    "segments": self.num_segments,
+                    "videos": len(self.videos),
+                    "ngrams": len(self.vocab),
+                    "built_at": datetime.now().isoformat(timespec="seconds"),
+                },
+                f,
+            )
+        if os.path.exists(directory):
+            old = f"{directory}.old"
+            os.rename(directory, old)
+            os.rename(tmp, directory)
+            for name in os.listdir(old):
+                os.remove(os.path.join(old, name))
+            os.rmdir(old)
+        else:
+            os.rename(tmp, directory)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != INDEX_FORMAT:
+            raise RuntimeError("색인 형식이 다릅니다. 다시 생성하세요: python fuzzy_index.py build")
+        with open(os.path.join(directory, "vocab.json"), "r", encoding="utf-8") as f:
+            vocab = {gram: i for i, gram in enumerate(json.load(f))}
+        with open(os.path.join(directory, "videos.json"), "r", encoding="utf-8") as f:
+            videos = json.load(f)
+
+        def array_file(name):
+            # 큰 배열은 메모리 맵으로 열어 여러 프로세스가 페이지 캐시를 공유
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+
+        with open(os.path.join(directory, "texts.bin"), "rb") as f:
+            text_blob = b""
+            if os.fstat(f.fileno()).st_size:
+                text_blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        arrays = {name: array_file(name) for name in ARRAY_FILES}
+        return cls(
+            meta["n"],
+            vocab,
+            arrays["offsets"],
+            arrays["postings"],
+            arrays["seg_video"],
+            arrays["seg_start"],
+            arrays["text_offsets"],
+            text_blob,
+            videos["videos"],
+            videos["channels"],
+            arrays["video_channel"],
+            arrays["video_published"],
+        )
+
+    # ---- 검색 ----
+
+    def segment_text(self, seg_id):
+        start, end = int(self.text_offsets[seg_id]), int(self.text_offsets[seg_id + 1])
+        return bytes(self.text_blob[start:end]).decode("utf-8")
+
+    def _segment_jamo(self, seg_id):
+        return to_jamo(self.segment_text(seg_id))
+
+    def _posting(self, gram_id):
+        return self.postings[self.offsets[gram_id] : self.offsets[gram_id + 1]]
+
+    def _allowed_videos(self, channel_ids=None, date_from=None, date_to=None):
+        """범위 조건에 맞는 영상 마스크 (조건이 없으면 None)"""
+        if not channel_ids and date_from is None and date_to is None:
+            return None
+        allowed = np.ones(len(self.videos), dtype=bool)
+        if channel_ids:
+            channel_ids = set(channel_ids)
+            wanted = [i for i, channel in enumerate(self.channels) if channel in channel_ids]
+            allowed &= np.isin(self.video_channel, wanted)
+        published = np.asarray(self.video_published)
+        if date_from is not None:
+            allowed &= published >= date_from.timestamp()
+        if date_to is not None:
+            allowed &= published <= date_to.timestamp()
+        return allowed
+
+    def candidates(self, gram_ids, required, limit, allowed=None):
+        """n-gram을 required개 이상 가진 구간(세그먼트 w와 다음 세그먼트)의 시작 번호, 겹친 수
+
+        구간이 required개를 가지려면 가장 드문 n-gram (개수 - required + 1)개 중 하나는
+        반드시 포함해야 하므로, 그 목록에서만 후보를 모으고 나머지 목록은 이분 탐색으로
+        포함 여부만 셉니다. 흔한 n-gram의 긴 postings를 합치지 않아도 됩니다.
+        """
+        lists = sorted((self._posting(g) for g in gram_ids), key=len)
+        seeds = np.unique(np.concatenate(lists[: len(lists) - required + 1]))
+        if not len(seeds):
+            return seeds, seeds
+        starts = np.union1d(seeds, seeds[seeds > 0] - 1)
+        seg_video = self.seg_video
+        nexts = np.minimum(starts + 1, len(seg_video) - 1)
+        same_video = (starts + 1 < len(seg_video)) & (seg_video[nexts] == seg_video[starts])
+
+        counts = np.zeros(len(starts), dtype=np.int32)
+        for posting in lists:
+            last = len(posting) - 1
+            idx = np.searchsorted(posting, starts)
+            in_start = posting[np.minimum(idx, last)] == starts
+            # starts가 오름차순이므로 다음 세그먼트 위치는 idx부터 찾으면 됨
+            nxt = idx + in_start
+            in_next = (posting[np.minimum(nxt, last)] == nexts) & same_video & (nxt <= last)
+            counts += in_start | in_next
+
+        keep = counts >= required
+        if allowed is not None:
+            keep &= allowed[seg_video[starts]]
+        starts, counts = starts[keep], counts[keep]
+        if len(starts) > limit:
+            top = np.argpartition(-counts, limit - 1)[:limit]
+            starts, counts = starts[top], counts[top]
+        return starts, counts
+
+    def search(
+        self,
+        query,
+        k=10,
+        channel_ids=None,
+        date_from=None,
+        date_to=None,
+        max_error_rate=0.25,
+        max_candidates=200,
+    ):
+        """[{"video_id", "start", "content", "distance", "score"}] (거리 오름차순)"""
+        query_jamo = to_jamo(query)
+        n = self.n
+        if len(query_jamo) < n:
+            return []
+        query_grams = ngrams(query_jamo, n)
+        # 편집 하나는 n-gram을 최대 n개 깨뜨리므로, 허용 거리 d면 최소 len - n*d개는 남아야 함.
+        # 짧은 질의에서 이 값이 0 이하가 되지 않도록 허용 거리를 줄임 (짧으면 자모 단위 정확 일치)
+        max_distance = min(
+            int(len(query_jamo) * max_error_rate), (len(query_grams) - 1) // n
+        )
+        required = len(query_grams) - n * max_distance
+        gram_ids = [self.vocab[gram] for gram in query_grams if gram in self.vocab]
+        if len(gram_ids) < required:
+            return []
+
+        allowed = self._allowed_videos(channel_ids, date_from, date_to)
+        starts, counts = self.candidates(gram_ids, required, max_candidates, allowed)
+
+        matches = {}
+        for start, count in zip(starts.tolist(), counts.tolist()):
+            first = self.segment_jamo(start)
+            window = first
+            end_seg = start
+            if start + 1 < self.num_segments and self.seg_video[start + 1] == self.seg_video[start]:
+                window = first + self.segment_jamo(start + 1)
+                end_seg = start + 1
+            distance, match_start, match_end = match_span(query_jamo, window)
+            if distance > max_distance:
+                continue
+            # 일치가 시작되는 세그먼트의 시각을 사용
+            seg_id = start if match_start < len(first) else end_seg
+            last_seg = start if match_end < len(first) else end_seg
+            previous = matches.get(seg_id)
+            if previous is None or (distance, -count) < (previous[0], -previous[1]):
+                matches[seg_id] = (distance, count, last_seg)
+
+        ranked = sorted(matches.items(), key=lambda item: (item[1][0], -item[1][1], item[0]))
+        results = []
+        for seg_id, (distance, count, last_seg) in ranked[:k]:
+            content = " ".join(self.segment_text(s) for s in range(seg_id, last_seg + 1))
+            results.append(
+                {
+                    "video_id": self.videos[int(self.seg_video[seg_id])],
+                    "start": float(self.seg_start[seg_id]),
+                    "content": content,
+                    "distance": distance,
+                    "score": round(1 - distance / len(query_jamo), 3),
+                }
+            )
+        return results
+
+
+def iter_transcript_files(transcripts_dir=TRANSCRIPTS_DIR):
+    for file_name in sorted(os.listdir(transcripts_dir)):
+        if not file_name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(transcripts_dir, file_name), "r", encoding="utf-8") as f:
+                yield file_name[: -len(".json")], json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 자막 파일을 건너뜁니다 ({file_name}): {str(e)}")
+
+
+def build_index(directory=FUZZY_INDEX_DIR, transcripts_dir=TRANSCRIPTS_DIR, n=FUZZY_NGRAM):
+    from database import load_video_metadata
+
+    start = time.time()
+    index = FuzzyIndex.build(iter_transcript_files(transcripts_dir), load_video_metadata(), n)
+    index.save(directory)
+    print(
+        f"✅ 오타 허용 검색 색인 생성: 영상 {len(index.videos)}개, 세그먼트 {index.num_segments}개, "
+        f"{n}-gram {len(index.vocab)}종 ({time.time() - start:.1f}초)"
+    )
+    return index
+
+
+class IndexHolder:
+    """API 프로세스에서 색인을 한 번 열어 두고, 다시 생성되면(meta.json 변경) 새로 엶"""
+
+    def __init__(self, directory=FUZZY_INDEX_DIR):
+        self.directory = directory
+        self._index = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        meta_path = os.path.join(self.directory, "meta.json")
+        try:
+            mtime = os.stat(meta_path).st_mtime
+        except FileNotFoundError:
+            raise RuntimeError(
+                "오타 허용 검색 색인이 없습니다. python fuzzy_index.py build로 생성하세요."
+            )
+        if self._index is None or mtime != self._mtime:
+            with self._lock:
+                if self._index is None or mtime != self._mtime:
+                    self._index = FuzzyIndex.load(self.directory)
+                    self._mtime = mtime
+        return self._index
+
+    @property
+    def loaded(self):
+        return self._index is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="오타 허용 검색 색인")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = sub.add_parser("build", help="TRANSCRIPTS_DIR로 색인 생성")
+    build_parser.add_argument("--dir", default=FUZZY_INDEX_DIR)
+    build_parser.add_argument("--n", type=int, default=FUZZY_NGRAM)
+
+    search_parser = sub.add_parser("search", help="색인으로 검색")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--dir", default=FUZZY_INDEX_DIR)
+    search_parser.add_argument("-k", type=int, default=10)
+    search_parser.add_argument("--max-error-rate", type=float, default=FUZZY_MAX_ERROR_RATE)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        build_index(args.dir, n=args.n)
+        return 0
+
+    index = FuzzyIndex.load(args.dir)
+    start = time.perf_counter()
+    results = index.search(
+        args.query, args.k, max_error_rate=args.max_error_rate, max_candidates=FUZZY_CANDIDATES
+    )
+    print(f"🔎 {len(results)}건 ({(time.perf_counter() - start) * 1000:.1f}ms)")
+    for r in results:
+        print(f"- {r['video_id']} {r['start']:.2f}s (거리 {r['distance']}): {r['content']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
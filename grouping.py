@@ -0,0 +1,128 @@
+"""영상별로 묶은 검색 결과와 페이지 커서
+
+평범한 벡터 검색은 상위 청크 7개를 그대로 돌려주므로 긴 영상 하나가 결과를 채우기 쉽습니다.
+여기서는 청크를 한 번 넉넉히(GROUP_FETCH_LIMIT개) 가져와 거리순으로 훑으면서 영상별로
+묶고(영상마다 서로 겹치지 않는 장면 몇 개), 묶은 결과 전체를 커서 저장소에 한 번 저장합니다.
+다음 페이지 요청은 커서로 저장된 결과의 다음 구간만 읽으므로 검색을 다시 하지 않습니다.
+
+커서 저장소는 여러 API 프로세스가 공유하도록 Redis를 쓰고, URL이 비어 있으면
+프로세스 안에서만 보관합니다 (API 워커가 하나일 때).
+"""
+
+import json
+import time
+import secrets
+from collections import OrderedDict
+
+import redis.asyncio as aioredis
+
+
+def _distance(obj):
+    value = getattr(getattr(obj, "metadata", None), "distance", None)
+    return 1.0 if value is None else value
+
+
+def group_by_video(objects, moments_per_video=3, max_videos=50, time_window=30.0):
+    """거리순 objects를 [(video_id, [장면 objects], 영상에서 찾은 청크 수)]로 묶음
+
+    영상 순서는 가장 가까운 청크 순. 같은 영상에서 이미 고른 장면과 time_window초 이내로
+    겹치는 청크는 장면으로 고르지 않습니다 (diversify와 같은 기준). 후보를 한 번만 훑습니다.
+    """
+    groups = OrderedDict()
+    hit_counts = {}
+    for obj in objects:
+        props = obj.properties
+        video_id = props["video_id"]
+        moments = groups.get(video_id)
+        if moments is None:
+            if len(groups) >= max_videos:
+                continue
+            moments = groups[video_id] = []
+        hit_counts[video_id] = hit_counts.get(video_id, 0) + 1
+        if len(moments) >= moments_per_video:
+            continue
+        start = props["start"]
+        end = props.get("end", start)
+        if any(
+            start <= chosen.properties.get("end", chosen.properties["start"]) + time_window
+            and chosen.properties["start"] <= end + time_window
+            for chosen in moments
+        ):
+            continue
+        moments.append(obj)
+    return [(video_id, moments, hit_counts[video_id]) for video_id, moments in groups.items()]
+
+
+def similarity(obj):
+    """코사인 거리 -> 유사도"""
+    return round(1.0 - _distance(obj), 4)
+
+
+def encode_cursor(result_id, offset):
+    return f"{result_id}.{offset}"
+
+
+def decode_cursor(cursor):
+    """(result_id, offset) 또는 형식이 틀리면 None"""
+    result_id, _, offset = cursor.rpartition(".")
+    if not result_id or not offset.isdigit():
+        return None
+    return result_id, int(offset)
+
+
+class CursorStore:
+    """묶은 검색 결과를 커서 id로 TTL 동안 보관"""
+
+    def __init__(self, redis_url=None, ttl=600.0, max_local=256, prefix="grouped"):
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self.max_local = max_local
+        self.prefix = prefix
+        self._local = OrderedDict()  # result_id -> (만료 시각, payload)
+        self._redis = None
+        self.redis_errors = 0
+
+    def _get_redis(self):
+        if self._redis is None and self.redis_url:
+            self._redis = aioredis.from_url(self.redis_url)
+        return self._redis
+
+    def _put_local(self, result_id, payload):
+        self._local[result_id] = (time.time() + self.ttl, payload)
+        while len(self._local) > self.max_local:
+            self._local.popitem(last=False)
+
+    async def save(self, payload):
+        result_id = secrets.token_urlsafe(12)
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                await redis.set(
+                    f"{self.prefix}:{result_id}",
+                    json.dumps(payload, ensure_ascii=False),
+                    px=int(self.ttl * 1000),
+                )
+                return result_id
+            except Exception as e:
+                # Redis 장애 시 이 프로세스에만 보관 (다른 프로세스로 간 다음 페이지 요청은 만료 처리)
+                self.redis_errors += 1
+                print(f"⚠️ 검색 커서 Redis 오류: {str(e)}")
+        self._put_local(result_id, payload)
+        return result_id
+
+    async def load(self, result_id):
+        """저장된 payload 또는 만료/없음이면 None"""
+        entry = self._local.get(result_id)
+        if entry is not None:
+            if entry[0] > time.time():
+                return entry[1]
+            self._local.pop(result_id, None)
+        redis = self._get_redis()
+        if redis is None:
+            return None
+        try:
+            cached = await redis.get(f"{self.prefix}:{result_id}")
+        except Exception:
+            self.redis_errors += 1
+            return None
+        return json.loads(cached) if cached is not None else None
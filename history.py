@@ -0,0 +1,296 @@
+"""검색 기록 로그
+
+요청 경로에서는 메모리 큐에 넣기만 하고, 백그라운드 스레드가 모아서
+gzip 압축 JSONL 세그먼트 파일에 추가합니다. 세그먼트는 크기/기간 기준으로
+교체되며, 최근/인기 검색어 조회용 인메모리 인덱스를 함께 유지합니다.
+"""
+
+import os
+import glob
+import gzip
+import json
+import time
+import queue
+import atexit
+import threading
+from collections import Counter, deque
+from datetime import datetime
+
+FULL_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+_STOP = object()
+
+
+def normalize_query(question):
+    """인기 검색어 집계용 정규화 (앞뒤 공백 제거, 연속 공백 축약)"""
+    return " ".join(question.split())
+
+
+def _iter_segment(path):
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    except (EOFError, OSError, json.JSONDecodeError):
+        # 쓰는 도중 종료된 마지막 배치는 건너뜀
+        return
+
+
+def iter_history(directory):
+    """저장된 검색 기록 순회 (이전 방식의 search_*.json 파일 포함, 오래된 순)"""
+    for path in sorted(glob.glob(os.path.join(directory, "search_*.json"))):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                yield json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+
+    for path in sorted(glob.glob(os.path.join(directory, "history_*.jsonl.gz"))):
+        yield from _iter_segment(path)
+
+
+def load_popular_queries(directory, limit=50):
+    """쓰기 스레드 없이 저장된 기록에서 인기 검색어만 읽기"""
+    counts = Counter()
+    originals = {}
+    for entry in iter_history(directory):
+        question = entry.get("question")
+        if not question:
+            continue
+        key = normalize_query(question)
+        counts[key] += 1
+        originals.setdefault(key, question)
+    return [originals[key] for key, _ in counts.most_common(limit)]
+
+
+class SearchHistoryLog:
+    def __init__(
+        self,
+        directory="search_history",
+        max_queue=10000,
+        batch_size=200,
+        flush_interval=1.0,
+        segment_max_bytes=16 * 1024 * 1024,
+        segment_max_age=24 * 60 * 60,
+        full_policy="drop_newest",
+        block_timeout=0.05,
+        recent_size=1000,
+    ):
+        if full_policy not in FULL_POLICIES:
+            raise ValueError(f"알 수 없는 큐 정책: {full_policy}")
+
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_age = segment_max_age
+        self.full_policy = full_policy
+        self.block_timeout = block_timeout
+
+        os.makedirs(directory, exist_ok=True)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._write_lock = threading.Lock()
+        self._segment_path = None
+        self._segment_opened_at = 0.0
+
+        # 조회용 인덱스 (처음 조회할 때 기존 파일에서 로드)
+        self._index_loaded = False
+        self._recent = deque(maxlen=recent_size)
+        self._counts = Counter()
+
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+
+        self._thread = threading.Thread(
+            target=self._run, name="search-history-writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ---- 기록 ----
+
+    def record(self, question, results, search_type=None):
+        """검색 기록 추가 (디스크 I/O 없이 즉시 반환). 큐에 들어가면 True"""
+        entry = {
+            "timestamp": datetime.now().isoformat(timespec="milliseconds"),
+            "question": question,
+            "search_type": search_type,
+            "result_count": len(results),
+            "results": [
+                {"video_id": r["video_id"], "start_time": r["start_time"]}
+                for r in results
+            ],
+        }
+        self.recorded += 1
+
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            pass
+
+        if self.full_policy == "block":
+            try:
+                self._queue.put(entry, timeout=self.block_timeout)
+                return True
+            except queue.Full:
+                self.dropped += 1
+                return False
+
+        if self.full_policy == "drop_oldest":
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(entry)
+                return True
+            except queue.Full:
+                pass
+
+        self.dropped += 1
+        return False
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            stop = item is _STOP
+            if not stop:
+                batch.append(item)
+            while len(batch) < self.batch_size and not stop:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    print(f"❌ 검색 기록 저장 실패 ({len(batch)}건): {str(e)}")
+            # flush()가 꺼낸 뒤 아직 쓰지 않은 배치를 기다릴 수 있도록 완료 표시
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _current_segment(self):
+        now = time.time()
+        if (
+            self._segment_path is None
+            or now - self._segment_opened_at > self.segment_max_age
+            or (
+                os.path.exists(self._segment_path)
+                and os.path.getsize(self._segment_path) >= self.segment_max_bytes
+            )
+        ):
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            self._segment_path = os.path.join(
+                self.directory, f"history_{stamp}_{os.getpid()}.jsonl.gz"
+            )
+            self._segment_opened_at = now
+        return self._segment_path
+
+    def _write_batch(self, batch):
+        with self._write_lock:
+            self._write_locked(batch)
+
+    def _write_locked(self, batch):
+        lines = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in batch)
+        # 배치마다 독립된 gzip 멤버로 추가 (중간에 죽어도 앞 배치는 온전히 남음)
+        with gzip.open(self._current_segment(), "at", encoding="utf-8") as f:
+            f.write(lines)
+        self.written += len(batch)
+        if self._index_loaded:
+            for entry in batch:
+                self._index(entry)
+
+    def flush(self, timeout=5.0):
+        """큐에 쌓인 기록이 모두 쓰일 때까지 대기"""
+        deadline = time.time() + timeout
+        # 큐에 남은 기록은 잠금을 잡은 채로 직접 꺼내 씀 (쓰기 스레드와 경합하지 않음)
+        with self._write_lock:
+            batch = []
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    # 종료 신호는 쓰기 스레드에 그대로 돌려줌
+                    self._queue.put_nowait(item)
+                    self._queue.task_done()
+                    break
+                batch.append(item)
+            if batch:
+                try:
+                    self._write_locked(batch)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+        # 쓰기 스레드가 이미 꺼낸 배치가 끝날 때까지 대기
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._queue.all_tasks_done.wait(remaining)
+
+    def close(self):
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout=10)
+
+    # ---- 조회 ----
+
+    def _index(self, entry):
+        self._recent.append(entry)
+        self._counts[normalize_query(entry["question"])] += 1
+
+    def _ensure_index(self):
+        if self._index_loaded:
+            return
+        with self._write_lock:
+            if self._index_loaded:
+                return
+            for entry in iter_history(self.directory):
+                self._index(entry)
+            self._index_loaded = True
+
+    def recent(self, limit=20):
+        """최근 검색 기록 (최신순)"""
+        if limit <= 0:
+            return []
+        self._ensure_index()
+        with self._write_lock:
+            entries = list(self._recent)[-limit:]
+        return list(reversed(entries))
+
+    def popular(self, limit=20):
+        """많이 검색된 검색어 [(검색어, 횟수)]"""
+        self._ensure_index()
+        with self._write_lock:
+            return self._counts.most_common(limit)
+
+    def stats(self):
+        return {
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "full_policy": self.full_policy,
+        }
@@ -0,0 +1,114 @@
+"""검색이 사용할 Weaviate 컬렉션을 가리키는 포인터
+
+재색인은 버전이 붙은 새 컬렉션을 만든 뒤 이 포인터만 바꿔 전환합니다.
+파일 교체(os.replace)로 원자적으로 바뀌며, 검색 프로세스들은 파일 수정
+시각을 주기적으로 확인해 다시 읽습니다. 포인터 파일이 없으면 CLASS_NAME을
+사용합니다.
+
+컬렉션마다 어떤 임베딩 모델로 색인했는지도 함께 기록합니다(models). 모델을 바꾼
+재색인 후 전환하면 검색도 그 모델로 질의를 임베딩하고, 롤백하면 이전 모델로
+돌아갑니다. 기록이 없는 컬렉션은 EMBEDDING_MODEL을 사용합니다.
+"""
+
+import os
+import json
+import time
+from datetime import datetime
+
+from config import CLASS_NAME, EMBEDDING_MODEL, INDEX_POINTER_FILE
+
+CHECK_INTERVAL = 1.0  # 초
+
+_cache = {"mtime": None, "pointer": None, "checked_at": 0.0}
+
+
+def default_pointer():
+    return {"active": CLASS_NAME, "previous": None, "history": [], "models": {}}
+
+
+def read_pointer(path=INDEX_POINTER_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default_pointer()
+
+
+def write_pointer(pointer, path=INDEX_POINTER_FILE):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(pointer, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    _cache["checked_at"] = 0.0
+
+
+def _cached_pointer(path=INDEX_POINTER_FILE):
+    """CHECK_INTERVAL마다 파일 변경 여부만 확인하는 포인터"""
+    now = time.time()
+    if _cache["pointer"] is None or now - _cache["checked_at"] >= CHECK_INTERVAL:
+        _cache["checked_at"] = now
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if _cache["pointer"] is None or mtime != _cache["mtime"]:
+            _cache["pointer"] = read_pointer(path)
+            _cache["mtime"] = mtime
+    return _cache["pointer"]
+
+
+def active_collection_name(path=INDEX_POINTER_FILE):
+    """지금 검색할 컬렉션 이름"""
+    return _cached_pointer(path)["active"]
+
+
+def collection_model(name, path=INDEX_POINTER_FILE):
+    """name 컬렉션을 색인한 임베딩 모델 (기록이 없으면 EMBEDDING_MODEL)"""
+    return _cached_pointer(path).get("models", {}).get(name) or EMBEDDING_MODEL
+
+
+def active_embedding_model(path=INDEX_POINTER_FILE):
+    """지금 검색 질의를 임베딩할 모델 (검색 중인 컬렉션의 모델)"""
+    pointer = _cached_pointer(path)
+    return pointer.get("models", {}).get(pointer["active"]) or EMBEDDING_MODEL
+
+
+def set_collection_model(name, model, path=INDEX_POINTER_FILE):
+    """name 컬렉션을 model로 색인한다고 기록 (재색인 시 업로드 전에 호출)"""
+    pointer = read_pointer(path)
+    if pointer.get("models", {}).get(name) == model:
+        return pointer
+    pointer.setdefault("models", {})[name] = model
+    write_pointer(pointer, path)
+    return pointer
+
+
+def switch_active(name, reason="switch", path=INDEX_POINTER_FILE):
+    """name으로 전환하고 이전 컬렉션은 롤백용으로 기록"""
+    pointer = read_pointer(path)
+    if pointer["active"] == name:
+        return pointer
+    pointer["previous"] = pointer["active"]
+    pointer["active"] = name
+    pointer.setdefault("history", []).append(
+        {
+            "active": name,
+            "previous": pointer["previous"],
+            "reason": reason,
+            "model": pointer.get("models", {}).get(name) or EMBEDDING_MODEL,
+            "switched_at": datetime.now().isoformat(timespec="seconds"),
+        }
+    )
+    write_pointer(pointer, path)
+    return pointer
+
+
+def rollback(path=INDEX_POINTER_FILE):
+    """직전 컬렉션으로 되돌림"""
+    pointer = read_pointer(path)
+    if not pointer.get("previous"):
+        raise ValueError("되돌릴 이전 컬렉션이 없습니다.")
+    return switch_active(pointer["previous"], reason="rollback", path=path)
@@ -0,0 +1,452 @@
+"""Celery 워커로 나눠서 하는 색인
+
+database.upload_to_database는 한 프로세스가 TRANSCRIPTS_DIR의 파일을 차례로 올리므로
+전체 재색인 속도가 한 대의 임베딩 속도에 묶입니다. 여기서는 영상 목록을 샤드로 나눠
+색인 큐(CELERY_INGEST_QUEUE)의 태스크로 보내고, 여러 서버의 ingest 워커가 나눠 처리합니다.
+
+- 워커는 영상마다 청크 분할(upload_to_database와 같은 방식) → 배치 임베딩 → 업서트를 하며,
+  다음 배치 임베딩과 이전 배치 업서트를 겹쳐 실행합니다.
+- 청크 UUID는 (영상 ID, 청크 순번)으로 정해지는 UUID5이므로, 태스크가 재시도되거나 같은
+  영상을 다시 넣어도 객체가 중복되지 않고 덮어써집니다. 자막이 바뀌어 청크 수가 줄었으면
+  업서트가 끝난 뒤 남은 이전 청크를 지웁니다. 청크 크기를 바꾸는 경우처럼 순번이
+  달라지는 변경은 reindex.py로 새 컬렉션에 넣습니다.
+- 코디네이터는 실행(run)마다 Redis에 영상별 결과와 합계를 모아 진행률과 처리량을 보여줍니다.
+
+    python ingest.py start                      # 현재 검색 컬렉션에 새 자막 파일 색인
+    python ingest.py start --all --collection YoutubeTranscript_v20250101_000000
+    python ingest.py status <run_id>
+    python celery_worker.py ingest              # 색인 워커 (서버마다)
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import redis
+
+from index_pointer import active_collection_name
+from config import (
+    TRANSCRIPTS_DIR,
+    DEFAULT_CHANNEL_ID,
+    CHANNEL_TENANCY,
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    CELERY_INGEST_QUEUE,
+    PRIORITY_BULK,
+    INGEST_REDIS_URL,
+    INGEST_SHARD_SIZE,
+    INGEST_EMBED_BATCH_SIZE,
+)
+
+# 영상 하나에서 조회할 최대 청크 수 (Weaviate QUERY_MAXIMUM_RESULTS 기본값)
+MAX_CHUNKS_PER_VIDEO = 10000
+
+# 청크 UUID 네임스페이스 (바꾸면 기존 객체와 ID가 달라지므로 고정)
+CHUNK_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "youtube-rag-search/chunk")
+
+
+def chunk_uuid(video_id, index):
+    return uuid.uuid5(CHUNK_NAMESPACE, f"{video_id}/{index}")
+
+
+_splitter = None
+
+
+def chunk_transcript(video_id, transcript, meta):
+    """자막을 upload_to_database와 같은 방식으로 청크로 나눠 [(본문, 속성)] 반환"""
+    global _splitter
+    from database import convert_segments_to_docs
+
+    if _splitter is None:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        _splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+        )
+    docs = convert_segments_to_docs(
+        meta.get("channel_id", DEFAULT_CHANNEL_ID),
+        video_id,
+        transcript,
+        meta.get("published_at"),
+    )
+    return [(doc.page_content, dict(doc.metadata)) for doc in _splitter.split_documents(docs)]
+
+
+def load_transcript_file(video_id):
+    with open(os.path.join(TRANSCRIPTS_DIR, f"{video_id}.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _insert(collection, objects):
+    response = collection.data.insert_many(objects)
+    if response.has_errors:
+        first = next(iter(response.errors.values()))
+        raise RuntimeError(
+            f"업서트 실패 {len(response.errors)}/{len(objects)}건: {getattr(first, 'message', first)}"
+        )
+
+
+def delete_stale_chunks(collection, video_id, chunk_count):
+    """video_id의 청크 중 이번 색인에 없는 것(순번 >= chunk_count 등) 삭제. 삭제한 수 반환
+
+    다시 색인한 자막이 이전보다 짧으면 뒤쪽 청크가 남아 검색에 계속 나오므로 정리
+    """
+    from weaviate.classes.query import Filter
+
+    keep = {chunk_uuid(video_id, i) for i in range(chunk_count)}
+    response = collection.query.fetch_objects(
+        filters=Filter.by_property("video_id").equal(video_id),
+        limit=MAX_CHUNKS_PER_VIDEO,
+        return_properties=["video_id"],
+    )
+    stale = [obj.uuid for obj in response.objects if obj.uuid not in keep]
+    if stale:
+        collection.data.delete_many(where=Filter.by_id().contains_any(stale))
+    return len(stale)
+
+
+def upsert_chunks(
+    collection, embedding, video_id, chunks, batch_size=INGEST_EMBED_BATCH_SIZE, executor=None
+):
+    """청크를 batch_size씩 임베딩해 업서트. 다음 배치 임베딩 중에 이전 배치를 업서트함
+
+    업서트가 모두 성공하면 이번에 없는 이전 청크를 삭제.
+    {"chunks", "embed_seconds", "upsert_seconds", "deleted"} 반환
+    """
+    from weaviate.classes.data import DataObject
+
+    stats = {"chunks": len(chunks), "embed_seconds": 0.0, "upsert_seconds": 0.0}
+    pending = None
+
+    def insert(objects):
+        start = time.perf_counter()
+        _insert(collection, objects)
+        return time.perf_counter() - start
+
+    own_executor = executor is None
+    executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-upsert")
+    try:
+        for offset in range(0, len(chunks), batch_size):
+            batch = chunks[offset : offset + batch_size]
+            start = time.perf_counter()
+            vectors = embedding.embed_documents([text for text, _ in batch])
+            stats["embed_seconds"] += time.perf_counter() - start
+
+            objects = [
+                DataObject(
+                    properties={"content": text, **props},
+                    uuid=chunk_uuid(video_id, offset + i),
+                    vector=vector,
+                )
+                for i, ((text, props), vector) in enumerate(zip(batch, vectors))
+            ]
+            if pending is not None:
+                stats["upsert_seconds"] += pending.result()
+            pending = executor.submit(insert, objects)
+        if pending is not None:
+            stats["upsert_seconds"] += pending.result()
+        stats["deleted"] = delete_stale_chunks(collection, video_id, len(chunks))
+    finally:
+        if own_executor:
+            executor.shutdown(wait=True)
+    return stats
+
+
+class IngestRun:
+    """색인 실행 하나의 진행 상태 (Redis). 워커와 코디네이터가 함께 사용"""
+
+    def __init__(self, redis_client, run_id):
+        self.redis = redis_client
+        self.run_id = run_id
+        prefix = f"ingest:{run_id}"
+        self.meta_key = f"{prefix}:meta"
+        self.videos_key = f"{prefix}:videos"  # 영상 ID -> 결과 JSON (영상당 한 번만 기록)
+        self.stats_key = f"{prefix}:stats"
+        self.workers_key = f"{prefix}:workers"  # 워커 -> 처리한 청크 수
+
+    @staticmethod
+    def new_run_id():
+        return f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+    def create(self, collection_name, total, shards):
+        self.redis.hset(
+            self.meta_key,
+            mapping={
+                "collection": collection_name,
+                "total": total,
+                "shards": shards,
+                "started_at": time.time(),
+            },
+        )
+
+    def meta(self):
+        return {key.decode(): value.decode() for key, value in self.redis.hgetall(self.meta_key).items()}
+
+    def is_done(self, video_id):
+        return bool(self.redis.hexists(self.videos_key, video_id))
+
+    def record(self, video_id, worker_id, result):
+        """영상 결과 기록. 재시도로 같은 영상이 다시 오면 처음 결과만 남김"""
+        result = {**result, "worker": worker_id, "finished_at": time.time()}
+        if not self.redis.hsetnx(self.videos_key, video_id, json.dumps(result, ensure_ascii=False)):
+            return False
+        pipe = self.redis.pipeline()
+        if result["status"] == "success":
+            pipe.hincrby(self.stats_key, "success", 1)
+            pipe.hincrby(self.stats_key, "chunks", result["chunks"])
+            pipe.hincrbyfloat(self.stats_key, "embed_seconds", result["embed_seconds"])
+            pipe.hincrbyfloat(self.stats_key, "upsert_seconds", result["upsert_seconds"])
+            pipe.hincrby(self.workers_key, worker_id, result["chunks"])
+        else:
+            pipe.hincrby(self.stats_key, "failed", 1)
+        pipe.hset(self.meta_key, "last_update", time.time())
+        pipe.execute()
+        return True
+
+    def fail_remaining(self, video_ids, worker_id, error):
+        """재시도를 다 쓴 샤드의 남은 영상을 실패로 기록"""
+        for video_id in video_ids:
+            self.record(video_id, worker_id, {"status": "failed", "error": error})
+
+    def progress(self):
+        meta = self.meta()
+        stats = {key.decode(): float(value) for key, value in self.redis.hgetall(self.stats_key).items()}
+        workers = {
+            key.decode(): int(value) for key, value in self.redis.hgetall(self.workers_key).items()
+        }
+        total = int(meta.get("total", 0))
+        success = int(stats.get("success", 0))
+        failed = int(stats.get("failed", 0))
+        chunks = int(stats.get("chunks", 0))
+        started_at = float(meta.get("started_at", time.time()))
+        finished = success + failed >= total
+        end = float(meta.get("last_update", started_at)) if finished else time.time()
+        elapsed = max(end - started_at, 1e-9)
+        return {
+            "run_id": self.run_id,
+            "collection": meta.get("collection"),
+            "total": total,
+            "success": success,
+            "failed": failed,
+            "done": success + failed,
+            "finished": finished,
+            "chunks": chunks,
+            "elapsed_seconds": round(elapsed, 1),
+            "videos_per_second": round((success + failed) / elapsed, 2),
+            "chunks_per_second": round(chunks / elapsed, 1),
+            # 워커들의 임베딩/업서트 시간 합계 (경과 시간보다 크면 그만큼 병렬로 처리된 것)
+            "embed_seconds": round(stats.get("embed_seconds", 0.0), 1),
+            "upsert_seconds": round(stats.get("upsert_seconds", 0.0), 1),
+            "workers": workers,
+        }
+
+    def results(self):
+        return {
+            key.decode(): json.loads(value)
+            for key, value in self.redis.hgetall(self.videos_key).items()
+        }
+
+
+def ingest_shard(
+    run,
+    collection,
+    embedding,
+    video_ids,
+    metadata,
+    worker_id,
+    batch_size=INGEST_EMBED_BATCH_SIZE,
+    chunker=chunk_transcript,
+    load=load_transcript_file,
+):
+    """샤드의 영상을 차례로 색인. 이미 결과가 있는 영상(태스크 재시도)은 건너뜀
+
+    자막 파일 문제처럼 다시 해도 같은 오류는 그 영상만 실패로 기록하고,
+    Weaviate 연결 오류 등은 그대로 올려 태스크 재시도에 맡김
+    """
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-upsert")
+    counts = {"success": 0, "failed": 0, "skipped": 0, "chunks": 0}
+    try:
+        for video_id in video_ids:
+            if run.is_done(video_id):
+                counts["skipped"] += 1
+                continue
+
+            meta = metadata.get(video_id, {})
+            try:
+                chunks = chunker(video_id, load(video_id), meta)
+            except Exception as e:
+                print(f"❌ {video_id}: 청크 분할 실패 - {str(e)}")
+                run.record(video_id, worker_id, {"status": "failed", "error": str(e)})
+                counts["failed"] += 1
+                continue
+            if not chunks:
+                run.record(video_id, worker_id, {"status": "failed", "error": "문서 변환 실패"})
+                counts["failed"] += 1
+                continue
+
+            target = collection
+            if CHANNEL_TENANCY:
+                target = collection.with_tenant(meta.get("channel_id", DEFAULT_CHANNEL_ID))
+            stats = upsert_chunks(target, embedding, video_id, chunks, batch_size, executor)
+            run.record(video_id, worker_id, {"status": "success", **stats})
+            counts["success"] += 1
+            counts["chunks"] += stats["chunks"]
+    finally:
+        executor.shutdown(wait=True)
+    return counts
+
+
+def make_shards(video_ids, shard_size):
+    return [video_ids[i : i + shard_size] for i in range(0, len(video_ids), shard_size)]
+
+
+def list_transcript_ids(channel_ids=None, skip_uploaded=True):
+    """색인할 영상 ID (TRANSCRIPTS_DIR 기준, channel_ids를 주면 해당 채널만)"""
+    from database import load_uploaded_files, load_video_metadata
+
+    uploaded = set(load_uploaded_files()["files"]) if skip_uploaded else set()
+    files = sorted(
+        f for f in os.listdir(TRANSCRIPTS_DIR) if f.endswith(".json") and f not in uploaded
+    )
+    video_ids = [f[: -len(".json")] for f in files]
+    if channel_ids:
+        video_metadata = load_video_metadata()
+        video_ids = [
+            vid
+            for vid in video_ids
+            if video_metadata.get(vid, {}).get("channel_id", DEFAULT_CHANNEL_ID) in channel_ids
+        ]
+    return video_ids
+
+
+def print_progress(progress):
+    print(
+        f"📊 {progress['run_id']}: {progress['done']}/{progress['total']} "
+        f"(성공 {progress['success']}, 실패 {progress['failed']}) "
+        f"청크 {progress['chunks']}개, {progress['chunks_per_second']} 청크/초, "
+        f"{progress['videos_per_second']} 영상/초, 워커 {len(progress['workers'])}개"
+    )
+
+
+def wait_for_run(run, poll_interval=5.0):
+    while True:
+        progress = run.progress()
+        print_progress(progress)
+        if progress["finished"]:
+            return progress
+        time.sleep(poll_interval)
+
+
+def run_ingestion(
+    collection_name=None,
+    video_ids=None,
+    channel_ids=None,
+    shard_size=INGEST_SHARD_SIZE,
+    track_uploaded=True,
+    wait=True,
+):
+    """영상을 샤드로 나눠 색인 큐에 보내고 (wait면) 끝날 때까지 진행 상황 출력
+
+    upload_to_database와 같은 {"total", "success", "failed"}와 run_id 반환
+    """
+    import rag
+    from database import create_collection
+    from tasks import ingest_shard_task
+
+    collection_name = collection_name or active_collection_name()
+    if video_ids is None:
+        video_ids = list_transcript_ids(channel_ids, skip_uploaded=track_uploaded)
+    if not video_ids:
+        print("✅ 색인할 영상이 없습니다.")
+        return {"total": 0, "success": 0, "failed": 0, "run_id": None}
+
+    # 워커들이 동시에 컬렉션을 만들지 않도록 먼저 생성
+    client = rag.init_weaviate_client()
+    try:
+        create_collection(client, collection_name)
+    finally:
+        client.close()
+
+    run = IngestRun(redis.Redis.from_url(INGEST_REDIS_URL), IngestRun.new_run_id())
+    shards = make_shards(video_ids, shard_size)
+    run.create(collection_name, len(video_ids), len(shards))
+    for shard in shards:
+        ingest_shard_task.apply_async(
+            args=[run.run_id, collection_name, shard],
+            queue=CELERY_INGEST_QUEUE,
+            priority=PRIORITY_BULK,
+        )
+    print(
+        f"📤 {run.run_id}: 영상 {len(video_ids)}개를 샤드 {len(shards)}개로 나눠 "
+        f"{collection_name}에 색인 시작"
+    )
+    if not wait:
+        return {"total": len(video_ids), "success": 0, "failed": 0, "run_id": run.run_id}
+
+    progress = wait_for_run(run)
+    if track_uploaded:
+        from database import load_uploaded_files, save_uploaded_files
+
+        uploaded_files = load_uploaded_files()
+        for video_id, result in run.results().items():
+            file_name = f"{video_id}.json"
+            if result["status"] == "success" and file_name not in uploaded_files["files"]:
+                uploaded_files["files"].append(file_name)
+        save_uploaded_files(uploaded_files)
+    return {
+        "total": progress["total"],
+        "success": progress["success"],
+        "failed": progress["failed"],
+        "run_id": run.run_id,
+    }
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Celery 워커로 나눠서 하는 색인")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    start_parser = sub.add_parser("start", help="색인 시작")
+    start_parser.add_argument("--collection", help="대상 컬렉션 (기본: 현재 검색 컬렉션)")
+    start_parser.add_argument("--channel", action="append", dest="channel_ids", help="해당 채널 영상만")
+    start_parser.add_argument("--all", action="store_true", help="이미 업로드한 파일도 다시 색인")
+    start_parser.add_argument("--shard-size", type=int, default=INGEST_SHARD_SIZE)
+    start_parser.add_argument("--no-wait", action="store_true", help="태스크만 보내고 종료")
+
+    status_parser = sub.add_parser("status", help="진행 상황")
+    status_parser.add_argument("run_id")
+    status_parser.add_argument("--watch", action="store_true", help="끝날 때까지 계속 출력")
+    status_parser.add_argument("--failed", action="store_true", help="실패한 영상 목록 출력")
+
+    args = parser.parse_args()
+
+    if args.command == "start":
+        stats = run_ingestion(
+            collection_name=args.collection,
+            channel_ids=args.channel_ids,
+            shard_size=args.shard_size,
+            track_uploaded=not args.all and not args.collection,
+            wait=not args.no_wait,
+        )
+        return 1 if stats["failed"] else 0
+
+    run = IngestRun(redis.Redis.from_url(INGEST_REDIS_URL), args.run_id)
+    progress = wait_for_run(run) if args.watch else run.progress()
+    print(json.dumps(progress, ensure_ascii=False, indent=2))
+    if args.failed:
+        for video_id, result in sorted(run.results().items()):
+            if result["status"] == "failed":
+                print(f"- {video_id}: {result.get('error')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
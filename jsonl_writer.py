@@ -0,0 +1,124 @@
+"""JSONL 파일 백그라운드 추가 쓰기
+
+요청 경로에서는 메모리 큐에 넣기만 하고, 백그라운드 스레드가 모아서 파일 끝에
+한 번에 추가합니다 (검색 기록 로그와 같은 방식). 느린 검색 기록과 트레이스
+내보내기처럼 이벤트 루프에서 디스크 I/O를 하면 안 되는 로그에 사용합니다.
+
+큐가 가득 차면 새 항목을 버리고 dropped로 셉니다. 쓰기 스레드는 처음 추가할 때
+시작하며, fork된 자식 프로세스에서는 새로 만듭니다.
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import threading
+
+_STOP = object()
+
+
+class JsonlAppender:
+    def __init__(self, path, max_queue=10000, batch_size=200, flush_interval=1.0):
+        self.path = path
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+        self.written = 0
+        self.dropped = 0
+        atexit.register(self.close)
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, args=(self._queue,), name="jsonl-writer", daemon=True
+            )
+            self._thread.start()
+
+    def append(self, entry):
+        """항목 추가 (디스크 I/O 없이 즉시 반환). 큐에 들어가면 True"""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self, entries):
+        while True:
+            try:
+                item = entries.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            stop = item is _STOP
+            if not stop:
+                batch.append(item)
+            while len(batch) < self.batch_size and not stop:
+                try:
+                    item = entries.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    print(f"❌ {self.path} 기록 실패 ({len(batch)}건): {str(e)}")
+            for _ in range(len(batch) + stop):
+                entries.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, batch):
+        lines = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in batch)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+        self.written += len(batch)
+
+    def flush(self, timeout=5.0):
+        """큐에 쌓인 항목이 모두 쓰일 때까지 대기 (최대 timeout초)"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        deadline = time.time() + timeout
+        entries = self._queue
+        with entries.all_tasks_done:
+            while entries.unfinished_tasks:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                entries.all_tasks_done.wait(remaining)
+
+    def close(self):
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout=10)
+
+    def stats(self):
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
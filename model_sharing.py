@@ -0,0 +1,209 @@
+"""여러 워커 프로세스 사이의 임베딩 모델 가중치 공유와 메모리 측정
+
+- fork: Celery prefork 부모 프로세스에서 모델을 한 번 로드한 뒤 자식을 fork해
+  가중치 페이지를 copy-on-write로 공유합니다. 추론은 가중치를 쓰지 않으므로
+  자식마다 복사본이 생기지 않습니다.
+- mmap: spawn 방식 풀(uvicorn --workers 등)용. 가중치를 한 번 파일로 내보내고
+  각 프로세스가 같은 파일을 메모리 맵으로 붙여 페이지 캐시를 공유합니다.
+
+    python model_sharing.py report --pid <celery 부모 PID> --output after.json
+    python model_sharing.py report --pid <celery 부모 PID> --compare before.json
+"""
+
+import os
+import gc
+import sys
+import json
+import argparse
+
+MMAP_ALIGN = 64
+
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+# ---- fork 공유 ----
+
+
+def prepare_for_fork(embedding):
+    """fork 직전 부모 프로세스에서 호출. 이후 GC가 객체 헤더를 건드려 페이지가 복사되지 않게 함"""
+    model = embedding.client
+    model.eval()
+    for param in model.parameters():
+        param.requires_grad_(False)
+    gc.collect()
+    # 지금까지 만든 객체는 GC 추적 대상에서 제외 (자식에서 공유 페이지에 쓰지 않도록)
+    gc.freeze()
+
+
+# ---- mmap 공유 ----
+
+
+def _mmap_paths(directory, model_name):
+    safe_name = model_name.replace("/", "__")
+    base = os.path.join(directory, safe_name)
+    return f"{base}.bin", f"{base}.json"
+
+
+def export_mmap_weights(model, directory, model_name):
+    """state_dict를 정렬된 원시 바이트 파일 하나와 인덱스 JSON으로 저장 (이미 있으면 재사용)"""
+    import torch
+
+    data_path, index_path = _mmap_paths(directory, model_name)
+    if os.path.exists(data_path) and os.path.exists(index_path):
+        return data_path, index_path
+
+    os.makedirs(directory, exist_ok=True)
+    index = {}
+    offset = 0
+    tmp_data = f"{data_path}.{os.getpid()}.tmp"
+    with open(tmp_data, "wb") as f:
+        for name, tensor in model.state_dict().items():
+            raw = tensor.detach().contiguous().cpu().view(-1).view(dtype=torch.uint8)
+            padding = -offset % MMAP_ALIGN
+            f.write(b"\0" * padding)
+            offset += padding
+            f.write(raw.numpy().tobytes())
+            index[name] = {
+                "offset": offset,
+                "nbytes": raw.numel(),
+                "dtype": str(tensor.dtype).replace("torch.", ""),
+                "shape": list(tensor.shape),
+            }
+            offset += raw.numel()
+
+    tmp_index = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_index, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    # 여러 프로세스가 동시에 내보내도 완성된 파일만 보이도록 교체
+    os.replace(tmp_data, data_path)
+    os.replace(tmp_index, index_path)
+    return data_path, index_path
+
+
+def attach_mmap_weights(model, directory, model_name):
+    """모델 가중치를 공유 파일의 메모리 맵 텐서로 교체. 교체 전 가중치는 해제됨"""
+    import numpy as np
+    import torch
+
+    data_path, index_path = export_mmap_weights(model, directory, model_name)
+    with open(index_path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+
+    # 'c'(copy-on-write) 모드: 쓰지 않는 한 모든 프로세스가 같은 페이지를 사용
+    buffer = np.memmap(data_path, dtype=np.uint8, mode="c")
+    state = {}
+    for name, meta in index.items():
+        chunk = buffer[meta["offset"] : meta["offset"] + meta["nbytes"]]
+        tensor = torch.from_numpy(chunk).view(getattr(torch, meta["dtype"]))
+        state[name] = tensor.view(meta["shape"])
+
+    model.load_state_dict(state, strict=False, assign=True)
+    model.eval()
+    for param in model.parameters():
+        param.requires_grad_(False)
+    gc.collect()
+    return data_path
+
+
+def apply_share_mode(embedding, mode, directory, model_name):
+    """MODEL_SHARE_MODE에 따라 모델 로드 직후 공유 설정 적용"""
+    if mode == "mmap":
+        path = attach_mmap_weights(embedding.client, directory, model_name)
+        print(f"✅ 모델 가중치 메모리 맵 공유: {path}")
+    return embedding
+
+
+# ---- 메모리 측정 ----
+
+
+def read_smaps_rollup(pid):
+    """/proc/<pid>/smaps_rollup에서 RSS/PSS 등 (KB)"""
+    stats = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].rstrip(":") in SMAPS_FIELDS:
+                stats[parts[0].rstrip(":")] = int(parts[1])
+    return stats
+
+
+def child_pids(pid):
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children", "r") as f:
+                children.extend(int(c) for c in f.read().split())
+        except OSError:
+            continue
+    return children
+
+
+def process_name(pid):
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return f.read().replace(b"\0", b" ").decode(errors="replace").strip()[:60]
+    except OSError:
+        return "?"
+
+
+def memory_report(pid):
+    """부모 프로세스와 모든 자식 프로세스의 메모리 사용량"""
+    processes = []
+    for p in [pid] + child_pids(pid):
+        try:
+            stats = read_smaps_rollup(p)
+        except OSError:
+            continue
+        processes.append({"pid": p, "name": process_name(p), **stats})
+
+    total = {field: sum(proc.get(field, 0) for proc in processes) for field in SMAPS_FIELDS}
+    return {"root_pid": pid, "processes": processes, "total": total}
+
+
+def print_report(report, baseline=None):
+    print(f"\n{'PID':>8} {'RSS(MB)':>10} {'PSS(MB)':>10} {'공유(MB)':>10}  프로세스")
+    for proc in report["processes"]:
+        shared = proc.get("Shared_Clean", 0) + proc.get("Shared_Dirty", 0)
+        print(
+            f"{proc['pid']:>8} {proc.get('Rss', 0) / 1024:>10.1f} "
+            f"{proc.get('Pss', 0) / 1024:>10.1f} {shared / 1024:>10.1f}  {proc['name']}"
+        )
+
+    total = report["total"]
+    print(f"\n합계 RSS {total['Rss'] / 1024:.1f}MB, PSS {total['Pss'] / 1024:.1f}MB (실제 점유는 PSS 합계)")
+    if baseline:
+        before = baseline["total"]
+        workers_before = max(len(baseline["processes"]) - 1, 1)
+        workers_after = max(len(report["processes"]) - 1, 1)
+        print(
+            f"비교: PSS 합계 {before['Pss'] / 1024:.1f}MB → {total['Pss'] / 1024:.1f}MB, "
+            f"워커당 PSS {before['Pss'] / 1024 / workers_before:.1f}MB → "
+            f"{total['Pss'] / 1024 / workers_after:.1f}MB"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="워커 프로세스 메모리 리포트")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report = sub.add_parser("report", help="부모/자식 프로세스 RSS·PSS 측정")
+    report.add_argument("--pid", type=int, required=True, help="Celery/uvicorn 부모 프로세스 PID")
+    report.add_argument("--output", help="리포트 저장 경로")
+    report.add_argument("--compare", help="이전 리포트(JSON)와 비교")
+    args = parser.parse_args()
+
+    result = memory_report(args.pid)
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"결과가 저장되었습니다: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
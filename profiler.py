@@ -0,0 +1,107 @@
+"""요청 단위 샘플링 프로파일러
+
+일정 간격으로 모든 스레드의 호출 스택을 읽어, 이 저장소 코드(api.py, rag.py,
+tasks.py 등)를 지나는 스택만 모읍니다. 결과는 flamegraph.pl, speedscope 등에서
+바로 열 수 있는 collapsed stack 형식("a;b;c 횟수")으로 저장합니다.
+벽시계 기준이므로 Celery 결과/Weaviate 응답을 기다리는 시간도 포함되며, 같은
+프로세스에서 동시에 처리 중인 다른 요청의 스택이 섞일 수 있습니다.
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _frame_name(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def collapse(frame, root_dir=REPO_DIR):
+    """프레임에서 바깥쪽→안쪽 순의 collapsed stack 문자열. 저장소 코드를 안 지나면 None"""
+    names = []
+    in_repo = False
+    while frame is not None:
+        code = frame.f_code
+        names.append(_frame_name(code))
+        if not in_repo and code.co_filename.startswith(root_dir):
+            in_repo = True
+        frame = frame.f_back
+    if not in_repo:
+        return None
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.002, root_dir=REPO_DIR):
+        self.interval = interval
+        self.root_dir = root_dir
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._started_at = None
+        self.duration = 0.0
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.is_set():
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = collapse(frame, self.root_dir)
+                if stack:
+                    self.stacks[stack] += 1
+            self.samples += 1
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._started_at
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def merge(self, stacks, prefix=None):
+        """다른 프로세스(Celery 워커)에서 수집한 스택 합치기"""
+        for stack, count in (stacks or {}).items():
+            self.stacks[f"{prefix};{stack}" if prefix else stack] += count
+
+    def to_collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def save(self, directory, name):
+        if os.path.basename(name) != name:
+            raise ValueError(f"잘못된 프로파일 이름: {name!r}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.collapsed")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_collapsed())
+        return path
+
+
+def load_profile(directory, name):
+    """저장된 collapsed stack 파일 내용. 없으면 None"""
+    # request_id는 외부 입력이므로 경로 구분자를 허용하지 않음
+    if os.path.basename(name) != name:
+        return None
+    path = os.path.join(directory, f"{name}.collapsed")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
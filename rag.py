@@ -1,21 +1,68 @@
 import os
+import json
 import weaviate
 import asyncio
 import time
+import threading
+from functools import lru_cache
 from concurrent.futures import ThreadPoolExecutor
 from collections import defaultdict
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_weaviate import WeaviateVectorStore
-from weaviate.classes.query import Filter
+from datetime import datetime, timezone
+from weaviate.classes.query import Filter, MetadataQuery
+
+import tracing
+import model_sharing
+from diversify import diversify
+from grouping import group_by_video, similarity
+from replicas import ReplicaSet, parse_endpoints
+from semantic_cache import SemanticCache, scope_key
+from index_pointer import active_collection_name, active_embedding_model
+from fuzzy_index import IndexHolder
+from related_graph import GraphHolder
 
 from config import (
     WEAVIATE_URL,
-    CLASS_NAME,
     WEAVIATE_API_KEY,
+    WEAVIATE_READ_REPLICAS,
+    WEAVIATE_HEDGE_ENABLED,
+    WEAVIATE_HEDGE_QUANTILE,
+    WEAVIATE_HEDGE_MIN_DELAY,
+    WEAVIATE_HEDGE_MAX_DELAY,
+    WEAVIATE_READ_POOL_SIZE,
     EMBEDDING_MODEL,
+    SEGMENT_SIZE,
+    TRANSCRIPTS_DIR,
+    MODEL_SHARE_MODE,
+    MODEL_MMAP_DIR,
+    CHANNEL_TENANCY,
+    CHANNEL_FANOUT_CONCURRENCY,
+    SEMANTIC_CACHE_MODE,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_TTL,
+    SEMANTIC_CACHE_SHADOW_RATE,
+    DIVERSIFY_ENABLED,
+    DIVERSIFY_OVERFETCH,
+    DIVERSIFY_LAMBDA,
+    DIVERSIFY_TIME_WINDOW,
+    GROUP_FETCH_LIMIT,
+    GROUP_MAX_VIDEOS,
+    FUZZY_MAX_ERROR_RATE,
+    FUZZY_CANDIDATES,
 )
 
 _executor = ThreadPoolExecutor(max_workers=4)
+# 여러 채널(테넌트)에 동시에 질의할 때 사용
+_fanout_executor = ThreadPoolExecutor(max_workers=CHANNEL_FANOUT_CONCURRENCY)
+
+# 표기만 조금 다른 질의(문장부호, 말줄임표 등)의 벡터 검색 결과 재사용
+semantic_cache = SemanticCache(
+    mode=SEMANTIC_CACHE_MODE,
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+    ttl=SEMANTIC_CACHE_TTL,
+    shadow_rate=SEMANTIC_CACHE_SHADOW_RATE,
+)
 
 
 def init_weaviate_client():
@@ -34,10 +81,57 @@ def init_weaviate_client():
         raise
 
 
-def init_vector_store(client):
+def connect_replica(host, http_port, grpc_port):
+    return weaviate.connect_to_custom(
+        http_host=host,
+        http_port=http_port,
+        http_secure=False,
+        grpc_host=host,
+        grpc_port=grpc_port,
+        grpc_secure=False,
+        skip_init_checks=True,
+    )
+
+
+_replica_set = None
+_replica_lock = threading.Lock()
+
+
+def get_replica_set():
+    """WEAVIATE_READ_REPLICAS로 구성한 복제본 묶음 (연결은 처음 한 번만)"""
+    global _replica_set
+    if _replica_set is None:
+        with _replica_lock:
+            if _replica_set is None:
+                _replica_set = ReplicaSet(
+                    [
+                        (f"{host}:{http_port}", connect_replica(host, http_port, grpc_port))
+                        for host, http_port, grpc_port in parse_endpoints(WEAVIATE_READ_REPLICAS)
+                    ],
+                    hedge=WEAVIATE_HEDGE_ENABLED,
+                    quantile=WEAVIATE_HEDGE_QUANTILE,
+                    min_delay=WEAVIATE_HEDGE_MIN_DELAY,
+                    max_delay=WEAVIATE_HEDGE_MAX_DELAY,
+                    pool_size=WEAVIATE_READ_POOL_SIZE,
+                )
+                print(f"✅ Weaviate 읽기 복제본 {len(_replica_set.replicas)}대 연결")
+    return _replica_set
+
+
+def default_search_client():
+    # 복제본이 설정되어 있으면 연결을 유지하는 복제본 묶음, 아니면 요청마다 새 연결
+    if WEAVIATE_READ_REPLICAS:
+        return get_replica_set()
+    return init_weaviate_client()
+
+
+def init_embedding(model_name=EMBEDDING_MODEL):
+    # langchain/torch/transformers 임포트가 수 초 걸리므로 모델이 필요할 때만 임포트
+    from langchain_huggingface import HuggingFaceEmbeddings
+
     start_time = time.time()
     embedding = HuggingFaceEmbeddings(
-        model_name=EMBEDDING_MODEL,
+        model_name=model_name,
         model_kwargs={"device": "cpu", "trust_remote_code": True},
         encode_kwargs={
             "normalize_embeddings": True,
@@ -45,65 +139,287 @@ def init_vector_store(client):
             "max_length": 512,
         },
     )
+    init_time = time.time() - start_time
+    print(f"임베딩 모델 초기화 시간: {init_time:.2f}초")
+    return embedding
+
+
+_embeddings = {}  # 모델 이름 -> 임베딩 (재색인으로 모델이 바뀌면 새 모델을 추가로 로드)
+_embedding_lock = threading.Lock()
+_embedding_thread = None
+_embedding_error = None
 
-    vectorstore = WeaviateVectorStore(
-        client=client,
-        index_name=CLASS_NAME,
-        text_key="content",
-        embedding=embedding,
+
+def get_embedding(model_name=None):
+    """모델별로 프로세스당 한 번만 로드하는 임베딩 모델
+
+    model_name이 없으면 검색 중인 컬렉션(인덱스 포인터)을 색인한 모델
+    """
+    model_name = model_name or active_embedding_model()
+    embedding = _embeddings.get(model_name)
+    if embedding is None:
+        with _embedding_lock:
+            embedding = _embeddings.get(model_name)
+            if embedding is None:
+                embedding = model_sharing.apply_share_mode(
+                    init_embedding(model_name), MODEL_SHARE_MODE, MODEL_MMAP_DIR, model_name
+                )
+                _embeddings[model_name] = embedding
+    return embedding
+
+
+def is_embedding_loaded():
+    return active_embedding_model() in _embeddings
+
+
+def _load_embedding_safely():
+    global _embedding_error
+    try:
+        get_embedding()
+    except Exception as e:
+        _embedding_error = str(e)
+        print(f"❌ 임베딩 모델 로드 실패: {str(e)}")
+
+
+def load_embedding_in_background():
+    """별도 스레드에서 모델 로드 시작 (이미 로드됐거나 로드 중이면 아무것도 하지 않음)"""
+    global _embedding_thread, _embedding_error
+    if is_embedding_loaded() or (_embedding_thread and _embedding_thread.is_alive()):
+        return _embedding_thread
+    _embedding_error = None
+    _embedding_thread = threading.Thread(
+        target=_load_embedding_safely, name="embedding-loader", daemon=True
     )
-    init_time = time.time() - start_time
-    print(f"벡터 스토어 초기화 시간: {init_time:.2f}초")
-    return vectorstore
+    _embedding_thread.start()
+    return _embedding_thread
+
+
+def embedding_status():
+    """not_loaded, loading, loaded, failed 중 하나"""
+    if is_embedding_loaded():
+        return "loaded"
+    if _embedding_thread is not None and _embedding_thread.is_alive():
+        return "loading"
+    if _embedding_error is not None:
+        return "failed"
+    return "not_loaded"
 
 
 def get_youtube_link(video_id, start_time):
     return f"https://www.youtube.com/watch?v={video_id}&t={int(start_time)}s"
 
 
-async def search_similar_sentences(question):
+def format_result(props, chunk_id=None):
+    result = {
+        "video_id": props["video_id"],
+        "start_time": props["start"],
+        "content": props["content"],
+        "youtube_link": get_youtube_link(props["video_id"], props["start"]),
+    }
+    if chunk_id is not None:
+        # 관련 장면 조회(/api/related/{chunk_id})에 사용
+        result["chunk_id"] = str(chunk_id)
+    return result
+
+
+# 검색 런타임 구성 (벤치마크에서는 가짜 Weaviate/스텁 임베딩으로 교체)
+_client_factory = default_search_client
+_embedding_factory = get_embedding
+
+
+def set_search_backend(client_factory=None, embedding_factory=None):
+    """검색에 사용할 클라이언트/임베딩 생성 함수 교체 (None이면 기본값 복원)
+
+    client_factory는 weaviate 클라이언트 또는 ReplicaSet을 반환하면 됩니다.
+    """
+    global _client_factory, _embedding_factory
+    _client_factory = client_factory or default_search_client
+    _embedding_factory = embedding_factory or get_embedding
+
+
+def read(client, query, kind="default"):
+    """query(client) 실행. client가 ReplicaSet이면 복제본 선택과 헤지 요청을 거침"""
+    if isinstance(client, ReplicaSet):
+        return client.run(query, kind)
+    return query(client)
+
+
+def replica_stats():
+    return _replica_set.to_dict() if _replica_set is not None else None
+
+
+def parse_date(value):
+    """ISO 8601 문자열/datetime을 시간대가 있는 datetime으로 (시간대가 없으면 UTC)"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def build_scope_filter(channel_ids=None, date_from=None, date_to=None):
+    """채널/게시일 범위를 인덱스 질의에 함께 보낼 필터로 변환 (조건이 없으면 None)
+
+    채널별 테넌트를 쓰는 경우 채널 범위는 테넌트 선택으로 처리하므로 필터에 넣지 않음
+    """
+    conditions = []
+    if channel_ids and not CHANNEL_TENANCY:
+        conditions.append(Filter.by_property("channel_id").contains_any(list(channel_ids)))
+    date_from, date_to = parse_date(date_from), parse_date(date_to)
+    if date_from:
+        conditions.append(Filter.by_property("published_at").greater_or_equal(date_from))
+    if date_to:
+        conditions.append(Filter.by_property("published_at").less_or_equal(date_to))
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else Filter.all(*conditions)
+
+
+_tenant_cache = {}  # 컬렉션 이름 -> (테넌트 목록, 조회 시각)
+TENANT_CACHE_TTL = 60
+
+
+def _all_tenants(collection):
+    now = time.time()
+    cached = _tenant_cache.get(collection.name)
+    if cached is None or now - cached[1] > TENANT_CACHE_TTL:
+        cached = (sorted(collection.tenants.get().keys()), now)
+        _tenant_cache[collection.name] = cached
+    return cached[0]
+
+
+def scoped_collections(client, channel_ids=None, collection_name=None):
+    """검색할 컬렉션 핸들 목록. 테넌트를 쓰면 채널마다 하나씩 (채널 미지정 시 전체 채널)
+
+    collection_name을 주지 않으면 인덱스 포인터가 가리키는 현재 컬렉션을 사용
+    """
+    collection = client.collections.get(collection_name or active_collection_name())
+    if not CHANNEL_TENANCY:
+        return [collection]
+    tenants = list(channel_ids) if channel_ids else _all_tenants(collection)
+    return [collection.with_tenant(tenant) for tenant in tenants]
+
+
+def fan_out(collections, query):
+    """collections 각각에 query(collection)를 실행해 결과 객체를 모두 모음"""
+    if len(collections) == 1:
+        return list(query(collections[0]))
+    objects = []
+    for result in _fanout_executor.map(query, collections):
+        objects.extend(result)
+    return objects
+
+
+def _metadata_value(obj, name, default):
+    value = getattr(getattr(obj, "metadata", None), name, None)
+    return default if value is None else value
+
+
+def near_vector_search(collection, vector, k=7, filters=None, include_vector=False):
+    response = collection.query.near_vector(
+        near_vector=vector,
+        limit=k,
+        filters=filters,
+        include_vector=include_vector,
+        return_properties=["video_id", "start", "end", "content"],
+        return_metadata=MetadataQuery(distance=True),
+    )
+    return response.objects
+
+
+def scoped_near_vector_search(collections, vector, k=7, filters=None, include_vector=False):
+    """채널별 결과를 거리순으로 합쳐 상위 k개"""
+    objects = fan_out(
+        collections, lambda c: near_vector_search(c, vector, k, filters, include_vector)
+    )
+    if len(collections) > 1:
+        objects.sort(key=lambda obj: _metadata_value(obj, "distance", float("inf")))
+    return objects[:k]
+
+
+def diversified_search(collections, vector, k=7, filters=None):
+    """k보다 많이 가져온 뒤 같은 영상의 인접/유사 청크를 걸러 서로 다른 장면 k개"""
+    if not DIVERSIFY_ENABLED:
+        return scoped_near_vector_search(collections, vector, k, filters)
+    candidates = scoped_near_vector_search(
+        collections, vector, k * DIVERSIFY_OVERFETCH, filters, include_vector=True
+    )
+    with tracing.span("diversify", candidates=len(candidates)):
+        return diversify(candidates, vector, k, DIVERSIFY_LAMBDA, DIVERSIFY_TIME_WINDOW)
+
+
+async def search_similar_sentences(
+    question, k=7, channel_ids=None, date_from=None, date_to=None
+):
     total_start_time = time.time()
 
     # DB 연결 시간 측정
     client_start_time = time.time()
-    client = init_weaviate_client()
+    with tracing.span("db_connect"):
+        client = _client_factory()
     client_time = time.time() - client_start_time
 
-    # 벡터 스토어 초기화 시간 측정
+    # 임베딩 모델 초기화 시간 측정
     store_start_time = time.time()
-    vectorstore = init_vector_store(client)
+    with tracing.span("model_init"):
+        embedding = _embedding_factory()
     store_time = time.time() - store_start_time
 
     try:
-        # 검색 시간 측정
+        # 질의 임베딩 시간 측정
+        encode_start_time = time.time()
+        with tracing.span("encode"):
+            vector = await tracing.run_in_executor(
+                _executor, embedding.embed_query, question
+            )
+        encode_time = time.time() - encode_start_time
+
+        # 시맨틱 캐시 조회 (재색인으로 컬렉션이 바뀌면 캐시 무효화)
+        corpus_version = active_collection_name()
+        scope = scope_key(channel_ids, date_from, date_to)
+        with tracing.span("semantic_cache", mode=semantic_cache.mode) as cache_span:
+            hit = semantic_cache.lookup(vector, k, scope, corpus_version)
+            if cache_span is not None:
+                cache_span.attributes["hit"] = hit is not None
+        if hit is not None and hit.serve:
+            print(f"♻️ 시맨틱 캐시 적중 (유사도 {hit.similarity:.3f})")
+            return hit.results
+
+        # 검색(ANN) 시간 측정
         search_start_time = time.time()
-        loop = asyncio.get_event_loop()
-        docs = await loop.run_in_executor(
-            _executor, lambda: vectorstore.similarity_search(question, k=7)
-        )
+        filters = build_scope_filter(channel_ids, date_from, date_to)
+        with tracing.span("ann", k=k):
+            objects = await tracing.run_in_executor(
+                _executor,
+                read,
+                client,
+                lambda c: diversified_search(
+                    scoped_collections(c, channel_ids), vector, k, filters
+                ),
+                "vector",
+            )
         search_time = time.time() - search_start_time
 
         # 결과 처리 시간 측정
         process_start_time = time.time()
-        results = []
-        for doc in docs:
-            result = {
-                "video_id": doc.metadata["video_id"],
-                "start_time": doc.metadata["start"],
-                "content": doc.page_content,
-                "youtube_link": get_youtube_link(
-                    doc.metadata["video_id"], doc.metadata["start"]
-                ),
-            }
-            results.append(result)
+        with tracing.span("postprocess"):
+            results = [format_result(obj.properties, obj.uuid) for obj in objects]
         process_time = time.time() - process_start_time
 
+        if hit is not None:
+            # 섀도 비교: 캐시가 돌려줬을 결과와 실제 결과가 얼마나 다른지 기록
+            semantic_cache.record_shadow(hit, results)
+        semantic_cache.put(vector, k, scope, corpus_version, results, hit)
+
         total_time = time.time() - total_start_time
 
         # 시간 측정 결과 출력
         print("\n=== 성능 측정 결과 ===")
         print(f"DB 연결 시간: {client_time:.2f}초")
-        print(f"벡터 스토어 초기화 시간: {store_time:.2f}초")
+        print(f"임베딩 모델 초기화 시간: {store_time:.2f}초")
+        print(f"임베딩 시간: {encode_time:.2f}초")
         print(f"검색 실행 시간: {search_time:.2f}초")
         print(f"결과 처리 시간: {process_time:.2f}초")
         print(f"총 소요 시간: {total_time:.2f}초")
@@ -115,63 +431,266 @@ async def search_similar_sentences(question):
         client.close()
 
 
-def search_similar_sentences_bm25(question: str):
-    client = init_weaviate_client()
+async def search_similar_sentences_grouped(
+    question, moments=3, channel_ids=None, date_from=None, date_to=None
+):
+    """청크 GROUP_FETCH_LIMIT개를 한 번 가져와 영상별로 묶은 결과 (가장 가까운 장면 순)
+
+    [{"video_id", "score", "hit_count", "moments": [결과 + "score"]}]. 최대 GROUP_MAX_VIDEOS개
+    영상을 모두 돌려주며 페이지 나누기는 호출하는 쪽(API 커서)에서 합니다.
+    """
+    with tracing.span("db_connect"):
+        client = _client_factory()
     try:
-        collection = client.collections.get("YoutubeTranscript")
-        response = collection.query.bm25(
-            query=question, query_properties=["content"], limit=7
-        )
+        with tracing.span("model_init"):
+            embedding = _embedding_factory()
+        with tracing.span("encode"):
+            vector = await tracing.run_in_executor(_executor, embedding.embed_query, question)
 
-        results = []
-        for obj in response.objects:
-            props = obj.properties
-            results.append(
-                {
-                    "video_id": props["video_id"],
-                    "start_time": props["start"],
-                    "content": props["content"],
-                    "youtube_link": get_youtube_link(props["video_id"], props["start"]),
-                }
+        filters = build_scope_filter(channel_ids, date_from, date_to)
+        with tracing.span("ann", k=GROUP_FETCH_LIMIT):
+            objects = await tracing.run_in_executor(
+                _executor,
+                read,
+                client,
+                lambda c: scoped_near_vector_search(
+                    scoped_collections(c, channel_ids), vector, GROUP_FETCH_LIMIT, filters
+                ),
+                "vector",
             )
 
-        return results
+        with tracing.span("group", candidates=len(objects)):
+            groups = group_by_video(objects, moments, GROUP_MAX_VIDEOS, DIVERSIFY_TIME_WINDOW)
+            output = []
+            for video_id, hits, hit_count in groups:
+                formatted = []
+                for obj in hits:
+                    result = format_result(obj.properties, obj.uuid)
+                    result["score"] = similarity(obj)
+                    formatted.append(result)
+                output.append(
+                    {
+                        "video_id": video_id,
+                        "score": formatted[0]["score"],
+                        "hit_count": hit_count,
+                        "moments": formatted,
+                    }
+                )
+        return output
+
+    finally:
+        client.close()
+
+
+def search_similar_sentences_batch(items, max_concurrency=8):
+    """여러 질의를 한 번에 임베딩한 뒤 ANN 검색은 제한된 병렬도로 동시에 실행
+
+    items: [(question, k)] 또는 [(question, k, scope)] 목록. scope는
+    channel_ids/date_from/date_to를 담은 dict입니다. 입력 순서대로
+    {"results": [...]} 또는 {"error": "..."}를 담은 목록을 반환합니다.
+    """
+    if not items:
+        return []
+
+    with tracing.span("db_connect"):
+        client = _client_factory()
+    try:
+        with tracing.span("model_init"):
+            embedding = _embedding_factory()
+
+        with tracing.span("encode", batch_size=len(items)):
+            vectors = embedding.embed_documents([item[0] for item in items])
+
+        def search(vector, item):
+            scope = item[2] if len(item) > 2 and item[2] else {}
+            filters = build_scope_filter(**scope)
+            return read(
+                client,
+                lambda c: diversified_search(
+                    scoped_collections(c, scope.get("channel_ids")), vector, item[1], filters
+                ),
+                "vector",
+            )
+
+        outputs = []
+        with tracing.span("ann", batch_size=len(items)):
+            with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+                futures = [
+                    tracing.submit(pool, search, vector, item)
+                    for vector, item in zip(vectors, items)
+                ]
+                for future in futures:
+                    try:
+                        objects = future.result()
+                        outputs.append(
+                            {"results": [format_result(o.properties, o.uuid) for o in objects]}
+                        )
+                    except Exception as e:
+                        outputs.append({"error": str(e)})
+        return outputs
+
+    finally:
+        client.close()
+
+
+def search_similar_sentences_bm25(
+    question: str, k: int = 7, channel_ids=None, date_from=None, date_to=None
+):
+    client = _client_factory()
+    try:
+        filters = build_scope_filter(channel_ids, date_from, date_to)
+
+        def query(c):
+            collections = scoped_collections(c, channel_ids)
+            objects = fan_out(
+                collections,
+                lambda collection: collection.query.bm25(
+                    query=question,
+                    query_properties=["content"],
+                    limit=k,
+                    filters=filters,
+                    return_metadata=MetadataQuery(score=True),
+                ).objects,
+            )
+            if len(collections) > 1:
+                objects.sort(key=lambda obj: _metadata_value(obj, "score", 0.0), reverse=True)
+            return objects[:k]
+
+        objects = read(client, query, "bm25")
+        return [format_result(obj.properties, obj.uuid) for obj in objects]
 
     finally:
         client.close()
 
 
-def search_similar_sentences_exact_match(question: str):
-    client = init_weaviate_client()
+def search_similar_sentences_exact_match(
+    question: str, k: int = 10, channel_ids=None, date_from=None, date_to=None
+):
+    client = _client_factory()
     try:
         search_terms = question.strip().split()
-        collection = client.collections.get("YoutubeTranscript")
 
         # 검색어 각각을 포함하는 조건 생성 (SQL LIKE '%term%')
         filter_conditions = [
             Filter.by_property("content").like(f"%{term}%") for term in search_terms
         ]
+        scope_filter = build_scope_filter(channel_ids, date_from, date_to)
+        if scope_filter is not None:
+            filter_conditions.append(scope_filter)
         where_clause = Filter.all(*filter_conditions)
 
-        response = collection.query.fetch_objects(
-            limit=10,
-            return_properties=["video_id", "start", "content"],
-            filters=where_clause,
+        objects = read(
+            client,
+            lambda c: fan_out(
+                scoped_collections(c, channel_ids),
+                lambda collection: collection.query.fetch_objects(
+                    limit=k,
+                    return_properties=["video_id", "start", "content"],
+                    filters=where_clause,
+                ).objects,
+            ),
+            "exact_match",
         )
 
-        results = []
-        for obj in response.objects:
-            props = obj.properties
-            results.append(
-                {
-                    "video_id": props["video_id"],
-                    "start_time": props["start"],
-                    "content": props["content"],
-                    "youtube_link": get_youtube_link(props["video_id"], props["start"]),
-                }
-            )
-
-        return results
+        return [format_result(obj.properties, obj.uuid) for obj in objects[:k]]
 
     finally:
         client.close()
+
+
+# 오타 허용 검색 색인 (Weaviate를 거치지 않고 API 프로세스에서 mmap으로 읽음)
+fuzzy_index = IndexHolder()
+
+
+def search_similar_sentences_fuzzy(
+    question: str, k: int = 10, channel_ids=None, date_from=None, date_to=None
+):
+    """자모 n-gram 후보 + 편집 거리 검증으로 자동 자막의 오인식/띄어쓰기 차이를 허용"""
+    index = fuzzy_index.get()
+    matches = index.search(
+        question,
+        k,
+        channel_ids=channel_ids,
+        date_from=parse_date(date_from),
+        date_to=parse_date(date_to),
+        max_error_rate=FUZZY_MAX_ERROR_RATE,
+        max_candidates=FUZZY_CANDIDATES,
+    )
+    results = []
+    for match in matches:
+        result = format_result(match)
+        result["match_distance"] = match["distance"]
+        results.append(result)
+    return results
+
+
+# 관련 장면 그래프 (related_graph.py로 미리 계산, 메모리 맵으로 읽음)
+related_graph = GraphHolder()
+
+
+def find_related_moments(chunk_id, k=10):
+    """미리 계산한 그래프에서 청크와 비슷한 장면 k개 (모델/ANN 질의 없음). 모르는 청크면 None"""
+    found = related_graph.get().related(chunk_id, k)
+    if found is None:
+        return None
+    source, neighbors = found
+    results = []
+    for neighbor in neighbors:
+        result = format_result(neighbor, neighbor["chunk_id"])
+        result["similarity"] = neighbor["similarity"]
+        results.append(result)
+    return format_result(source, source["chunk_id"]), results
+
+
+@lru_cache(maxsize=256)
+def _load_segments(video_id):
+    file_path = os.path.join(TRANSCRIPTS_DIR, f"{video_id}.json")
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return tuple((seg["start"], seg["text"]) for seg in json.load(f))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _char_bigrams(text):
+    text = "".join(text.split())
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+def refine_start_time(result, question):
+    """청크 안에서 질의와 가장 많이 겹치는 자막 세그먼트로 시작 시각 보정
+
+    자막 파일이 없으면 None 반환. 띄어쓰기 오류가 많은 자동 자막을 고려해
+    글자 바이그램 겹침으로 비교합니다.
+    """
+    segments = _load_segments(result["video_id"])
+    if not segments:
+        return None
+
+    query_grams = _char_bigrams(question)
+    if not query_grams:
+        return None
+
+    # 청크 시작 세그먼트부터 청크 하나 분량(SEGMENT_SIZE)만 비교
+    first = next(
+        (i for i, (start, _) in enumerate(segments) if start >= result["start_time"]),
+        None,
+    )
+    if first is None:
+        return None
+
+    best_start, best_score = None, 0.0
+    for start, text in segments[first : first + SEGMENT_SIZE]:
+        score = len(query_grams & _char_bigrams(text)) / len(query_grams)
+        if score > best_score:
+            best_start, best_score = start, score
+
+    if best_start is None:
+        return None
+    return {
+        **result,
+        "original_start_time": result["start_time"],
+        "start_time": best_start,
+        "youtube_link": get_youtube_link(result["video_id"], best_start),
+        "match_score": round(best_score, 3),
+    }
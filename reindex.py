@@ -0,0 +1,265 @@
+"""무중단 재색인 (blue/green)
+
+청크 크기, 모델, 인덱스 설정을 바꿀 때 운영 중인 컬렉션을 수정하지 않고
+버전이 붙은 새 컬렉션을 만들어 채운 뒤, 개수와 검색 결과 일치율(recall)을
+확인하고 인덱스 포인터만 바꿔 전환합니다. 이전 컬렉션은 즉시 롤백할 수
+있도록 남겨 둡니다.
+
+    python reindex.py build                   # 새 버전 생성 → 검증 → 통과 시 전환
+    python reindex.py build --no-switch       # 생성과 검증만
+    python reindex.py build --distributed     # 색인을 Celery ingest 워커들에 나눠서
+    python reindex.py build --model <모델>     # 다른 임베딩 모델로 색인
+    python reindex.py validate <컬렉션>
+    python reindex.py switch <컬렉션>
+    python reindex.py rollback
+    python reindex.py status
+    python reindex.py cleanup --keep 2
+"""
+
+import sys
+import json
+import argparse
+from datetime import datetime
+
+import rag
+import index_pointer
+from history import load_popular_queries
+from config import (
+    CLASS_NAME,
+    SEARCH_HISTORY_DIR,
+    REINDEX_MIN_COUNT_RATIO,
+    REINDEX_MIN_RECALL,
+    REINDEX_SAMPLE_SIZE,
+    REINDEX_KEEP_VERSIONS,
+)
+
+VERSION_PREFIX = f"{CLASS_NAME}_v"
+
+
+def new_version_name():
+    # Weaviate 컬렉션 이름은 영문/숫자/밑줄만 허용
+    return f"{VERSION_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+
+def count_objects(client, name):
+    """컬렉션 객체 수 (테넌트를 쓰면 모든 테넌트 합계)"""
+    if not client.collections.exists(name):
+        return 0
+    return sum(
+        collection.aggregate.over_all(total_count=True).total_count
+        for collection in rag.scoped_collections(client, collection_name=name)
+    )
+
+
+def sample_queries(client, name, size):
+    """검증용 질의: 인기 검색어, 모자라면 새 컬렉션 청크 앞부분으로 채움"""
+    queries = load_popular_queries(SEARCH_HISTORY_DIR, size)
+    if len(queries) < size:
+        for collection in rag.scoped_collections(client, collection_name=name):
+            response = collection.query.fetch_objects(
+                limit=size - len(queries), return_properties=["content"]
+            )
+            queries.extend(" ".join(obj.properties["content"].split()[:12]) for obj in response.objects)
+            if len(queries) >= size:
+                break
+    return queries[:size]
+
+
+def embed_queries(name, queries):
+    """name 컬렉션을 색인한 모델로 질의 임베딩"""
+    if not queries:
+        return []
+    return rag.get_embedding(index_pointer.collection_model(name)).embed_documents(queries)
+
+
+def recall_at_k(client, old_name, new_name, queries, k=7):
+    """같은 질의에 대해 기존 컬렉션 상위 k개 영상 중 새 컬렉션에서도 나온 비율
+
+    청크 방식이 바뀌면 시작 시각이 달라지므로 video_id 기준으로 비교.
+    모델이 바뀌었을 수 있으므로 질의는 각 컬렉션의 모델로 따로 임베딩
+    """
+    old_collections = rag.scoped_collections(client, collection_name=old_name)
+    new_collections = rag.scoped_collections(client, collection_name=new_name)
+    hits = total = 0
+    old_vectors = embed_queries(old_name, queries)
+    new_vectors = embed_queries(new_name, queries)
+    for old_vector, new_vector in zip(old_vectors, new_vectors):
+        old_videos = {
+            obj.properties["video_id"]
+            for obj in rag.scoped_near_vector_search(old_collections, old_vector, k)
+        }
+        new_videos = {
+            obj.properties["video_id"]
+            for obj in rag.scoped_near_vector_search(new_collections, new_vector, k)
+        }
+        hits += len(old_videos & new_videos)
+        total += len(old_videos)
+    return hits / total if total else 1.0
+
+
+def validate(
+    client,
+    new_name,
+    old_name=None,
+    sample_size=REINDEX_SAMPLE_SIZE,
+    min_count_ratio=REINDEX_MIN_COUNT_RATIO,
+    min_recall=REINDEX_MIN_RECALL,
+):
+    """새 컬렉션이 현재 컬렉션을 대체할 수 있는지 개수와 recall로 확인"""
+    old_name = old_name or index_pointer.active_collection_name()
+    new_count = count_objects(client, new_name)
+    old_count = count_objects(client, old_name)
+    report = {
+        "old": old_name,
+        "new": new_name,
+        "old_model": index_pointer.collection_model(old_name),
+        "new_model": index_pointer.collection_model(new_name),
+        "old_count": old_count,
+        "new_count": new_count,
+        "count_ratio": new_count / old_count if old_count else None,
+        "recall_at_k": None,
+        "queries": 0,
+        "checks": {},
+    }
+
+    report["checks"]["not_empty"] = new_count > 0
+    if old_count:
+        report["checks"]["count"] = new_count >= old_count * min_count_ratio
+        queries = sample_queries(client, new_name, sample_size)
+        report["queries"] = len(queries)
+        report["recall_at_k"] = recall_at_k(client, old_name, new_name, queries)
+        report["checks"]["recall"] = report["recall_at_k"] >= min_recall
+
+    report["passed"] = all(report["checks"].values())
+    return report
+
+
+def cleanup(client, keep=REINDEX_KEEP_VERSIONS):
+    """현재/직전 컬렉션을 제외한 오래된 버전을 keep개만 남기고 삭제"""
+    pointer = index_pointer.read_pointer()
+    protected = {pointer["active"], pointer.get("previous")}
+    versions = sorted(
+        name
+        for name in client.collections.list_all()
+        if name.startswith(VERSION_PREFIX) and name not in protected
+    )
+    removed = versions[: max(len(versions) - keep, 0)]
+    for name in removed:
+        client.collections.delete(name)
+    if removed:
+        pointer = index_pointer.read_pointer()
+        for name in removed:
+            pointer.get("models", {}).pop(name, None)
+        index_pointer.write_pointer(pointer)
+    return removed
+
+
+def build(args):
+    name = args.name or new_version_name()
+    # 업로드/색인 워커와 전환 후 검색이 같은 모델을 쓰도록 먼저 기록
+    model = args.model or index_pointer.active_embedding_model()
+    index_pointer.set_collection_model(name, model)
+    print(
+        f"🔨 새 컬렉션 생성: {name} ({model}, "
+        f"검색은 계속 {index_pointer.active_collection_name()} 사용)"
+    )
+    if args.distributed:
+        # 색인 큐(ingest 워커들)에 나눠 보내고 끝날 때까지 대기
+        from ingest import run_ingestion
+
+        stats = run_ingestion(collection_name=name, track_uploaded=False)
+    else:
+        from database import upload_to_database
+
+        stats = upload_to_database(collection_name=name, track_uploaded=False)
+    if stats["failed"]:
+        print(f"⚠️ 업로드 실패 {stats['failed']}건")
+
+    client = rag.init_weaviate_client()
+    try:
+        report = validate(client, name)
+    finally:
+        client.close()
+    print_report(report)
+
+    if not report["passed"]:
+        print(f"❌ 검증 실패: {name}은 전환하지 않고 남겨 둡니다.")
+        return 1
+    if args.no_switch:
+        print(f"✅ 검증 통과. 전환하려면: python reindex.py switch {name}")
+        return 0
+    index_pointer.switch_active(name, reason="reindex")
+    print(f"✅ 전환 완료: {name} (롤백: python reindex.py rollback)")
+    return 0
+
+
+def print_report(report):
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="무중단 재색인")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = sub.add_parser("build", help="새 버전 컬렉션 생성/검증/전환")
+    build_parser.add_argument("--name", help="컬렉션 이름 (기본: 시각 기반 버전)")
+    build_parser.add_argument("--no-switch", action="store_true", help="검증까지만 수행")
+    build_parser.add_argument(
+        "--distributed", action="store_true", help="Celery ingest 워커들로 나눠서 색인"
+    )
+    build_parser.add_argument("--model", help="임베딩 모델 (기본: 현재 검색 중인 컬렉션의 모델)")
+
+    validate_parser = sub.add_parser("validate", help="컬렉션 검증")
+    validate_parser.add_argument("name")
+
+    switch_parser = sub.add_parser("switch", help="검색 대상 컬렉션 전환")
+    switch_parser.add_argument("name")
+    switch_parser.add_argument("--force", action="store_true", help="검증 없이 전환")
+
+    sub.add_parser("rollback", help="직전 컬렉션으로 되돌리기")
+    sub.add_parser("status", help="현재 포인터 상태")
+
+    cleanup_parser = sub.add_parser("cleanup", help="오래된 버전 삭제")
+    cleanup_parser.add_argument("--keep", type=int, default=REINDEX_KEEP_VERSIONS)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        return build(args)
+    if args.command == "rollback":
+        pointer = index_pointer.rollback()
+        print(f"↩️ 롤백 완료: {pointer['active']}")
+        return 0
+    if args.command == "status":
+        print_report(index_pointer.read_pointer())
+        return 0
+
+    client = rag.init_weaviate_client()
+    try:
+        if args.command == "validate":
+            report = validate(client, args.name)
+            print_report(report)
+            return 0 if report["passed"] else 1
+        if args.command == "switch":
+            if not client.collections.exists(args.name):
+                print(f"❌ 컬렉션이 없습니다: {args.name}")
+                return 1
+            if not args.force:
+                report = validate(client, args.name)
+                print_report(report)
+                if not report["passed"]:
+                    print("❌ 검증 실패. 강제로 전환하려면 --force")
+                    return 1
+            index_pointer.switch_active(args.name)
+            print(f"✅ 전환 완료: {args.name}")
+            return 0
+        if args.command == "cleanup":
+            removed = cleanup(client, args.keep)
+            print(f"🗑️ 삭제한 컬렉션: {removed or '없음'}")
+            return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,600 @@
+"""관련 장면 그래프 (청크마다 가장 비슷한 청크 M개를 미리 계산)
+
+한 장면을 찾은 사용자가 비슷한 장면을 보려면 지금은 청크 내용으로 벡터 검색을 한 번 더
+해야 합니다. 여기서는 오프라인으로 저장된 청크 벡터 전체의 최근접 이웃 M개를 계산해 두고,
+/api/related/{chunk_id}는 모델이나 ANN 질의 없이 배열 몇 개만 읽어 바로 응답합니다.
+
+- 계산: 정규화한 벡터를 RELATED_BLOCK_SIZE개씩 묶어 전체 벡터와 행렬 곱으로 유사도를 구하고
+  (열도 타일로 나눠 메모리 제한) argpartition으로 상위 M개만 유지합니다. 같은 영상에서
+  RELATED_TIME_WINDOW초 이내로 겹치는 청크(청크 겹침으로 거의 같은 내용)는 제외합니다.
+- 재개: 계산할 청크 목록과 벡터 스냅샷을 작업 디렉터리에 저장하고 블록마다 결과를 파일로
+  남기므로, 중단된 뒤 다시 실행하면 끝난 블록은 건너뜁니다.
+- 증분: 이전 그래프가 있으면 새 청크(와 이웃이 삭제된 청크)만 전체와 비교하고, 기존 청크는
+  새 청크와의 유사도만 계산해 기존 이웃 목록과 합칩니다. 검색 컬렉션이 바뀌었거나(재색인)
+  M/시간 간격 설정이 바뀌면 전체를 다시 계산합니다.
+- 저장: 이웃 번호(int32)와 유사도(float16) 배열, 청크 UUID 16바이트 배열, UUID로 행을 찾는
+  오픈 어드레싱 해시 테이블을 메모리 맵으로 열어 여러 API 프로세스가 공유합니다.
+
+    python related_graph.py build           # 새로 추가된 청크만 계산 (처음이면 전체)
+    python related_graph.py build --full    # 전체 다시 계산
+    python related_graph.py show <chunk_id>
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import uuid
+import shutil
+import argparse
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from config import (
+    RELATED_GRAPH_DIR,
+    RELATED_TOP_M,
+    RELATED_BLOCK_SIZE,
+    RELATED_TIME_WINDOW,
+)
+
+GRAPH_FORMAT = 1
+COLUMN_TILE = 32768  # 한 번에 유사도를 계산할 열(청크) 수
+RETURN_PROPERTIES = ["video_id", "start", "end", "content"]
+ARRAY_FILES = (
+    "ids",
+    "slots",
+    "neighbors",
+    "scores",
+    "seg_video",
+    "seg_start",
+    "seg_end",
+    "text_offsets",
+)
+
+
+def _uuid_bytes(value):
+    if isinstance(value, bytes) and len(value) == 16:
+        return value
+    if isinstance(value, uuid.UUID):
+        return value.bytes
+    return uuid.UUID(str(value)).bytes
+
+
+def build_slots(ids):
+    """UUID 앞 8바이트를 해시로 쓰는 선형 탐사 테이블 (칸 수는 청크 수의 2배 이상인 2의 거듭제곱)
+
+    한 번에 한 칸씩 넣는 대신, 아직 못 들어간 UUID들을 한꺼번에 다음 칸으로 옮기며 채웁니다.
+    """
+    n = len(ids)
+    size = 1 << max(1, int(2 * n - 1).bit_length())
+    slots = np.full(size, -1, dtype=np.int32)
+    if n == 0:
+        return slots
+    positions = ids[:, :8].copy().view("<u8")[:, 0] & np.uint64(size - 1)
+    pending = np.arange(n)
+    while pending.size:
+        target = positions[pending].astype(np.int64)
+        free = np.flatnonzero(slots[target] == -1)
+        unique_slots, first = np.unique(target[free], return_index=True)
+        slots[unique_slots] = pending[free[first]]
+        placed = np.zeros(pending.size, dtype=bool)
+        placed[free[first]] = True
+        pending = pending[~placed]
+        positions[pending] = (positions[pending] + np.uint64(1)) & np.uint64(size - 1)
+    return slots
+
+
+def topk_neighbors(vectors, rows, columns, videos, starts, ends, m, time_window, tile=COLUMN_TILE):
+    """rows 청크마다 columns 중 유사도 상위 m개 (번호, 유사도). 모자라면 -1로 채움
+
+    columns가 None이면 전체 청크. 자기 자신과 같은 영상의 time_window 이내 청크는 제외합니다.
+    """
+    queries = vectors[rows].astype(np.float32)
+    best_index = np.full((len(rows), m), -1, dtype=np.int64)
+    best_score = np.full((len(rows), m), -np.inf, dtype=np.float32)
+    total = len(vectors) if columns is None else len(columns)
+    row_videos = videos[rows][:, None]
+    row_starts = starts[rows][:, None]
+    row_ends = ends[rows][:, None]
+
+    for offset in range(0, total, tile):
+        if columns is None:
+            cols = np.arange(offset, min(offset + tile, total))
+            block = vectors[offset : offset + tile]
+        else:
+            cols = columns[offset : offset + tile]
+            block = vectors[cols]
+        scores = queries @ block.astype(np.float32).T
+        # 같은 장면(자기 자신 포함)은 이웃에서 제외 (diversify.redundancy_mask와 같은 기준)
+        blocked = (row_videos == videos[cols][None, :]) & (
+            (row_starts <= ends[cols][None, :] + time_window)
+            & (starts[cols][None, :] <= row_ends + time_window)
+        )
+        blocked |= rows[:, None] == cols[None, :]
+        scores[blocked] = -np.inf
+
+        candidate_score = np.concatenate([best_score, scores], axis=1)
+        candidate_index = np.concatenate(
+            [best_index, np.broadcast_to(cols, scores.shape)], axis=1
+        )
+        top = np.argpartition(-candidate_score, m - 1, axis=1)[:, :m]
+        best_score = np.take_along_axis(candidate_score, top, axis=1)
+        best_index = np.take_along_axis(candidate_index, top, axis=1)
+
+    order = np.argsort(-best_score, axis=1, kind="stable")
+    best_score = np.take_along_axis(best_score, order, axis=1)
+    best_index = np.take_along_axis(best_index, order, axis=1)
+    best_index[~np.isfinite(best_score)] = -1
+    return best_index.astype(np.int32), best_score
+
+
+def merge_neighbors(index_a, score_a, index_b, score_b, m):
+    """두 이웃 목록(서로 겹치지 않는 청크)을 합쳐 유사도 상위 m개"""
+    index = np.concatenate([index_a, index_b], axis=1)
+    score = np.concatenate([score_a, score_b], axis=1).astype(np.float32)
+    score[index < 0] = -np.inf
+    top = np.argsort(-score, axis=1, kind="stable")[:, :m]
+    score = np.take_along_axis(score, top, axis=1)
+    index = np.take_along_axis(index, top, axis=1)
+    index[~np.isfinite(score)] = -1
+    return index.astype(np.int32), score
+
+
+class RelatedGraph:
+    def __init__(self, meta, ids, slots, neighbors, scores, seg_video, seg_start, seg_end,
+                 text_offsets, text_blob, videos):
+        self.meta = meta
+        self.ids = ids
+        self.slots = slots
+        self.neighbors = neighbors
+        self.scores = scores
+        self.seg_video = seg_video
+        self.seg_start = seg_start
+        self.seg_end = seg_end
+        self.text_offsets = text_offsets
+        self.text_blob = text_blob
+        self.videos = videos
+        self._mask = len(slots) - 1
+
+    @property
+    def num_chunks(self):
+        return len(self.ids)
+
+    def row_of(self, chunk_id):
+        """청크 UUID의 행 번호 (없으면 None). 해시 테이블을 몇 칸만 확인하므로 청크 수와 무관"""
+        try:
+            key = _uuid_bytes(chunk_id)
+        except ValueError:
+            return None
+        position = int.from_bytes(key[:8], "little") & self._mask
+        while True:
+            row = int(self.slots[position])
+            if row < 0:
+                return None
+            if self.ids[row].tobytes() == key:
+                return row
+            position = (position + 1) & self._mask
+
+    def chunk(self, row):
+        start, end = int(self.text_offsets[row]), int(self.text_offsets[row + 1])
+        return {
+            "chunk_id": str(uuid.UUID(bytes=self.ids[row].tobytes())),
+            "video_id": self.videos[int(self.seg_video[row])],
+            "start": float(self.seg_start[row]),
+            "end": float(self.seg_end[row]),
+            "content": bytes(self.text_blob[start:end]).decode("utf-8"),
+        }
+
+    def related(self, chunk_id, k=10):
+        """(기준 청크, [이웃 청크 + "similarity"]) 또는 청크가 그래프에 없으면 None"""
+        row = self.row_of(chunk_id)
+        if row is None:
+            return None
+        results = []
+        for neighbor, score in zip(self.neighbors[row][:k], self.scores[row][:k]):
+            if neighbor < 0:
+                break
+            item = self.chunk(int(neighbor))
+            item["similarity"] = round(float(score), 4)
+            results.append(item)
+        return self.chunk(row), results
+
+    def save(self, directory):
+        """임시 디렉터리에 쓴 뒤 이름을 바꿔, 읽는 쪽이 반쯤 쓴 그래프를 보지 않게 함"""
+        tmp = f"{directory}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name in ARRAY_FILES:
+            np.save(os.path.join(tmp, f"{name}.npy"), np.asarray(getattr(self, name)))
+        with open(os.path.join(tmp, "texts.bin"), "wb") as f:
+            f.write(self.text_blob)
+        with open(os.path.join(tmp, "videos.json"), "w", encoding="utf-8") as f:
+            json.dump(self.videos, f, ensure_ascii=False)
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        if os.path.exists(directory):
+            old = f"{directory}.old"
+            shutil.rmtree(old, ignore_errors=True)
+            os.rename(directory, old)
+            os.rename(tmp, directory)
+            shutil.rmtree(old)
+        else:
+            os.rename(tmp, directory)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != GRAPH_FORMAT:
+            raise RuntimeError("관련 장면 그래프 형식이 다릅니다. 다시 생성하세요: python related_graph.py build --full")
+        with open(os.path.join(directory, "videos.json"), "r", encoding="utf-8") as f:
+            videos = json.load(f)
+        arrays = {
+            # 큰 배열은 메모리 맵으로 열어 여러 프로세스가 페이지 캐시를 공유
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+            for name in ARRAY_FILES
+        }
+        with open(os.path.join(directory, "texts.bin"), "rb") as f:
+            text_blob = b""
+            if os.fstat(f.fileno()).st_size:
+                text_blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(meta, text_blob=text_blob, videos=videos, **arrays)
+
+
+class Snapshot:
+    """그래프를 만들 청크 목록과 정규화 벡터(float16), 계산 계획. 작업 디렉터리에 저장해 재개에 사용"""
+
+    ARRAYS = ("ids", "vectors", "seg_video", "seg_start", "seg_end", "text_offsets",
+              "base_neighbors", "base_scores", "full_rows", "merge_rows", "new_rows")
+
+    def __init__(self, meta, videos, text_blob, **arrays):
+        self.meta = meta
+        self.videos = videos
+        self.text_blob = text_blob
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    def jobs(self):
+        """("full"|"merge", 블록 번호, 행 번호들) 목록. 파일 이름에 블록 번호를 써서 재개"""
+        block = self.meta["block_size"]
+        jobs = []
+        for kind, rows in (("full", self.full_rows), ("merge", self.merge_rows)):
+            if kind == "merge" and not len(self.new_rows):
+                continue
+            for i, offset in enumerate(range(0, len(rows), block)):
+                jobs.append((kind, i, np.asarray(rows[offset : offset + block])))
+        return jobs
+
+    def save(self, directory):
+        os.makedirs(os.path.join(directory, "blocks"), exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, "texts.bin"), "wb") as f:
+            f.write(self.text_blob)
+        with open(os.path.join(directory, "videos.json"), "w", encoding="utf-8") as f:
+            json.dump(self.videos, f, ensure_ascii=False)
+        # plan.json을 마지막에 써서, 이 파일이 있으면 스냅샷이 완전함
+        with open(os.path.join(directory, "plan.json"), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory):
+        try:
+            with open(os.path.join(directory, "plan.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        with open(os.path.join(directory, "videos.json"), "r", encoding="utf-8") as f:
+            videos = json.load(f)
+        with open(os.path.join(directory, "texts.bin"), "rb") as f:
+            text_blob = f.read()
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+            for name in cls.ARRAYS
+        }
+        return cls(meta, videos, text_blob, **arrays)
+
+
+def fetch_chunks(client, collection_name):
+    """검색 컬렉션(멀티 테넌트면 모든 테넌트)의 청크를 벡터와 함께 전부 읽음"""
+    from rag import scoped_collections
+
+    for collection in scoped_collections(client, collection_name=collection_name):
+        for obj in collection.iterator(include_vector=True, return_properties=RETURN_PROPERTIES):
+            vector = (obj.vector or {}).get("default")
+            if vector is None:
+                continue
+            yield obj.uuid, obj.properties, vector
+
+
+def make_snapshot(chunks, previous, collection_name, m, time_window, block_size):
+    """청크 목록과 이전 그래프로 계산 계획 생성
+
+    full_rows: 전체와 비교할 청크 (새 청크, 삭제된 이웃이 있는 청크, 이전 그래프가 없으면 전부)
+    merge_rows: 새 청크와만 비교해 기존 이웃 목록(base_*)과 합칠 청크
+    새 청크와 기존 청크는 겹치지 않으므로 합칠 때 중복 이웃이 생기지 않습니다.
+    """
+    ids, vectors, seg_video, seg_start, seg_end, text_offsets = [], [], [], [], [], [0]
+    video_index = {}
+    blob = bytearray()
+    previous_rows = []
+    for chunk_id, props, vector in chunks:
+        key = _uuid_bytes(chunk_id)
+        ids.append(np.frombuffer(key, dtype=np.uint8))
+        vectors.append(vector)
+        seg_video.append(video_index.setdefault(props["video_id"], len(video_index)))
+        seg_start.append(props["start"])
+        seg_end.append(props.get("end", props["start"]))
+        blob += props.get("content", "").encode("utf-8")
+        text_offsets.append(len(blob))
+        row = previous.row_of(key) if previous is not None else None
+        previous_rows.append(-1 if row is None else row)
+
+    n = len(ids)
+    if n == 0:
+        raise RuntimeError(f"{collection_name}에 벡터가 있는 청크가 없습니다.")
+    matrix = np.asarray(vectors, dtype=np.float32).reshape(n, -1)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+    previous_rows = np.asarray(previous_rows, dtype=np.int64)
+
+    base_neighbors = np.full((n, m), -1, dtype=np.int32)
+    base_scores = np.full((n, m), -np.inf, dtype=np.float32)
+    known = np.flatnonzero(previous_rows >= 0)
+    if previous is not None and len(known):
+        # 이전 그래프의 행 번호 -> 새 행 번호 (삭제된 청크는 -1)
+        remap = np.full(previous.num_chunks, -1, dtype=np.int64)
+        remap[previous_rows[known]] = known
+        old_neighbors = np.asarray(previous.neighbors[previous_rows[known]], dtype=np.int64)
+        mapped = np.where(old_neighbors >= 0, remap[np.maximum(old_neighbors, 0)], -1)
+        lost = ((old_neighbors >= 0) & (mapped < 0)).any(axis=1)
+        base_neighbors[known] = mapped
+        base_scores[known] = np.where(
+            mapped >= 0, np.asarray(previous.scores[previous_rows[known]], dtype=np.float32), -np.inf
+        )
+        full_rows = np.concatenate([np.flatnonzero(previous_rows < 0), known[lost]])
+        merge_rows = known[~lost]
+    else:
+        full_rows = np.arange(n)
+        merge_rows = np.arange(0)
+
+    meta = {
+        "collection": collection_name,
+        "m": m,
+        "time_window": time_window,
+        "block_size": block_size,
+        "chunks": n,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    return Snapshot(
+        meta,
+        sorted(video_index, key=video_index.get),
+        bytes(blob),
+        ids=np.asarray(ids, dtype=np.uint8).reshape(n, 16),
+        vectors=matrix.astype(np.float16),
+        seg_video=np.asarray(seg_video, dtype=np.int32),
+        seg_start=np.asarray(seg_start, dtype=np.float64),
+        seg_end=np.asarray(seg_end, dtype=np.float64),
+        text_offsets=np.asarray(text_offsets, dtype=np.int64),
+        base_neighbors=base_neighbors,
+        base_scores=base_scores,
+        full_rows=np.sort(full_rows).astype(np.int64),
+        merge_rows=merge_rows.astype(np.int64),
+        new_rows=np.flatnonzero(previous_rows < 0).astype(np.int64),
+    )
+
+
+def _block_path(work_dir, kind, number):
+    return os.path.join(work_dir, "blocks", f"{kind}_{number:06d}.npz")
+
+
+def compute_blocks(snapshot, work_dir):
+    """아직 결과 파일이 없는 블록만 계산 (블록마다 원자적으로 저장)"""
+    m = snapshot.meta["m"]
+    window = snapshot.meta["time_window"]
+    vectors = np.asarray(snapshot.vectors)
+    videos = np.asarray(snapshot.seg_video)
+    starts = np.asarray(snapshot.seg_start)
+    ends = np.asarray(snapshot.seg_end)
+    new_rows = np.asarray(snapshot.new_rows)
+
+    jobs = snapshot.jobs()
+    done = sum(os.path.exists(_block_path(work_dir, kind, i)) for kind, i, _ in jobs)
+    if done:
+        print(f"⏩ 끝난 블록 {done}/{len(jobs)}개는 건너뜁니다.")
+    start = time.time()
+    computed = 0
+    for kind, number, rows in jobs:
+        path = _block_path(work_dir, kind, number)
+        if os.path.exists(path):
+            continue
+        columns = None if kind == "full" else new_rows
+        neighbors, scores = topk_neighbors(vectors, rows, columns, videos, starts, ends, m, window)
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, rows=rows, neighbors=neighbors, scores=scores)
+        os.replace(tmp, path)
+        computed += 1
+        done += 1
+        if computed % 10 == 0 or done == len(jobs):
+            elapsed = time.time() - start
+            print(f"🧮 블록 {done}/{len(jobs)} ({computed * snapshot.meta['block_size'] / max(elapsed, 1e-9):.0f}청크/초)")
+    return jobs
+
+
+def assemble(snapshot, work_dir, jobs):
+    """기존 이웃 목록에 블록 결과를 반영해 최종 그래프 생성"""
+    m = snapshot.meta["m"]
+    neighbors = np.array(snapshot.base_neighbors)
+    scores = np.array(snapshot.base_scores)
+    for kind, number, _ in jobs:
+        with np.load(_block_path(work_dir, kind, number)) as block:
+            rows = block["rows"]
+            if kind == "full":
+                neighbors[rows] = block["neighbors"]
+                scores[rows] = block["scores"]
+            else:
+                neighbors[rows], scores[rows] = merge_neighbors(
+                    neighbors[rows], scores[rows], block["neighbors"], block["scores"], m
+                )
+    scores[neighbors < 0] = 0
+    ids = np.asarray(snapshot.ids)
+    meta = {
+        "format": GRAPH_FORMAT,
+        "collection": snapshot.meta["collection"],
+        "m": m,
+        "time_window": snapshot.meta["time_window"],
+        "chunks": len(ids),
+        "videos": len(snapshot.videos),
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    return RelatedGraph(
+        meta,
+        ids=ids,
+        slots=build_slots(ids),
+        neighbors=neighbors.astype(np.int32),
+        scores=scores.astype(np.float16),
+        seg_video=np.asarray(snapshot.seg_video),
+        seg_start=np.asarray(snapshot.seg_start),
+        seg_end=np.asarray(snapshot.seg_end),
+        text_offsets=np.asarray(snapshot.text_offsets),
+        text_blob=snapshot.text_blob,
+        videos=snapshot.videos,
+    )
+
+
+def load_previous(directory, collection_name, m, time_window):
+    """증분 계산에 쓸 수 있는 이전 그래프 (컬렉션/설정이 다르면 None)"""
+    if not os.path.exists(os.path.join(directory, "meta.json")):
+        return None
+    try:
+        previous = RelatedGraph.load(directory)
+    except RuntimeError:
+        return None
+    meta = previous.meta
+    if meta["collection"] != collection_name or meta["m"] != m or meta["time_window"] != time_window:
+        print(f"ℹ️ 이전 그래프({meta['collection']}, M={meta['m']})와 설정이 달라 전체를 다시 계산합니다.")
+        return None
+    return previous
+
+
+def build_graph(
+    directory=RELATED_GRAPH_DIR,
+    client=None,
+    collection_name=None,
+    full=False,
+    m=RELATED_TOP_M,
+    time_window=RELATED_TIME_WINDOW,
+    block_size=RELATED_BLOCK_SIZE,
+):
+    """그래프 생성/갱신. 중단된 작업이 있으면 이어서 계산"""
+    from rag import init_weaviate_client
+    from index_pointer import active_collection_name
+
+    start = time.time()
+    work_dir = f"{directory}.work"
+    snapshot = Snapshot.load(work_dir)
+    if snapshot is not None and (full or snapshot.meta["m"] != m or snapshot.meta["time_window"] != time_window):
+        shutil.rmtree(work_dir)
+        snapshot = None
+    if snapshot is not None:
+        print(f"🔁 {snapshot.meta['created_at']}에 시작한 작업을 이어서 계산합니다.")
+    else:
+        collection_name = collection_name or active_collection_name()
+        previous = None if full else load_previous(directory, collection_name, m, time_window)
+        own_client = client is None
+        client = client or init_weaviate_client()
+        try:
+            snapshot = make_snapshot(
+                fetch_chunks(client, collection_name), previous, collection_name, m, time_window, block_size
+            )
+        finally:
+            if own_client:
+                client.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+        snapshot.save(work_dir)
+        merged = len(snapshot.merge_rows) if len(snapshot.new_rows) else 0
+        print(
+            f"📥 청크 {snapshot.meta['chunks']}개 (새 청크 {len(snapshot.new_rows)}개): "
+            f"전체 비교 {len(snapshot.full_rows)}개, 새 청크와만 비교 {merged}개"
+        )
+        snapshot = Snapshot.load(work_dir)
+
+    jobs = compute_blocks(snapshot, work_dir)
+    graph = assemble(snapshot, work_dir, jobs)
+    graph.save(directory)
+    shutil.rmtree(work_dir)
+    print(
+        f"✅ 관련 장면 그래프 저장: 청크 {graph.num_chunks}개, 청크당 이웃 {m}개 "
+        f"({time.time() - start:.1f}초)"
+    )
+    return graph
+
+
+class GraphHolder:
+    """API 프로세스에서 그래프를 한 번 열어 두고, 다시 생성되면(meta.json 변경) 새로 엶"""
+
+    def __init__(self, directory=RELATED_GRAPH_DIR):
+        self.directory = directory
+        self._graph = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        meta_path = os.path.join(self.directory, "meta.json")
+        try:
+            mtime = os.stat(meta_path).st_mtime
+        except FileNotFoundError:
+            raise RuntimeError(
+                "관련 장면 그래프가 없습니다. python related_graph.py build로 생성하세요."
+            )
+        if self._graph is None or mtime != self._mtime:
+            with self._lock:
+                if self._graph is None or mtime != self._mtime:
+                    self._graph = RelatedGraph.load(self.directory)
+                    self._mtime = mtime
+        return self._graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description="관련 장면 그래프")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = sub.add_parser("build", help="검색 컬렉션으로 그래프 생성/갱신")
+    build_parser.add_argument("--dir", default=RELATED_GRAPH_DIR)
+    build_parser.add_argument("--full", action="store_true", help="이전 그래프/중단된 작업을 무시하고 전체 계산")
+    build_parser.add_argument("--collection", help="대상 컬렉션 (기본: 현재 검색 컬렉션)")
+    build_parser.add_argument("-m", type=int, default=RELATED_TOP_M, help="청크당 이웃 수")
+    build_parser.add_argument("--block-size", type=int, default=RELATED_BLOCK_SIZE)
+
+    show_parser = sub.add_parser("show", help="청크의 관련 장면 출력")
+    show_parser.add_argument("chunk_id")
+    show_parser.add_argument("--dir", default=RELATED_GRAPH_DIR)
+    show_parser.add_argument("-k", type=int, default=10)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        build_graph(
+            args.dir,
+            collection_name=args.collection,
+            full=args.full,
+            m=args.m,
+            block_size=args.block_size,
+        )
+        return 0
+
+    graph = RelatedGraph.load(args.dir)
+    found = graph.related(args.chunk_id, args.k)
+    if found is None:
+        print(f"❌ 그래프에 없는 청크입니다: {args.chunk_id}")
+        return 1
+    source, results = found
+    print(f"🎬 {source['video_id']} {source['start']:.2f}s: {source['content'][:80]}")
+    for r in results:
+        print(f"- {r['video_id']} {r['start']:.2f}s ({r['similarity']:.3f}): {r['content'][:80]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""Weaviate 읽기 복제본 라우팅과 헤지 요청
+
+- 진행 중인 요청 수가 가장 적은 복제본으로 질의를 보냅니다.
+- 첫 복제본이 최근 응답 시간의 p95(질의 종류별) 안에 답하지 않으면 다른 복제본에
+  같은 질의를 한 번 더 보내고 먼저 끝난 결과를 씁니다. 한 복제본의 GC 멈춤이나
+  컴팩션이 p99로 그대로 드러나지 않게 하기 위함입니다.
+- 진 쪽 요청은 아직 시작 전이면 취소하고, 이미 실행 중이면 결과를 버립니다.
+  (동기 클라이언트는 진행 중인 gRPC 호출을 취소하는 API가 없음)
+"""
+
+import time
+import itertools
+import contextvars
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+def parse_endpoints(value):
+    """"host:http_port:grpc_port,..." 형식을 (host, http_port, grpc_port) 목록으로"""
+    endpoints = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        parts = item.split(":")
+        if len(parts) != 3:
+            raise ValueError(f"복제본 주소 형식이 잘못되었습니다 (host:http_port:grpc_port): {item}")
+        endpoints.append((parts[0], int(parts[1]), int(parts[2])))
+    return endpoints
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+class Replica:
+    def __init__(self, name, client):
+        self.name = name
+        self.client = client
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+
+
+class ReplicaSet:
+    """여러 복제본 클라이언트를 하나의 읽기 대상으로 묶음
+
+    rag 검색 함수가 요청마다 만들던 클라이언트 대신 사용하며, 연결은 계속 유지합니다.
+    """
+
+    def __init__(
+        self,
+        replicas,
+        hedge=True,
+        quantile=0.95,
+        min_delay=0.01,
+        max_delay=0.5,
+        min_samples=20,
+        window=500,
+        pool_size=32,
+    ):
+        if not replicas:
+            raise ValueError("복제본이 하나 이상 필요합니다.")
+        self.replicas = [Replica(name, client) for name, client in replicas]
+        self.hedge = hedge and len(self.replicas) > 1
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self._latencies = defaultdict(lambda: deque(maxlen=window))  # 질의 종류 -> 응답 시간(초)
+        self._lock = threading.Lock()
+        self._rotation = itertools.count()
+        self._pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="replica")
+        self.stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0, "errors": 0}
+
+    def _acquire(self, exclude=None):
+        """진행 중인 요청이 가장 적은 복제본 (같으면 돌아가며)"""
+        with self._lock:
+            offset = next(self._rotation)
+            candidates = [r for r in self.replicas if r is not exclude] or self.replicas
+            n = len(candidates)
+            replica = min(
+                (candidates[(offset + i) % n] for i in range(n)),
+                key=lambda r: r.outstanding,
+            )
+            replica.outstanding += 1
+            replica.requests += 1
+            return replica
+
+    def _call(self, replica, query, kind):
+        start = time.perf_counter()
+        try:
+            result = query(replica.client)
+        except Exception:
+            with self._lock:
+                replica.errors += 1
+            raise
+        finally:
+            with self._lock:
+                replica.outstanding -= 1
+        with self._lock:
+            self._latencies[kind].append(time.perf_counter() - start)
+        return result
+
+    def _delay_for(self, samples):
+        if len(samples) < self.min_samples:
+            return self.max_delay
+        return min(max(percentile(samples, self.quantile), self.min_delay), self.max_delay)
+
+    def hedge_delay(self, kind="default"):
+        """헤지 요청을 보내기 전 기다릴 시간. 표본이 적으면 max_delay"""
+        with self._lock:
+            samples = list(self._latencies[kind])
+        return self._delay_for(samples)
+
+    def run(self, query, kind="default"):
+        """query(client)를 한 복제본에서 실행하고, 늦어지면 다른 복제본에 헤지 요청"""
+        with self._lock:
+            self.stats["requests"] += 1
+        primary = self._acquire()
+        # 호출한 쪽의 contextvars(요청 트레이스)를 복제본 스레드에서도 쓰도록 제출마다 복사
+        first = self._pool.submit(
+            contextvars.copy_context().run, self._call, primary, query, kind
+        )
+        if len(self.replicas) == 1:
+            return first.result()
+
+        if self.hedge:
+            done, _ = wait([first], timeout=self.hedge_delay(kind))
+        else:
+            # 헤지를 끄면 실패했을 때만 다른 복제본으로 재시도
+            done, _ = wait([first])
+        if done and first.exception() is None:
+            return first.result()
+
+        # 첫 요청이 실패했으면 재시도, 늦어지고 있으면 헤지 (둘 중 먼저 성공한 결과 사용)
+        hedged = not done
+        with self._lock:
+            self.stats["hedged" if hedged else "failovers"] += 1
+        second = self._pool.submit(
+            contextvars.copy_context().run,
+            self._call,
+            self._acquire(exclude=primary),
+            query,
+            kind,
+        )
+        futures = [first, second] if hedged else [second]
+
+        error = None if hedged else first.exception()
+        while futures:
+            done, pending = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    if hedged and future is second:
+                        with self._lock:
+                            self.stats["hedge_wins"] += 1
+                    return future.result()
+                error = future.exception()
+            futures = list(pending)
+
+        with self._lock:
+            self.stats["errors"] += 1
+        raise error
+
+    def close(self):
+        # 검색 함수가 요청마다 close()를 호출하므로 연결은 유지
+        pass
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+        for replica in self.replicas:
+            replica.client.close()
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                **self.stats,
+                "hedge": self.hedge,
+                "hedge_delay_ms": {
+                    kind: self._delay_for(samples) * 1000
+                    for kind, samples in self._latencies.items()
+                },
+                "replicas": [
+                    {
+                        "name": r.name,
+                        "outstanding": r.outstanding,
+                        "requests": r.requests,
+                        "errors": r.errors,
+                    }
+                    for r in self.replicas
+                ],
+            }
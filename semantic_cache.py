@@ -0,0 +1,307 @@
+"""질의 벡터 기반 시맨틱 캐시
+
+문장부호, 말줄임표, 끝의 조사 정도만 다른 검색어는 임베딩이 거의 같으므로,
+질의를 인코딩한 뒤 이전에 답한 질의 벡터와의 코사인 유사도가 임계값을 넘으면
+ANN 검색 없이 저장된 결과를 돌려줍니다. 항목 수가 작아(수천 개) 행렬 곱 한 번의
+전수 비교로 충분합니다.
+
+모드
+- off: 사용 안 함
+- shadow: 캐시 결과를 돌려주지 않고, 적중했다면 실제 검색 결과와 얼마나 달랐는지만 기록
+- on: 적중 시 캐시 결과 반환. 적중 중 일부(shadow_rate)는 실제 검색과 비교해 기록
+"""
+
+import json
+import time
+import random
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+MODES = ("off", "shadow", "on")
+
+# 유사도 구간별 결과 일치율 집계 (임계값 조정용)
+SIMILARITY_BUCKETS = (0.90, 0.93, 0.95, 0.97, 0.99, 1.01)
+
+
+def scope_key(channel_ids=None, date_from=None, date_to=None):
+    return json.dumps([sorted(channel_ids or []), date_from, date_to])
+
+
+def result_overlap(cached, fresh):
+    """두 결과 목록의 (video_id, start_time) 자카드 유사도"""
+    a = {(r["video_id"], r["start_time"]) for r in cached}
+    b = {(r["video_id"], r["start_time"]) for r in fresh}
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class SemanticCacheStats:
+    def __init__(self):
+        self.lookups = 0
+        self.hits = 0
+        self.served = 0  # 실제로 캐시 결과를 돌려준 횟수
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.shadow_checks = 0
+        self.shadow_identical = 0
+        self.shadow_overlap_sum = 0.0
+        self.buckets = {upper: [0, 0.0] for upper in SIMILARITY_BUCKETS}
+
+    def record_shadow(self, similarity, overlap, identical):
+        self.shadow_checks += 1
+        self.shadow_overlap_sum += overlap
+        self.shadow_identical += identical
+        for upper in SIMILARITY_BUCKETS:
+            if similarity < upper:
+                self.buckets[upper][0] += 1
+                self.buckets[upper][1] += overlap
+                break
+
+    def to_dict(self):
+        lower = 0.0
+        buckets = {}
+        for upper, (count, overlap_sum) in self.buckets.items():
+            if count:
+                buckets[f"{lower:.2f}-{min(upper, 1.0):.2f}"] = {
+                    "checks": count,
+                    "mean_overlap": overlap_sum / count,
+                }
+            lower = upper
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "served": self.served,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "shadow_checks": self.shadow_checks,
+            "shadow_identical_rate": (
+                self.shadow_identical / self.shadow_checks if self.shadow_checks else None
+            ),
+            "shadow_mean_overlap": (
+                self.shadow_overlap_sum / self.shadow_checks if self.shadow_checks else None
+            ),
+            "overlap_by_similarity": buckets,
+        }
+
+
+class SemanticHit:
+    def __init__(self, slot, results, similarity, serve):
+        self.slot = slot
+        self.results = results
+        self.similarity = similarity
+        self.serve = serve  # False면 결과를 쓰지 않고 실제 검색과 비교만
+
+
+class SemanticCache:
+    def __init__(
+        self,
+        mode="shadow",
+        threshold=0.95,
+        max_entries=2048,
+        ttl=600.0,
+        shadow_rate=0.05,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"알 수 없는 시맨틱 캐시 모드: {mode}")
+        self.mode = mode
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shadow_rate = shadow_rate
+        self.stats = SemanticCacheStats()
+        self.corpus_version = None
+        self._lock = threading.Lock()
+        self._vectors = None  # (max_entries, dim), 정규화된 질의 벡터
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._entries = OrderedDict()  # 슬롯 -> (k, scope, 저장 시각, 결과), LRU 순서
+        self._rng = random.Random()
+
+    @property
+    def enabled(self):
+        return self.mode != "off"
+
+    def _normalize(self, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self, corpus_version):
+        # 검색 대상 컬렉션이 바뀌면(재색인 전환 등) 전부 무효화
+        if corpus_version != self.corpus_version:
+            if self._entries:
+                self.stats.invalidations += 1
+            self.clear()
+            self.corpus_version = corpus_version
+
+    def clear(self):
+        self._entries.clear()
+        self._valid[:] = False
+
+    def lookup(self, vector, k, scope, corpus_version):
+        """유사한 이전 질의의 결과. 없으면 None"""
+        if not self.enabled:
+            return None
+        query = self._normalize(vector)
+        with self._lock:
+            self._check_version(corpus_version)
+            self.stats.lookups += 1
+            if self._vectors is None or not self._entries:
+                return None
+
+            similarities = self._vectors @ query
+            similarities[~self._valid] = -1.0
+            now = time.time()
+            # 유사도 높은 순으로 조건(k, 범위, TTL)에 맞는 첫 항목
+            for slot in np.argsort(-similarities)[:8]:
+                similarity = float(similarities[slot])
+                if similarity < self.threshold:
+                    break
+                entry_k, entry_scope, stored_at, results = self._entries[int(slot)]
+                if now - stored_at > self.ttl:
+                    self._evict(int(slot))
+                    self.stats.expired += 1
+                    continue
+                if entry_scope != scope or entry_k < k:
+                    continue
+
+                self._entries.move_to_end(int(slot))
+                self.stats.hits += 1
+                serve = self.mode == "on" and self._rng.random() >= self.shadow_rate
+                if serve:
+                    self.stats.served += 1
+                return SemanticHit(int(slot), [dict(r) for r in results[:k]], similarity, serve)
+        return None
+
+    def put(self, vector, k, scope, corpus_version, results, hit=None):
+        """검색 결과 저장. hit이 있으면(섀도 비교 후) 새 항목 대신 그 항목을 갱신"""
+        if not self.enabled or not results:
+            return
+        query = self._normalize(vector)
+        with self._lock:
+            self._check_version(corpus_version)
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, query.shape[0]), dtype=np.float32)
+            if hit is not None and hit.slot in self._entries:
+                slot = hit.slot
+                self._entries.move_to_end(slot)
+            elif len(self._entries) >= self.max_entries:
+                slot, _ = self._entries.popitem(last=False)
+                self._valid[slot] = False
+                self.stats.evictions += 1
+            else:
+                slot = int(np.flatnonzero(~self._valid)[0])
+            self._vectors[slot] = query
+            self._valid[slot] = True
+            self._entries[slot] = (k, scope, time.time(), [dict(r) for r in results])
+
+    def _evict(self, slot):
+        self._entries.pop(slot, None)
+        self._valid[slot] = False
+
+    def record_shadow(self, hit, fresh_results):
+        """캐시 결과와 실제 검색 결과 비교 기록"""
+        overlap = result_overlap(hit.results, fresh_results)
+        identical = [(r["video_id"], r["start_time"]) for r in hit.results] == [
+            (r["video_id"], r["start_time"]) for r in fresh_results
+        ]
+        with self._lock:
+            self.stats.record_shadow(hit.similarity, overlap, identical)
+
+    def to_dict(self):
+        return {
+            "mode": self.mode,
+            "threshold": self.threshold,
+            "entries": len(self._entries),
+            "corpus_version": self.corpus_version,
+            **self.stats.to_dict(),
+        }
+
+
+# 이 프로세스가 마지막으로 통계를 올린 시각
+_last_published_at = 0.0
+
+# 워커는 태스크가 없어도 이 주기로 통계를 올림 (start_stats_heartbeat)
+STATS_PUBLISH_INTERVAL = 5.0
+
+# 하트비트가 이보다 오래 끊긴 프로세스 통계는 종료된 워커로 보고 합산에서 제외
+STATS_MAX_AGE = 60.0
+
+
+def publish_stats(cache, redis_client, node, interval=STATS_PUBLISH_INTERVAL):
+    """워커 프로세스별 통계를 Redis 해시에 올림 (API의 /api/metrics에서 합산)"""
+    global _last_published_at
+    now = time.time()
+    if now - _last_published_at < interval:
+        return
+    _last_published_at = now
+    try:
+        redis_client.hset(
+            "semantic_cache:stats", node, json.dumps({**cache.to_dict(), "published_at": now})
+        )
+    except Exception as e:
+        print(f"⚠️ 시맨틱 캐시 통계 저장 실패: {str(e)}")
+
+
+def start_stats_heartbeat(publish, interval=STATS_PUBLISH_INTERVAL):
+    """publish()를 interval마다 부르는 데몬 스레드 시작
+
+    통계를 태스크 처리 후에만 올리면 한동안 요청이 없던 워커가 종료된 워커와
+    구분되지 않으므로, 살아 있는 동안에는 계속 갱신합니다.
+    """
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                publish()
+            except Exception as e:
+                print(f"⚠️ 시맨틱 캐시 통계 하트비트 실패: {str(e)}")
+
+    thread = threading.Thread(target=run, name="semantic-cache-stats", daemon=True)
+    thread.start()
+    return thread
+
+
+def split_stale_stats(raw, max_age=STATS_MAX_AGE, now=None):
+    """Redis 해시 {node: json}을 (최근 통계 목록, 오래된 node 목록)으로 나눔"""
+    now = time.time() if now is None else now
+    live, stale = [], []
+    for node, value in raw.items():
+        stats = json.loads(value)
+        if now - stats.get("published_at", 0.0) > max_age:
+            stale.append(node)
+        else:
+            live.append(stats)
+    return live, stale
+
+
+def merge_stats(stats_list):
+    """여러 프로세스의 통계 합산"""
+    totals = {
+        key: sum(s.get(key, 0) for s in stats_list)
+        for key in (
+            "lookups",
+            "hits",
+            "served",
+            "expired",
+            "evictions",
+            "invalidations",
+            "shadow_checks",
+            "entries",
+        )
+    }
+    totals["hit_rate"] = totals["hits"] / totals["lookups"] if totals["lookups"] else 0.0
+    overlap_sum = sum(
+        (s.get("shadow_mean_overlap") or 0.0) * s.get("shadow_checks", 0) for s in stats_list
+    )
+    totals["shadow_mean_overlap"] = (
+        overlap_sum / totals["shadow_checks"] if totals["shadow_checks"] else None
+    )
+    totals["processes"] = len(stats_list)
+    return totals
@@ -0,0 +1,136 @@
+"""검색 응답 직렬화/압축 (API 응답 클래스는 api.py)
+
+- orjson이 있으면 orjson으로, 없으면 표준 json으로 직렬화 (한글을 \\uXXXX로 늘리지 않음)
+- 핸들러가 만든 dict를 다시 Pydantic 모델로 검증하지 않고 바로 바이트로 변환
+- slim 모드: 청크 전체(content)와 youtube_link 대신 질의와 맞는 부분 주변의 snippet만
+- Accept-Encoding에 따라 brotli(설치된 경우) 또는 gzip으로 압축
+"""
+
+import re
+import gzip
+import json
+from functools import lru_cache
+
+import numpy as np
+
+from config import (
+    RESPONSE_COMPRESS_MIN_BYTES,
+    RESPONSE_GZIP_LEVEL,
+    RESPONSE_BROTLI_QUALITY,
+    SNIPPET_CHARS,
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def dumps(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def supported_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str):
+    """Accept-Encoding 헤더에서 사용할 압축 방식 (q값이 높은 것, 같으면 br 우선)"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL)
+    return body
+
+
+def encode_body(payload, accept_encoding: str = ""):
+    """payload를 한 번에 직렬화하고, 클라이언트가 허용하면 압축. (본문, 추가 헤더) 반환"""
+    body = dumps(payload)
+    headers = {"Vary": "Accept-Encoding"}
+    if len(body) >= RESPONSE_COMPRESS_MIN_BYTES:
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding:
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+    return body, headers
+
+
+# ---- slim 모드 ----
+
+
+@lru_cache(maxsize=256)
+def _bigram_pattern(query):
+    """질의 글자 bigram 중 하나와 맞는 정규식 (공백 제외)"""
+    text = query.replace(" ", "")
+    grams = {text[i : i + 2] for i in range(len(text) - 1)}
+    return re.compile("|".join(map(re.escape, grams))) if grams else None
+
+
+def make_snippet(content: str, query: str, width: int = SNIPPET_CHARS) -> str:
+    """content에서 query와 가장 많이 겹치는 width 글자 구간 (앞뒤가 잘리면 …)"""
+    if len(content) <= width:
+        return content
+
+    position = content.find(query.strip())
+    if position >= 0:
+        center = position + len(query.strip()) // 2
+    else:
+        # 질의 글자 bigram이 나오는 위치들 중 width 구간 안에 가장 많이 모인 곳의 가운데
+        pattern = _bigram_pattern(query)
+        positions = [m.start() for m in pattern.finditer(content)] if pattern else []
+        if not positions:
+            return content[:width] + "…"
+        positions = np.asarray(positions)  # finditer 결과는 이미 오름차순
+        # 각 위치에서 시작하는 width 구간에 들어가는 위치 수
+        counts = np.searchsorted(positions, positions + width) - np.arange(len(positions))
+        best = int(np.argmax(counts))
+        center = int(positions[best] + positions[best + counts[best] - 1]) // 2
+
+    start = max(0, min(center - width // 2, len(content) - width))
+    snippet = content[start : start + width]
+    if start > 0:
+        snippet = "…" + snippet
+    if start + width < len(content):
+        snippet = snippet + "…"
+    return snippet
+
+
+def slim_results(results, query: str, width: int = SNIPPET_CHARS):
+    return [
+        {
+            "video_id": r["video_id"],
+            "start_time": r["start_time"],
+            "snippet": make_snippet(r["content"], query, width),
+        }
+        for r in results
+    ]
@@ -0,0 +1,154 @@
+"""동일한 검색 요청의 동시 실행 합치기 (singleflight)
+
+같은 (query, search_type, k) 요청이 동시에 여러 개 들어오면 한 번만 실행하고
+나머지는 그 결과를 함께 받습니다. 프로세스 안에서는 asyncio Future로,
+여러 API 프로세스 사이에서는 Redis 잠금 키와 결과 키로 합칩니다.
+"""
+
+import json
+import time
+import asyncio
+import hashlib
+
+import redis.asyncio as aioredis
+
+
+def make_key(query, search_type, k=None, scope=None):
+    raw = json.dumps(
+        [" ".join(query.split()), search_type, k, scope or {}],
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class SingleFlightStats:
+    def __init__(self):
+        self.executions = 0  # 실제로 실행된 횟수
+        self.local_collapsed = 0  # 같은 프로세스의 실행 결과를 공유받은 요청
+        self.remote_collapsed = 0  # 다른 프로세스의 실행 결과를 공유받은 요청
+        self.redis_errors = 0
+
+    def to_dict(self):
+        total = self.executions + self.local_collapsed + self.remote_collapsed
+        collapsed = self.local_collapsed + self.remote_collapsed
+        return {
+            "executions": self.executions,
+            "local_collapsed": self.local_collapsed,
+            "remote_collapsed": self.remote_collapsed,
+            "redis_errors": self.redis_errors,
+            "collapse_ratio": collapsed / total if total else 0.0,
+        }
+
+
+class SingleFlight:
+    def __init__(
+        self,
+        redis_url=None,
+        lock_ttl=60.0,
+        result_ttl=5.0,
+        poll_interval=0.05,
+        prefix="singleflight",
+    ):
+        self.redis_url = redis_url
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.prefix = prefix
+        self.stats = SingleFlightStats()
+        self._inflight = {}
+        self._redis = None
+
+    def _get_redis(self):
+        if self._redis is None and self.redis_url:
+            self._redis = aioredis.from_url(self.redis_url)
+        return self._redis
+
+    async def do(self, key, func, deadline=None):
+        """key가 같은 동시 호출은 func를 한 번만 실행하고 결과를 공유
+
+        실행은 요청과 분리된 태스크에서 하고 모두 asyncio.shield로 기다리므로, 처음 요청한
+        쪽이 취소되어도(클라이언트 연결 끊김 등) 함께 기다리던 요청은 결과를 받습니다.
+        deadline(time.time() 기준 시각)이 있으면 다른 프로세스의 결과를 그때까지만 기다립니다.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats.local_collapsed += 1
+            return await asyncio.shield(task)
+
+        task = asyncio.get_event_loop().create_task(self._do_remote(key, func, deadline))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._inflight.get(key) is task:
+            self._inflight.pop(key, None)
+        # 기다리는 요청이 없을 때 'exception was never retrieved' 경고 방지
+        if not task.cancelled():
+            task.exception()
+
+    async def _do_remote(self, key, func, deadline=None):
+        redis = self._get_redis()
+        if redis is None:
+            return await self._execute(func)
+
+        lock_key = f"{self.prefix}:lock:{key}"
+        result_key = f"{self.prefix}:result:{key}"
+        wait_until = time.time() + self.lock_ttl
+        if deadline is not None:
+            wait_until = min(wait_until, deadline)
+
+        while True:
+            try:
+                acquired = await redis.set(
+                    lock_key, "1", nx=True, px=int(self.lock_ttl * 1000)
+                )
+            except Exception as e:
+                # Redis 장애 시 프로세스 내 합치기만 사용
+                self.stats.redis_errors += 1
+                print(f"⚠️ singleflight Redis 오류: {str(e)}")
+                return await self._execute(func)
+
+            if acquired:
+                return await self._lead(redis, lock_key, result_key, func)
+
+            # 다른 프로세스가 실행 중: 결과가 올라오거나 잠금이 풀릴 때까지 대기
+            # (요청 마감 시각이 지나면 기다리지 않고 직접 실행)
+            while time.time() < wait_until:
+                try:
+                    cached = await redis.get(result_key)
+                    if cached is not None:
+                        self.stats.remote_collapsed += 1
+                        return json.loads(cached)
+                    if not await redis.exists(lock_key):
+                        break
+                except Exception:
+                    self.stats.redis_errors += 1
+                    return await self._execute(func)
+                await asyncio.sleep(self.poll_interval)
+            else:
+                return await self._execute(func)
+            # 리더가 결과 없이 끝났으면(실패) 다시 잠금 시도
+
+    async def _lead(self, redis, lock_key, result_key, func):
+        try:
+            result = await self._execute(func)
+            try:
+                await redis.set(
+                    result_key,
+                    json.dumps(result, ensure_ascii=False),
+                    px=int(self.result_ttl * 1000),
+                )
+            except Exception:
+                self.stats.redis_errors += 1
+            return result
+        finally:
+            try:
+                await redis.delete(lock_key)
+            except Exception:
+                self.stats.redis_errors += 1
+
+    async def _execute(self, func):
+        self.stats.executions += 1
+        return await func()
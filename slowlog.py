@@ -0,0 +1,71 @@
+"""느린 검색 기록
+
+기준 시간(SLOW_QUERY_THRESHOLD_MS)을 넘긴 요청의 질의, 검색 타입, 결과 수와
+단계별 소요 시간(트레이스 span 합계)을 JSONL 파일에 한 줄씩 남깁니다.
+파일 쓰기는 백그라운드 스레드가 하므로 요청 경로에서는 디스크 I/O가 없습니다.
+"""
+
+import threading
+from collections import deque, defaultdict
+from datetime import datetime
+
+from jsonl_writer import JsonlAppender
+
+# 기록할 질의 최대 길이 (매우 긴 입력도 길이는 query_length로 남음)
+MAX_QUERY_CHARS = 500
+
+
+def stage_breakdown(span_dicts):
+    """span 이름별 소요 시간 합계(ms). 전체 요청 span은 제외"""
+    stages = defaultdict(float)
+    for span in span_dicts:
+        if span["name"] == "request" or span.get("end_ns") is None:
+            continue
+        stages[span["name"]] += (span["end_ns"] - span["start_ns"]) / 1e6
+    return {name: round(ms, 2) for name, ms in sorted(stages.items(), key=lambda i: -i[1])}
+
+
+class SlowQueryLog:
+    def __init__(self, path, threshold_ms, keep=200):
+        self.path = path
+        self.threshold_ms = threshold_ms
+        self.recent = deque(maxlen=keep)
+        self._lock = threading.Lock()
+        self._writer = JsonlAppender(path) if path else None
+
+    def maybe_record(self, trace, path, status_code, duration_ms):
+        """duration_ms가 기준을 넘으면 기록하고 항목 반환 (아니면 None)"""
+        if self.threshold_ms <= 0 or duration_ms < self.threshold_ms:
+            return None
+
+        attributes = trace.attributes
+        query = attributes.get("query") or ""
+        entry = {
+            "timestamp": datetime.now().isoformat(timespec="milliseconds"),
+            "request_id": trace.request_id,
+            "path": path,
+            "status": status_code,
+            "duration_ms": round(duration_ms, 2),
+            "search_type": attributes.get("search_type"),
+            "query": query[:MAX_QUERY_CHARS],
+            "query_length": len(query),
+            "result_count": attributes.get("result_count"),
+            "stages": stage_breakdown(trace.to_dicts()),
+        }
+        with self._lock:
+            self.recent.append(entry)
+        if self._writer is not None:
+            self._writer.append(entry)
+        print(
+            f"🐢 느린 검색 {duration_ms:.0f}ms ({entry['search_type']}, "
+            f"질의 {entry['query_length']}자): {entry['stages']}"
+        )
+        return entry
+
+    def latest(self, limit=50):
+        """최근 느린 검색 (최신순, 보관 개수까지)"""
+        if limit <= 0:
+            return []
+        limit = min(limit, self.recent.maxlen)
+        with self._lock:
+            return list(self.recent)[-limit:][::-1]
@@ -0,0 +1,122 @@
+"""시작 시간 프로파일링
+
+모듈 임포트 시간(python -X importtime)을 최상위 패키지별로 집계하고,
+--serve를 주면 uvicorn을 띄워 /health가 처음 응답하기까지 걸린 시간도 잽니다.
+
+    python startup_profile.py                  # api, tasks 임포트 시간
+    python startup_profile.py rag --top 30
+    python startup_profile.py --serve --port 8299
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import subprocess
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_imports(module):
+    """새 인터프리터에서 module을 임포트하며 모듈별 self/cumulative 시간(ms) 수집"""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append(
+                {
+                    "name": name,
+                    "self_ms": int(self_us) / 1000,
+                    "cumulative_ms": int(cumulative_us) / 1000,
+                    "depth": (len(indent) - 1) // 2,
+                }
+            )
+    error = proc.stderr.strip().splitlines()[-1] if proc.returncode else None
+    return {"module": module, "wall_ms": wall_ms, "modules": modules, "error": error}
+
+
+def by_package(modules):
+    """최상위 패키지별 self 시간 합계 (예: torch.nn.* -> torch)"""
+    totals = defaultdict(float)
+    for m in modules:
+        totals[m["name"].split(".")[0]] += m["self_ms"]
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def print_import_profile(result, top):
+    print(f"\n=== import {result['module']}: {result['wall_ms']:.0f}ms (인터프리터 시작 포함) ===")
+    if result["error"]:
+        print(f"❌ 임포트 실패: {result['error']}")
+
+    print(f"\n{'패키지':<32}{'self 합계(ms)':>14}")
+    for name, self_ms in by_package(result["modules"])[:top]:
+        print(f"{name:<32}{self_ms:>14.1f}")
+
+    print(f"\n{'모듈 (누적 시간 순)':<48}{'누적(ms)':>10}{'self(ms)':>10}")
+    ordered = sorted(result["modules"], key=lambda m: m["cumulative_ms"], reverse=True)
+    for m in ordered[:top]:
+        print(f"{m['name']:<48}{m['cumulative_ms']:>10.1f}{m['self_ms']:>10.1f}")
+
+
+def profile_serve(port, timeout=60.0):
+    """uvicorn 실행부터 /health 첫 응답(상태 코드 무관)까지 걸린 시간"""
+    env = dict(os.environ, API_PRELOAD_MODEL=os.getenv("API_PRELOAD_MODEL", "1"))
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=env,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as r:
+                    status = r.status
+                break
+            except urllib.error.HTTPError as e:
+                status = e.code
+                break
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.02)
+        else:
+            print(f"❌ {timeout:.0f}초 안에 /health가 응답하지 않았습니다.")
+            return None
+        elapsed = time.perf_counter() - start
+        print(f"\n/health 첫 응답까지 {elapsed * 1000:.0f}ms (상태 코드 {status})")
+        return elapsed
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="시작 시간 프로파일링")
+    parser.add_argument("modules", nargs="*", default=["api", "tasks"])
+    parser.add_argument("--top", type=int, default=20, help="출력할 항목 수")
+    parser.add_argument("--serve", action="store_true", help="uvicorn 실행 후 /health 응답 시간 측정")
+    parser.add_argument("--port", type=int, default=8299)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        print_import_profile(profile_imports(module), args.top)
+    if args.serve:
+        profile_serve(args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,184 @@
 # tasks.py
 from celery import Celery
-from rag import search_similar_sentences
+from celery.signals import worker_init, worker_process_init
+from celery.exceptions import SoftTimeLimitExceeded
+import rag
+from rag import (
+    search_similar_sentences,
+    search_similar_sentences_batch,
+    search_similar_sentences_grouped,
+)
+import os
+import socket
 import asyncio
+import threading
+import time
+
+import tracing
+import ingest
+import index_pointer
+import model_sharing
+import semantic_cache
+from profiler import SamplingProfiler
+from warmup import start_background_warmup
+from config import (
+    WARMUP_WORKER_SEARCH_TYPES,
+    BATCH_MAX_CONCURRENCY,
+    CELERY_BROKER_URL,
+    CELERY_RESULT_BACKEND,
+    CELERY_VECTOR_QUEUE,
+    CELERY_BULK_QUEUE,
+    CELERY_INGEST_QUEUE,
+    CELERY_PRIORITY_STEPS,
+    CELERY_PRIORITY_SEP,
+    WORKER_PREFETCH_MULTIPLIER,
+    WORKER_PRELOAD_MODEL,
+    WORKER_PROC_ALIVE_TIMEOUT,
+    MODEL_SHARE_MODE,
+    SEMANTIC_CACHE_STATS_REDIS_URL,
+    PROFILE_SAMPLE_INTERVAL,
+    INGEST_REDIS_URL,
+    INGEST_EMBED_BATCH_SIZE,
+    INGEST_TASK_TIME_LIMIT,
+    INGEST_TASK_SOFT_TIME_LIMIT,
+)
 
 # Celery 기본 설정
 celery = Celery(
     "tasks",
-    broker="redis://localhost:6379/0",
-    backend="redis://localhost:6379/1",
+    broker=CELERY_BROKER_URL,
+    backend=CELERY_RESULT_BACKEND,
+)
+
+celery.conf.update(
+    # 검색 타입별 전용 큐로 라우팅 (-Q 없이 띄운 워커는 대화형 큐를 처리)
+    task_default_queue=CELERY_VECTOR_QUEUE,
+    task_routes={
+        "tasks.search_task_vector": {"queue": CELERY_VECTOR_QUEUE},
+        "tasks.search_task_vector_grouped": {"queue": CELERY_VECTOR_QUEUE},
+        "tasks.search_task_vector_batch": {"queue": CELERY_BULK_QUEUE},
+        "tasks.ingest_shard_task": {"queue": CELERY_INGEST_QUEUE},
+    },
+    # Redis는 우선순위 단계마다 별도 리스트를 두고 낮은 숫자부터 꺼냄
+    broker_transport_options={
+        "priority_steps": CELERY_PRIORITY_STEPS,
+        "sep": CELERY_PRIORITY_SEP,
+        "queue_order_strategy": "priority",
+    },
+    task_default_priority=CELERY_PRIORITY_STEPS[len(CELERY_PRIORITY_STEPS) // 2],
+    worker_prefetch_multiplier=WORKER_PREFETCH_MULTIPLIER,
+    worker_proc_alive_timeout=WORKER_PROC_ALIVE_TIMEOUT,
 )
 
 
+def broker_queue_keys(queue):
+    """우선순위 단계별로 나뉜 브로커 큐의 Redis 키 목록 (큐 길이 합산용)"""
+    return [queue] + [
+        f"{queue}{CELERY_PRIORITY_SEP}{step}" for step in CELERY_PRIORITY_STEPS if step
+    ]
+
+
+# 워커 스레드마다 재사용하는 이벤트 루프 (태스크마다 asyncio.run으로 새로 만들지 않음)
+_loop_local = threading.local()
+
+
+def get_worker_loop():
+    loop = getattr(_loop_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        _loop_local.loop = loop
+    return loop
+
+
+_stats_redis = None
+
+
+def publish_semantic_cache_stats():
+    """이 워커 프로세스의 시맨틱 캐시 통계를 Redis에 올림 (API /api/metrics에서 합산)"""
+    global _stats_redis
+    if not SEMANTIC_CACHE_STATS_REDIS_URL or not rag.semantic_cache.enabled:
+        return
+    if _stats_redis is None:
+        import redis
+
+        _stats_redis = redis.Redis.from_url(SEMANTIC_CACHE_STATS_REDIS_URL)
+    semantic_cache.publish_stats(
+        rag.semantic_cache, _stats_redis, f"{socket.gethostname()}:{os.getpid()}"
+    )
+
+
+@worker_init.connect
+def preload_model_before_fork(**kwargs):
+    # prefork 풀을 만들기 전 부모 프로세스에서 한 번만 로드해 자식들이 가중치 페이지를 공유
+    # (부모에서는 추론하지 않음: torch 스레드 풀이 만들어진 뒤 fork하면 자식이 멈출 수 있음)
+    if MODEL_SHARE_MODE != "fork":
+        return
+    start = time.time()
+    model_sharing.prepare_for_fork(rag.get_embedding())
+    print(f"✅ fork 전 모델 로드 완료 ({time.time() - start:.2f}초)")
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    # fork 이전 부모 프로세스의 루프를 물려받지 않도록 자식에서 새로 생성
+    _loop_local.loop = None
+    get_worker_loop()
+
+    if WORKER_PRELOAD_MODEL:
+        # 이 핸들러가 끝나야 자식 프로세스가 태스크를 받기 시작함
+        start = time.time()
+        rag.get_embedding().embed_query("워밍업")
+        print(f"✅ 워커 모델 사전 로드 완료 ({time.time() - start:.2f}초)")
+
+    # 상위 검색어로 모델 파일 페이지와 Weaviate 캐시를 미리 데움
+    # (검색을 처리하는 자식마다 실행. worker_ready는 부모에서만 불려 자식은 데워지지 않고,
+    #  부모에서 추론하면 이후 fork되는 자식이 멈출 수 있음)
+    start_background_warmup([t for t in WARMUP_WORKER_SEARCH_TYPES if t])
+
+    # 한가한 워커도 통계를 계속 올려 /api/metrics 합산에서 빠지지 않도록 함
+    if SEMANTIC_CACHE_STATS_REDIS_URL and rag.semantic_cache.enabled:
+        semantic_cache.start_stats_heartbeat(publish_semantic_cache_stats)
+
+
 # 비동기 함수 실행 헬퍼
 def run_async(func, *args):
-    try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        loop = None
+    return get_worker_loop().run_until_complete(func(*args))
+
+
+def get_task_header(request, name):
+    """apply_async(headers=...)로 전달된 사용자 정의 헤더 조회"""
+    value = getattr(request, name, None)
+    if value is None and isinstance(getattr(request, "headers", None), dict):
+        value = request.headers.get(name)
+    return value
+
+
+def start_task_trace(request):
+    """API에서 넘긴 헤더로 워커 측 트레이스 시작 및 브로커 큐 대기 시간 기록"""
+    picked_up_ns = time.time_ns()
+    trace = tracing.start_trace(
+        get_task_header(request, "request_id"),
+        get_task_header(request, "parent_span_id"),
+        get_task_header(request, "trace_id"),
+    )
+    enqueued_ns = get_task_header(request, "enqueued_ns")
+    if enqueued_ns:
+        tracing.record_span("queue_wait", int(enqueued_ns), picked_up_ns)
+    return trace
+
+
+def start_task_profiler(request):
+    """API에서 ?profile=1로 들어온 요청이면 워커 쪽 스택도 샘플링"""
+    if not get_task_header(request, "profile"):
+        return None
+    return SamplingProfiler(PROFILE_SAMPLE_INTERVAL).start()
 
-    if loop and loop.is_running():
-        return asyncio.run(func(*args))
-    else:
-        return asyncio.run(func(*args))
+
+def finish_task_profiler(profiler, output):
+    if profiler is not None:
+        output["profile"] = dict(profiler.stop().stacks)
+    return output
 
 
 # 워커 기본 안정성 설정 포함 태스크
@@ -29,14 +186,163 @@ def run_async(func, *args):
     bind=True,
     max_retries=3,  # 최대 3회 재시도
     default_retry_delay=5,  # 5초 간격으로 재시도
-    task_time_limit=60,  # 강제 종료 시간 (초)
+    time_limit=60,  # 강제 종료 시간 (초)
     acks_late=True,  # 작업 완료 후 ack (워커 중단 시 자동 재시도됨)
 )
-def search_task_vector(self, question: str):
+def search_task_vector(
+    self, question: str, k: int = 7, channel_ids=None, date_from=None, date_to=None
+):
+    trace = start_task_trace(self.request)
+
+    # API가 이미 포기한 요청은 실행하지 않음
+    deadline = get_task_header(self.request, "deadline")
+    if deadline and time.time() > float(deadline):
+        return {"error": "마감 시간이 지난 요청입니다.", "expired": True}
+
+    profiler = start_task_profiler(self.request)
     try:
-        return run_async(search_similar_sentences, question)
+        with tracing.span("worker", retries=self.request.retries or 0):
+            results = run_async(
+                search_similar_sentences, question, k, channel_ids, date_from, date_to
+            )
+        publish_semantic_cache_stats()
+        return finish_task_profiler(
+            profiler, {"results": results, "spans": trace.to_dicts()}
+        )
+    except Exception as e:
+        try:
+            self.retry(exc=e)
+        except self.MaxRetriesExceededError:
+            return {"error": f"최대 재시도 초과: {str(e)}"}
+    finally:
+        if profiler is not None:
+            profiler.stop()
+
+
+@celery.task(
+    bind=True,
+    max_retries=3,
+    default_retry_delay=5,
+    time_limit=60,
+    acks_late=True,
+)
+def search_task_vector_grouped(
+    self, question: str, moments: int = 3, channel_ids=None, date_from=None, date_to=None
+):
+    """영상별로 묶은 검색 (모든 페이지에 쓸 결과를 한 번에 계산)"""
+    trace = start_task_trace(self.request)
+
+    deadline = get_task_header(self.request, "deadline")
+    if deadline and time.time() > float(deadline):
+        return {"error": "마감 시간이 지난 요청입니다.", "expired": True}
+
+    profiler = start_task_profiler(self.request)
+    try:
+        with tracing.span("worker", retries=self.request.retries or 0):
+            groups = run_async(
+                search_similar_sentences_grouped,
+                question,
+                moments,
+                channel_ids,
+                date_from,
+                date_to,
+            )
+        return finish_task_profiler(profiler, {"groups": groups, "spans": trace.to_dicts()})
+    except Exception as e:
+        try:
+            self.retry(exc=e)
+        except self.MaxRetriesExceededError:
+            return {"error": f"최대 재시도 초과: {str(e)}"}
+    finally:
+        if profiler is not None:
+            profiler.stop()
+
+
+@celery.task(
+    bind=True,
+    max_retries=1,
+    default_retry_delay=5,
+    time_limit=300,
+    acks_late=True,
+)
+def search_task_vector_batch(self, items):
+    """[{"query": ..., "k": ..., "scope": {...}}] 목록을 한 번의 배치 임베딩으로 검색"""
+    trace = start_task_trace(self.request)
+
+    profiler = start_task_profiler(self.request)
+    try:
+        with tracing.span("worker", batch_size=len(items)):
+            outputs = search_similar_sentences_batch(
+                [(item["query"], item["k"], item.get("scope")) for item in items],
+                max_concurrency=BATCH_MAX_CONCURRENCY,
+            )
+        return finish_task_profiler(profiler, {"outputs": outputs, "spans": trace.to_dicts()})
+    except Exception as e:
+        try:
+            self.retry(exc=e)
+        except self.MaxRetriesExceededError:
+            return {"error": f"최대 재시도 초과: {str(e)}"}
+    finally:
+        if profiler is not None:
+            profiler.stop()
+
+
+# 색인 워커 프로세스마다 재사용하는 쓰기용 연결 (검색용 복제본 연결과 별개)
+_ingest_client = None
+_ingest_redis = None
+_video_metadata = None
+
+
+def get_ingest_resources():
+    global _ingest_client, _ingest_redis, _video_metadata
+    if _ingest_client is None or not _ingest_client.is_connected():
+        _ingest_client = rag.init_weaviate_client()
+    if _ingest_redis is None:
+        import redis
+
+        _ingest_redis = redis.Redis.from_url(INGEST_REDIS_URL)
+    if _video_metadata is None:
+        from database import load_video_metadata
+
+        _video_metadata = load_video_metadata()
+    return _ingest_client, _ingest_redis, _video_metadata
+
+
+@celery.task(
+    bind=True,
+    max_retries=3,
+    default_retry_delay=30,
+    time_limit=INGEST_TASK_TIME_LIMIT,
+    soft_time_limit=INGEST_TASK_SOFT_TIME_LIMIT,
+    acks_late=True,  # 워커가 죽으면 다른 워커가 샤드를 다시 처리 (UUID5 업서트라 중복 없음)
+)
+def ingest_shard_task(self, run_id, collection_name, video_ids):
+    """영상 샤드 색인: 청크 분할 → 배치 임베딩 → UUID5 업서트, 결과는 코디네이터(Redis)에 기록"""
+    client, redis_client, metadata = get_ingest_resources()
+    run = ingest.IngestRun(redis_client, run_id)
+    worker_id = ingest.worker_name()
+    try:
+        return ingest.ingest_shard(
+            run,
+            client.collections.get(collection_name),
+            # 재색인 중인 컬렉션은 운영 중인 컬렉션과 다른 모델일 수 있음
+            rag.get_embedding(index_pointer.collection_model(collection_name)),
+            video_ids,
+            metadata,
+            worker_id,
+            batch_size=INGEST_EMBED_BATCH_SIZE,
+        )
+    except SoftTimeLimitExceeded as e:
+        # 진행 중이던 업서트는 ingest_shard가 마무리함. 남은 영상은 재시도(다른 워커)에서 이어서 처리
+        print(f"⏱️ 샤드 처리 시간 초과({INGEST_TASK_SOFT_TIME_LIMIT}초): 남은 영상은 재시도합니다.")
+        try:
+            self.retry(exc=e, countdown=0)
+        except self.MaxRetriesExceededError:
+            run.fail_remaining(video_ids, worker_id, "처리 시간 초과")
+            return {"error": "처리 시간 초과"}
     except Exception as e:
         try:
             self.retry(exc=e)
         except self.MaxRetriesExceededError:
+            run.fail_remaining(video_ids, worker_id, f"최대 재시도 초과: {str(e)}")
             return {"error": f"최대 재시도 초과: {str(e)}"}
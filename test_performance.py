@@ -5,10 +5,16 @@ import statistics
 from datetime import datetime
 import json
 import os
+import math
+import random
+import asyncio
+import argparse
+import threading
 from config import API_URL  # API_URL을 config에서 import
 
-# API 서버 URL을 config에서 가져옴
-API_URL = "http://203.252.147.202:8200/api/search"
+# API 서버 URL (PERF_BASE_URL 환경 변수로 변경 가능)
+API_BASE_URL = os.getenv("PERF_BASE_URL", "http://203.252.147.202:8200")
+API_URL = f"{API_BASE_URL}/api/search"
 
 # 테스트 결과를 저장할 디렉토리
 TEST_RESULTS_DIR = "test_results"
@@ -39,7 +45,7 @@ SEARCH_TYPES = [
 def check_api_health():
     """API 서버 상태 확인"""
     try:
-        response = requests.get("http://203.252.147.202:8200/health", timeout=10)
+        response = requests.get(f"{API_BASE_URL}/health", timeout=10)
         if response.status_code == 200:
             health_data = response.json()
             print(f"API 서버 응답 시간: {response.elapsed.total_seconds():.2f}초")
@@ -67,7 +73,7 @@ def make_search_request(query, search_type="vector"):
 
         # Celery 사용 여부에 따라 다른 엔드포인트 사용
         if search_type == "vector_no_celery":
-            url = "http://203.252.147.202:8200/api/search_no_celery"
+            url = f"{API_BASE_URL}/api/search_no_celery"
         else:
             url = API_URL
 
@@ -278,12 +284,290 @@ def run_concurrent_test(num_users, num_requests_per_user):
     return stats
 
 
+class LatencyHistogram:
+    """HDR 스타일 로그-선형 버킷 히스토그램 (마이크로초 단위, 상대 오차 약 3%)"""
+
+    SUB_BUCKETS = 32
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.max_us = 0
+
+    def _bucket(self, value_us):
+        if value_us < self.SUB_BUCKETS:
+            return value_us
+        exponent = int(math.log2(value_us)) - 5
+        sub = value_us >> exponent
+        return sub << exponent
+
+    def _bucket_upper(self, bucket):
+        """버킷에 들어갈 수 있는 가장 큰 값 (마이크로초)"""
+        if bucket < self.SUB_BUCKETS:
+            return bucket
+        exponent = int(math.log2(bucket)) - 5
+        return bucket + (1 << exponent) - 1
+
+    def record(self, seconds):
+        value_us = max(int(seconds * 1_000_000), 0)
+        bucket = self._bucket(value_us)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total += 1
+        self.max_us = max(self.max_us, value_us)
+
+    def percentile(self, q):
+        """q 백분위수 (ms). 꼬리 지연을 낮춰 보지 않도록 버킷 상한값으로 보고"""
+        if not self.total:
+            return 0.0
+        target = math.ceil(self.total * q / 100)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return min(self._bucket_upper(bucket), self.max_us) / 1000
+        return self.max_us / 1000
+
+    def to_dict(self):
+        return {
+            "count": self.total,
+            "percentiles_ms": {
+                str(q): self.percentile(q) for q in (50, 75, 90, 95, 99, 99.9, 100)
+            },
+            "max_ms": self.max_us / 1000,
+            "buckets_ms": [
+                [bucket / 1000, self.counts[bucket]] for bucket in sorted(self.counts)
+            ],
+        }
+
+
+def arrival_schedule(pattern, rate, duration, step_rates=None, step_duration=None, seed=0):
+    """도착 시각 오프셋(초) 목록 생성: constant, poisson, step"""
+    if pattern == "constant":
+        return [i / rate for i in range(int(rate * duration))]
+
+    if pattern == "poisson":
+        rng = random.Random(seed)
+        offsets, t = [], rng.expovariate(rate)
+        while t < duration:
+            offsets.append(t)
+            t += rng.expovariate(rate)
+        return offsets
+
+    if pattern == "step":
+        offsets, base = [], 0.0
+        for step_rate in step_rates:
+            offsets.extend(base + i / step_rate for i in range(int(step_rate * step_duration)))
+            base += step_duration
+        return offsets
+
+    raise ValueError(f"알 수 없는 도착 패턴: {pattern}")
+
+
+_thread_local = threading.local()
+
+
+def _session():
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        _thread_local.session = session
+    return session
+
+
+def _send_request(query, search_type, timeout):
+    """응답 코드와 에러 타입만 반환하는 가벼운 요청 함수 (open-loop용)"""
+    if search_type == "vector_no_celery":
+        url = f"{API_BASE_URL}/api/search_no_celery"
+    else:
+        url = API_URL
+    try:
+        response = _session().post(
+            url, json={"query": query, "search_type": search_type}, timeout=timeout
+        )
+        return response.status_code, None if response.status_code == 200 else "server_error"
+    except requests.exceptions.Timeout:
+        return None, "timeout_error"
+    except requests.exceptions.ConnectionError:
+        return None, "connection_error"
+    except Exception:
+        return None, "unknown_error"
+
+
+async def run_open_loop(search_type, offsets, max_in_flight=512, timeout=60):
+    """도착 시각에 맞춰 요청을 보내고 '예정 전송 시각' 기준으로 지연 시간 측정
+
+    응답을 기다리지 않고 다음 요청을 예정대로 보내므로(open-loop) 서버가 밀릴 때
+    생기는 대기 시간이 그대로 지연 시간에 반영됩니다 (coordinated omission 방지).
+    """
+    loop = asyncio.get_running_loop()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_in_flight)
+    histogram = LatencyHistogram()
+    send_lag = LatencyHistogram()
+    error_types = {}
+    completed = 0
+
+    async def fire(intended, query):
+        nonlocal completed
+        send_lag.record(loop.time() - intended)
+        status, error_type = await loop.run_in_executor(
+            executor, _send_request, query, search_type, timeout
+        )
+        latency = loop.time() - intended
+        if error_type:
+            error_types[error_type] = error_types.get(error_type, 0) + 1
+        else:
+            histogram.record(latency)
+            completed += 1
+
+    start = loop.time()
+    tasks = []
+    for i, offset in enumerate(offsets):
+        intended = start + offset
+        delay = intended - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        query = TEST_QUERIES[i % len(TEST_QUERIES)]
+        tasks.append(asyncio.create_task(fire(intended, query)))
+
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - start
+    executor.shutdown(wait=False)
+
+    offered_duration = offsets[-1] if offsets else 0.0
+    return {
+        "search_type": search_type,
+        "offered_requests": len(offsets),
+        "offered_rate": len(offsets) / offered_duration if offered_duration > 0 else 0.0,
+        "completed": completed,
+        "throughput": completed / elapsed if elapsed > 0 else 0.0,
+        "error_rate": (len(offsets) - completed) / len(offsets) if offsets else 0.0,
+        "error_types": error_types,
+        "elapsed": elapsed,
+        "latency": histogram.to_dict(),
+        "send_lag": send_lag.to_dict(),
+    }
+
+
+def find_knee(points, latency_factor=3.0, min_throughput_ratio=0.9, max_error_rate=0.05):
+    """처리량이 목표 도착률을 못 따라가거나 p99가 급증하는 첫 도착률 반환"""
+    if not points:
+        return None
+    base_p99 = points[0]["latency"]["percentiles_ms"]["99"] or 1e-9
+    for point in points:
+        p99 = point["latency"]["percentiles_ms"]["99"]
+        if (
+            point["throughput"] < point["offered_rate"] * min_throughput_ratio
+            or point["error_rate"] > max_error_rate
+            or p99 > base_p99 * latency_factor
+        ):
+            return point["offered_rate"]
+    return None
+
+
+def run_rate_sweep(search_types, rates, duration, pattern="constant", cooldown=5):
+    """도착률을 높여 가며 검색 타입별 포화 지점(knee)과 처리량-지연 곡선 측정"""
+    report = {}
+    for search_type in search_types:
+        points = []
+        print(f"\n📈 {search_type} 도착률 스윕: {rates}")
+        for rate in rates:
+            offsets = arrival_schedule(pattern, rate, duration)
+            result = asyncio.run(run_open_loop(search_type, offsets))
+            points.append(result)
+            pct = result["latency"]["percentiles_ms"]
+            print(
+                f"  {rate:>7.1f} req/s → 처리량 {result['throughput']:.1f} req/s, "
+                f"p50 {pct['50']:.0f}ms, p99 {pct['99']:.0f}ms, "
+                f"에러율 {result['error_rate']*100:.1f}%"
+            )
+            time.sleep(cooldown)
+
+        knee = find_knee(points)
+        print(f"  ⚠️ 포화 지점: {knee} req/s" if knee else "  ✅ 포화 지점 없음")
+        report[search_type] = {
+            "knee_rate": knee,
+            "curve": [
+                {
+                    "offered_rate": p["offered_rate"],
+                    "throughput": p["throughput"],
+                    "p50_ms": p["latency"]["percentiles_ms"]["50"],
+                    "p99_ms": p["latency"]["percentiles_ms"]["99"],
+                    "error_rate": p["error_rate"],
+                }
+                for p in points
+            ],
+            "points": points,
+        }
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    result_file = f"{TEST_RESULTS_DIR}/open_loop_{timestamp}.json"
+    with open(result_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    # 처리량-지연 곡선 (플롯용 CSV)
+    curve_file = f"{TEST_RESULTS_DIR}/open_loop_{timestamp}_curve.csv"
+    with open(curve_file, "w", encoding="utf-8") as f:
+        f.write("search_type,offered_rate,throughput,p50_ms,p99_ms,error_rate\n")
+        for search_type, data in report.items():
+            for p in data["curve"]:
+                f.write(
+                    f"{search_type},{p['offered_rate']:.3f},{p['throughput']:.3f},"
+                    f"{p['p50_ms']:.3f},{p['p99_ms']:.3f},{p['error_rate']:.4f}\n"
+                )
+
+    print(f"\n상세 결과가 저장되었습니다: {result_file}, {curve_file}")
+    return report
+
+
 def main():
+    parser = argparse.ArgumentParser(description="검색 API 성능 테스트")
+    parser.add_argument(
+        "--mode",
+        choices=["closed", "open", "sweep"],
+        default="closed",
+        help="closed: 기존 동시 사용자 테스트, open: 목표 도착률 부하, sweep: 도착률 스윕",
+    )
+    parser.add_argument("--search-types", nargs="+", default=SEARCH_TYPES)
+    parser.add_argument("--pattern", choices=["constant", "poisson", "step"], default="constant")
+    parser.add_argument("--rate", type=float, default=5.0, help="초당 요청 수 (open)")
+    parser.add_argument("--duration", type=float, default=30.0, help="단계별 부하 시간(초)")
+    parser.add_argument("--step-rates", type=float, nargs="+", default=[1, 2, 5, 10])
+    parser.add_argument("--rates", type=float, nargs="+", default=[1, 2, 5, 10, 20, 50])
+    args = parser.parse_args()
+    if args.mode == "sweep" and args.pattern == "step":
+        # 스윕은 --rates로 도착률을 직접 바꾸므로 단계별 패턴과 함께 쓸 수 없음
+        parser.error("--mode sweep은 --pattern step과 함께 쓸 수 없습니다 (--rates 사용)")
+
     # API 서버 상태 확인
     if not check_api_health():
         print("\n⚠️ API 서버가 정상적으로 동작하지 않습니다. 테스트를 중단합니다.")
         return
 
+    if args.mode == "sweep":
+        run_rate_sweep(args.search_types, args.rates, args.duration, args.pattern)
+        return
+
+    if args.mode == "open":
+        report = {}
+        for search_type in args.search_types:
+            offsets = arrival_schedule(
+                args.pattern, args.rate, args.duration, args.step_rates, args.duration
+            )
+            result = asyncio.run(run_open_loop(search_type, offsets))
+            pct = result["latency"]["percentiles_ms"]
+            print(
+                f"{search_type}: 처리량 {result['throughput']:.1f} req/s, "
+                f"p50 {pct['50']:.0f}ms, p99 {pct['99']:.0f}ms, p99.9 {pct['99.9']:.0f}ms"
+            )
+            report[search_type] = result
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        result_file = f"{TEST_RESULTS_DIR}/open_loop_{args.pattern}_{timestamp}.json"
+        with open(result_file, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n상세 결과가 저장되었습니다: {result_file}")
+        return
+
     # 다양한 사용자 수와 요청 수로 테스트
     test_scenarios = [
         (10, 1),  # 10명이 각각 1개 요청
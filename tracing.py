@@ -0,0 +1,293 @@
+import re
+import time
+import uuid
+import asyncio
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from config import TRACE_EXPORT_PATH, TRACE_BUFFER_SIZE, SERVICE_NAME
+from jsonl_writer import JsonlAppender
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+# 최근 트레이스 보관 (request_id -> Trace)
+_recent_traces = OrderedDict()
+_recent_lock = threading.Lock()
+
+# 트레이스 내보내기 파일 쓰기는 백그라운드 스레드에서 (요청 경로에서 디스크 I/O 없음)
+_exporter = JsonlAppender(TRACE_EXPORT_PATH) if TRACE_EXPORT_PATH else None
+
+
+# 외부에서 받은 요청 ID는 프로파일 파일 이름으로도 쓰이므로 이 형식만 허용
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_TRACE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def new_request_id():
+    """새 요청 ID 생성 (32자리 hex)"""
+    return uuid.uuid4().hex
+
+
+def new_trace_id():
+    """OpenTelemetry trace id (16바이트, 32자리 hex)
+
+    요청 ID는 클라이언트가 정할 수 있어 OTLP 형식이 아닐 수 있으므로 따로 발급
+    """
+    return uuid.uuid4().hex
+
+
+def valid_trace_id(value):
+    """32자리 소문자 hex이고 전부 0이 아니면 그대로, 아니면 None"""
+    if value and _TRACE_ID_RE.match(value) and value != "0" * 32:
+        return value
+    return None
+
+
+def valid_request_id(value):
+    """클라이언트가 보낸 요청 ID가 허용 형식이면 그대로, 아니면 None"""
+    if value and _REQUEST_ID_RE.match(value):
+        return value
+    return None
+
+
+def _new_span_id():
+    return uuid.uuid4().hex[:16]
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_id=None, start_ns=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_span_id()
+        self.parent_id = parent_id
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+
+    @property
+    def duration_ms(self):
+        if self.end_ns is None:
+            return 0.0
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def finish(self, end_ns=None):
+        self.end_ns = end_ns if end_ns is not None else time.time_ns()
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "attributes": self.attributes,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        span = cls(
+            data["name"],
+            data["trace_id"],
+            parent_id=data.get("parent_id"),
+            start_ns=data["start_ns"],
+            attributes=data.get("attributes"),
+        )
+        span.span_id = data["span_id"]
+        span.end_ns = data.get("end_ns")
+        return span
+
+
+class Trace:
+    """요청 하나에 대한 span 모음"""
+
+    def __init__(self, request_id=None, parent_span_id=None, trace_id=None):
+        self.request_id = request_id or new_request_id()
+        # 같은 요청의 Celery 워커 트레이스는 API에서 넘긴 trace id를 이어 씀
+        self.trace_id = valid_trace_id(trace_id) or new_trace_id()
+        self.parent_span_id = parent_span_id
+        self.spans = []
+        # 요청 단위 정보 (질의, 검색 타입, 결과 수 등 느린 검색 기록용)
+        self.attributes = {}
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def extend(self, span_dicts):
+        """다른 프로세스(Celery 워커)에서 기록된 span 병합"""
+        for data in span_dicts or []:
+            self.add(Span.from_dict(data))
+
+    def to_dicts(self):
+        with self._lock:
+            return [span.to_dict() for span in self.spans]
+
+    def find(self, name):
+        with self._lock:
+            for span in self.spans:
+                if span.name == name:
+                    return span
+        return None
+
+    def server_timing(self):
+        """Server-Timing 헤더 값 생성 (예: encode;dur=12.3, ann;dur=4.1)"""
+        with self._lock:
+            finished = [s for s in self.spans if s.end_ns is not None]
+        return ", ".join(f"{s.name};dur={s.duration_ms:.1f}" for s in finished)
+
+    def to_otlp(self):
+        """OpenTelemetry(OTLP/JSON) 호환 형식으로 변환"""
+        otlp_spans = []
+        with self._lock:
+            spans = list(self.spans)
+        for s in spans:
+            item = {
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns or s.start_ns),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)}
+                    for key, value in s.attributes.items()
+                ],
+            }
+            if s.parent_id:
+                item["parentSpanId"] = s.parent_id
+            otlp_spans.append(item)
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": SERVICE_NAME},
+                            },
+                            {
+                                "key": "http.request.id",
+                                "value": {"stringValue": self.request_id},
+                            },
+                        ]
+                    },
+                    "scopeSpans": [
+                        {"scope": {"name": "tracing"}, "spans": otlp_spans}
+                    ],
+                }
+            ]
+        }
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def start_trace(request_id=None, parent_span_id=None, trace_id=None):
+    """현재 컨텍스트에 새 트레이스 시작"""
+    trace = Trace(request_id, parent_span_id, trace_id)
+    _current_trace.set(trace)
+    _current_span.set(None)
+    return trace
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def annotate(**attributes):
+    """현재 트레이스에 요청 단위 정보 추가 (트레이스가 없으면 무시)"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attributes.update(attributes)
+
+
+def current_request_id():
+    trace = _current_trace.get()
+    return trace.request_id if trace else None
+
+
+def current_trace_id():
+    trace = _current_trace.get()
+    return trace.trace_id if trace else None
+
+
+def current_span_id():
+    span = _current_span.get()
+    if span is not None:
+        return span.span_id
+    trace = _current_trace.get()
+    return trace.parent_span_id if trace else None
+
+
+@contextmanager
+def span(name, **attributes):
+    """중첩 가능한 타이밍 span. 트레이스가 없으면 아무것도 기록하지 않음"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    s = Span(name, trace.trace_id, current_span_id(), attributes=attributes)
+    token = _current_span.set(s)
+    try:
+        yield s
+    finally:
+        s.finish()
+        _current_span.reset(token)
+        trace.add(s)
+
+
+def run_in_executor(executor, func, *args):
+    """현재 트레이스 컨텍스트를 복사해 executor에서 func 실행
+
+    loop.run_in_executor는 contextvars를 스레드로 넘기지 않아 그 안에서 연 span이
+    기록되지 않으므로, 트레이스가 있는 요청 경로에서는 이 함수를 사용
+    """
+    loop = asyncio.get_event_loop()
+    return loop.run_in_executor(executor, contextvars.copy_context().run, func, *args)
+
+
+def submit(executor, func, *args):
+    """run_in_executor와 같지만 concurrent.futures.Future 반환 (제출마다 컨텍스트 복사)"""
+    return executor.submit(contextvars.copy_context().run, func, *args)
+
+
+def record_span(name, start_ns, end_ns, **attributes):
+    """이미 측정된 구간을 span으로 기록 (예: 브로커 큐 대기 시간)"""
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    s = Span(name, trace.trace_id, current_span_id(), start_ns, attributes)
+    s.finish(end_ns)
+    trace.add(s)
+    return s
+
+
+def finish_trace(trace):
+    """완료된 트레이스 보관 및 (설정된 경우) 파일로 내보내기"""
+    with _recent_lock:
+        _recent_traces[trace.request_id] = trace
+        _recent_traces.move_to_end(trace.request_id)
+        while len(_recent_traces) > TRACE_BUFFER_SIZE:
+            _recent_traces.popitem(last=False)
+
+    if _exporter is not None:
+        _exporter.append(trace.to_otlp())
+
+
+def get_trace(request_id):
+    with _recent_lock:
+        return _recent_traces.get(request_id)
@@ -0,0 +1,115 @@
+"""배포 직후 콜드 스타트 완화를 위한 워밍업
+
+검색 기록에서 많이 검색된 질의 상위 N개를 임베딩 모델과 검색 경로에 다시
+흘려 보내 모델 페이지, Weaviate HNSW 캐시를 미리 데웁니다.
+"""
+
+import time
+import asyncio
+import threading
+
+import rag
+from history import load_popular_queries
+from config import (
+    SEARCH_HISTORY_DIR,
+    WARMUP_ENABLED,
+    WARMUP_TOP_N,
+    WARMUP_TIME_BUDGET,
+)
+
+
+class WarmupState:
+    def __init__(self):
+        self.status = "pending"  # pending, running, ready
+        self.started_at = None
+        self.finished_at = None
+        self.queries_total = 0
+        self.queries_done = 0
+        self.errors = 0
+        self.budget_exceeded = False
+
+    @property
+    def ready(self):
+        return self.status == "ready"
+
+    def to_dict(self):
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "status": self.status,
+            "queries_total": self.queries_total,
+            "queries_done": self.queries_done,
+            "errors": self.errors,
+            "budget_exceeded": self.budget_exceeded,
+            "elapsed": elapsed,
+        }
+
+
+warmup_state = WarmupState()
+
+
+def _run_query(question, search_type):
+    if search_type == "vector":
+        return asyncio.run(rag.search_similar_sentences(question))
+    if search_type == "bm25":
+        return rag.search_similar_sentences_bm25(question)
+    if search_type == "exact_match":
+        return rag.search_similar_sentences_exact_match(question)
+    if search_type == "fuzzy":
+        return rag.search_similar_sentences_fuzzy(question)
+    if search_type == "model":
+        # 검색 없이 모델 인코딩만 수행
+        return rag.get_embedding().embed_query(question)
+    raise ValueError(f"알 수 없는 워밍업 검색 타입: {search_type}")
+
+
+def run_warmup(
+    search_types,
+    top_n=WARMUP_TOP_N,
+    time_budget=WARMUP_TIME_BUDGET,
+    state=warmup_state,
+):
+    """상위 검색어를 주어진 시간 예산 안에서 재실행. 예산 초과/오류와 무관하게 ready로 끝남"""
+    state.status = "running"
+    state.started_at = time.time()
+    deadline = state.started_at + time_budget
+
+    try:
+        queries = load_popular_queries(SEARCH_HISTORY_DIR, top_n)
+        state.queries_total = len(queries) * len(search_types)
+        print(f"🔥 워밍업 시작: 검색어 {len(queries)}개, 검색 타입 {list(search_types)}")
+
+        for question in queries:
+            for search_type in search_types:
+                if time.time() > deadline:
+                    state.budget_exceeded = True
+                    return state
+                try:
+                    _run_query(question, search_type)
+                except Exception as e:
+                    state.errors += 1
+                    print(f"⚠️ 워밍업 실패 ({search_type}): {str(e)}")
+                state.queries_done += 1
+        return state
+    finally:
+        state.status = "ready"
+        state.finished_at = time.time()
+        print(f"🔥 워밍업 완료: {state.to_dict()}")
+
+
+def start_background_warmup(search_types, **kwargs):
+    """별도 스레드에서 워밍업 실행. 비활성화된 경우 바로 ready 상태로 전환"""
+    if not WARMUP_ENABLED or not search_types:
+        warmup_state.status = "ready"
+        return None
+
+    thread = threading.Thread(
+        target=run_warmup,
+        args=(search_types,),
+        kwargs=kwargs,
+        name="warmup",
+        daemon=True,
+    )
+    thread.start()
+    return thread